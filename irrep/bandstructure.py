@@ -17,19 +17,49 @@
 
 
 import copy
-import functools
 import os
+from collections import OrderedDict
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import json
 
+import h5py
 import numpy as np
 from functools import cached_property
 
-from .readfiles import ParserAbinit, ParserVasp, ParserEspresso, ParserW90, ParserGPAW
+from .readfiles import ParserAbinit, ParserVasp, ParserEspresso, ParserW90, ParserGPAW, ParserIrrep
 from .kpoint import Kpoint
 from .spacegroup import SpaceGroup
 from .spacegroup_irreps import SpaceGroupIrreps
 from .gvectors import sortIG, calc_gvectors
-from .utility import get_block_indices, get_mapping_irr, grid_from_kpoints, log_message, UniqueListMod1, restore_full_grid, select_irreducible
+from .storage import WavefunctionCache, WavefunctionScratch, write_kpoint_group, EXPORT_FORMAT, EXPORT_FORMAT_VERSION
+from .symmetry_indicators import load_si_formulas, load_si_group
+from .table_service import get_table_service
+from .utility import close_mod1, get_block_indices, get_mapping_irr, grid_from_kpoints, log_message, restore_full_grid, select_irreducible
+
+
+def wcc_from_overlaps(overlaps):
+    r"""
+    Calculate the eigenvalues of the Wilson loop operator from the overlaps 
+    between consecutive k-points of a closed loop. Each overlap is replaced 
+    by its closest unitary matrix before taking the product.
+
+    Parameters
+    ----------
+    overlaps : iterable of array
+        Overlap matrices :math:`<u_m(k_i)|u_n(k_{i+1})>`, including the one 
+        that closes the loop. May be a generator.
+
+    Returns
+    -------
+    array
+        Sorted phases of the eigenvalues, divided by :math:`2\pi`.
+    """
+    wilson = None
+    for O in overlaps:
+        U, _, Vh = np.linalg.svd(O)
+        wilson = U @ Vh if wilson is None else wilson @ U @ Vh
+    return np.sort((np.angle(np.linalg.eigvals(wilson)) / (2 * np.pi)) % 1)
 
 
 class BandStructure:
@@ -52,6 +82,8 @@ class BandStructure:
         Instance of GPAW calculator. Mandatory for GPAW.
     fPOS : str, default=None
         Name of file containing the crystal structure in VASP (POSCAR format).
+    fIRREP : str, default=None
+        Name of file written by `irrep export` (see :meth:`export`).
     Ecut : float, default=None
         Plane-wave cutoff in eV to consider in the expansion of wave-functions.
         mandatory for GPAW and Wannier90.
@@ -66,6 +98,7 @@ class BandStructure:
         Mandatory for VASP.
     code : str, default='vasp'
         DFT code used. Set to 'vasp', 'abinit', 'espresso' or 'wannier90' or 'gpaw'.
+        Set to 'irrep' to read a file written by `irrep export`.
     EF : float, default=None
         Fermi-energy.
     onlysym : bool, default=False
@@ -110,6 +143,27 @@ class BandStructure:
     spacegroup : SpaceGroup or SpaceGroupIrreps, default=None
         if provided, the spacegroup will be used to initialize the band structure, and not from the files.
         use on your own risk, no checks are performed to ensure that the spacegroup is consistent with the files.
+        A space group saved earlier can be restored with `SpaceGroupIrreps.load` or `SpaceGroupIrreps.from_dict`.
+    wf_cache_dir : str, default=None
+        If provided, the wave functions truncated to `Ecut` are cached in an 
+        HDF5 file in this directory, and read from it in later runs with the 
+        same input files, `Ecut`, `IBstart` and `IBend`.
+    wf_cache_max_size : float, default=None
+        Maximal size (in GB) of the directory `wf_cache_dir`. When exceeded, 
+        the least recently used cache files are removed. No limit by default.
+    wf_memmap : bool, default=False
+        If `True`, the wave functions kept after calculating the traces 
+        (`save_wf=True`) are written to scratch files and accessed as 
+        read-only memory maps, instead of being held in memory.
+    scratch_dir : str, default=None
+        Directory where the scratch files of `wf_memmap` are created. If 
+        `None`, the default directory for temporary files is used. The 
+        files are removed when the `BandStructure` is garbage-collected.
+    spacegroup_cache_dir : str, default=None
+        If provided, the space group (including the transformation to the 
+        cell of the tables) is cached in this directory, and read from it in 
+        later runs with the same structure and parameters. Ignored if 
+        `spacegroup` is given.
 
 
     Attributes
@@ -162,6 +216,7 @@ class BandStructure:
         prefix=None,
         calculator_gpaw=None,
         fPOS=None,
+        fIRREP=None,
         Ecut=None,
         IBstart=None,
         IBend=None,
@@ -191,7 +246,12 @@ class BandStructure:
         mag_symprec=-1,
         spacegroup=None,
         select_grid=None,
-        irreducible=False
+        irreducible=False,
+        wf_cache_dir=None,
+        wf_cache_max_size=None,
+        wf_memmap=False,
+        scratch_dir=None,
+        spacegroup_cache_dir=None,
     ):
 
         code = code.lower()
@@ -208,6 +268,7 @@ class BandStructure:
                 calculator_gpaw=calculator_gpaw,
                 prefix=prefix,
                 fPOS=fPOS,
+                fIRREP=fIRREP,
                 code=code,
                 alat=alat,
                 from_sym_file=from_sym_file,
@@ -223,10 +284,13 @@ class BandStructure:
                 shiftUC=shiftUC,
                 search_cell=search_cell,
                 trans_thresh=trans_thresh,
+                cache_dir=spacegroup_cache_dir,
             )
         self.spacegroup = spacegroup
         self.spinor = self.spacegroup.spinor
         self.magnetic = self.spacegroup.magnetic
+        self.wf_scratch = None
+        self._load_kpoint = None
 
         if select_grid is not None:
             self.mp_grid = tuple(select_grid)
@@ -241,15 +305,15 @@ class BandStructure:
                 return True
 
         if irreducible:
-            irreducible_list = UniqueListMod1()
+            irreducible_list = []
+            symmetry_array = self.spacegroup.symmetry_array()
 
             def is_reducible(kpt):
-                for symop in self.spacegroup.symmetries:
-                    if symop.transform_k(kpt) in irreducible_list:
-                        return True
-                else:
-                    irreducible_list.append(kpt)
-                    return False
+                transformed = symmetry_array.transform_k(kpt)[:, 0]
+                if close_mod1(transformed[:, None, :], np.reshape(irreducible_list, (1, -1, 3))).any():
+                    return True
+                irreducible_list.append(kpt)
+                return False
         else:
             def is_reducible(kpt):
                 return False
@@ -347,6 +411,9 @@ class BandStructure:
                 raise RuntimeError("Ecut mandatory for GPAW")
             self.Ecut0 = Ecut
             NK = kpred.shape[0]
+        elif code == "irrep":
+            parser = ParserIrrep(fIRREP)
+            NK, NBin, self.Ecut0, _spinor, EF_in = parser.parse_header()
         else:
             raise RuntimeError(f"Unknown/unsupported code :{code}")
 
@@ -398,15 +465,56 @@ class BandStructure:
             kplist -= 1
             kplist = np.array([k for k in kplist if k >= 0 and k < NK])
 
-        # Parse wave functions at each k-point
-        self.kpoints = []
-        for ik in kplist:
-
-            if code == 'vasp':
+        # Set up the cache of wave functions
+        if wf_cache_dir is None:
+            wf_cache = None
+        elif code == "gpaw":
+            wf_cache = None
+            log_message("WARNING: the cache of wave functions is not available for GPAW", verbosity, 1)
+        else:
+            if code == "vasp":
+                input_files = [fWAV]
+            elif code == "abinit":
+                input_files = [fWFK]
+            elif code == "espresso":
+                input_files = [prefix + ".save"]
+            elif code == "wannier90":
+                input_files = ([prefix + ".win", prefix + ".eig"] +
+                               [parser.get_UNK_name(ik + 1) for ik in range(NK)])
+            elif code == "irrep":
+                input_files = [fIRREP]
+            wf_cache = WavefunctionCache(wf_cache_dir,
+                                         input_files=input_files,
+                                         Ecut=self.Ecut,
+                                         IBstart=IBstart,
+                                         IBend=IBend,
+                                         extra=(code, spin_channel, unk_formatted, self.spinor,
+                                                float(self.Ecut0),
+                                                tuple(np.round(self.RecLattice, 8).ravel())),
+                                         max_size=wf_cache_max_size,
+                                         verbosity=verbosity)
+
+        if wf_memmap and save_wf:
+            self.wf_scratch = WavefunctionScratch(scratch_dir)
+            log_message(f"Wave functions will be stored in {self.wf_scratch.path}", verbosity, 1)
+
+        def load_kpoint(ik, skip=check_skip):
+            """Parse the wave functions at a k-point, `None` if it is skipped"""
+
+            from_cache = wf_cache is not None and ik in wf_cache
+            if from_cache:
+                log_message(f'Reading wave functions at k-point #{ik:>3d} from the cache', verbosity, 2)
+                cached = wf_cache.load(ik)
+                kpt = cached["kpt"]
+                if skip(kpt):
+                    return None
+                WF, kg, eKG, Energy, upper = (cached[key] for key in ("WF", "ig", "eKG", "Energy", "upper"))
+
+            elif code == 'vasp':
                 log_message(f'Parsing wave functions at k-point #{ik:>3d}', verbosity, 2)
                 WF, Energy, kpt, npw = parser.parse_kpoint(ik, NBin, self.spinor)
-                if check_skip(kpt):
-                    continue
+                if skip(kpt):
+                    return None
                 kg, eKG = calc_gvectors(kpt,
                                    self.RecLattice,
                                    self.Ecut0,
@@ -418,10 +526,9 @@ class BandStructure:
                 WF = WF[:, kg[:, 3], :]
 
             elif code == 'abinit':
-                NBin = parser.nband[ik]
                 kpt = parser.kpt[ik]
-                if check_skip(kpt):
-                    continue
+                if skip(kpt):
+                    return None
                 log_message(f'Parsing wave functions at k-point #{ik:>3d}: {kpt}', verbosity, 2)
                 WF, Energy, kg = parser.parse_kpoint(ik)
                 WF, kg, eKG = sortIG(ik, kg, kpt, WF, self.RecLattice, self.Ecut0, self.Ecut, verbosity=verbosity)
@@ -429,14 +536,14 @@ class BandStructure:
             elif code == 'espresso':
                 log_message(f'Parsing wave functions at k-point #{ik:>3d}', verbosity, 2)
                 WF, Energy, kg, kpt = parser.parse_kpoint(ik, NBin, spin_channel, verbosity=verbosity)
-                if check_skip(kpt):
-                    continue
+                if skip(kpt):
+                    return None
                 WF, kg, eKG = sortIG(ik + 1, kg, kpt, WF, self.RecLattice, self.Ecut0, self.Ecut, verbosity=verbosity)
 
             elif code == 'wannier90':
                 kpt = kpred[ik]
-                if check_skip(kpt):
-                    continue
+                if skip(kpt):
+                    return None
                 Energy = Energies[ik]
                 ngx, ngy, ngz = parser.parse_grid(ik + 1)
                 kg, eKG = calc_gvectors(kpred[ik],
@@ -451,25 +558,39 @@ class BandStructure:
                 WF = parser.parse_kpoint(ik + 1, selectG)
             elif code == 'gpaw':
                 kpt = kpred[ik]
-                if check_skip(kpt):
-                    continue
+                if skip(kpt):
+                    return None
                 Energy, WF, kg, kpt, eKG = parser.parse_kpoint(ik,
                                                  RecLattice=self.RecLattice,
                                                  Ecut=self.Ecut)
+            elif code == 'irrep':
+                log_message(f'Parsing wave functions at k-point #{ik:>3d}', verbosity, 2)
+                WF, Energy, kg, kpt, upper = parser.parse_kpoint(ik)
+                if skip(kpt):
+                    return None
+                # keep the energy of the band above the exported ones to calculate gaps
+                Energy = np.append(Energy, upper)
+                WF, kg, eKG = sortIG(ik + 1, kg, kpt, WF, self.RecLattice, self.Ecut0, self.Ecut, verbosity=verbosity)
 
+            if not from_cache:
+                # Pick energy of IBend+1 band to calculate gaps
+                try:
+                    upper = Energy[IBend]
+                except BaseException:
+                    upper = np.nan
 
-            # Pick energy of IBend+1 band to calculate gaps
-            try:
-                upper = Energy[IBend] - self.efermi
-            except BaseException:
-                upper = np.nan
+                # Preserve only bands in between IBstart and IBend
+                WF = WF[IBstart:IBend]
+                Energy = Energy[IBstart:IBend]
+
+                if wf_cache is not None:
+                    wf_cache.save(ik, kpt=kpt, WF=WF, ig=kg, eKG=eKG, Energy=Energy, upper=upper)
 
-            # Preserve only bands in between IBstart and IBend
-            WF = WF[IBstart:IBend]
-            Energy = Energy[IBstart:IBend] - self.efermi
+            upper = upper - self.efermi
+            Energy = Energy - self.efermi
 
 
-            kp = Kpoint(
+            return Kpoint(
                 ik=ik,
                 kpt=kpt,
                 WF=WF,
@@ -482,7 +603,29 @@ class BandStructure:
                 normalize=normalize,
                 eKG=eKG,
             )
-            kp.set_little_group(symmetries=self.spacegroup.u_symmetries)
+
+        # Little groups of all k-points at once, from the coordinates in the
+        # headers. A k-point whose wave functions come with other coordinates
+        # (e.g. rounded differently) gets its own mask
+        u_symmetries = self.spacegroup.u_symmetries
+        if code in ("wannier90", "gpaw"):
+            kpoints_header = np.reshape(kpred, (-1, 3))
+        else:
+            kpoints_header = parser.parse_kpoint_coordinates()
+        kpoints_header = kpoints_header[np.asarray(kplist, dtype=int)]
+        little_group_masks = self.spacegroup.little_group_mask(kpoints_header, u_symmetries)
+
+        # Parse wave functions at each k-point
+        self.kpoints = []
+        for i, ik in enumerate(kplist):
+            kp = load_kpoint(ik)
+            if kp is None:
+                continue
+            if np.allclose(kp.k, kpoints_header[i], atol=1e-6):
+                mask = little_group_masks[i]
+            else:
+                mask = self.spacegroup.little_group_mask(kp.k, u_symmetries)[0]
+            kp.set_little_group(symmetries=u_symmetries, mask=mask)
 
             if irreps:
                 # saved to further use in Separate()
@@ -498,8 +641,15 @@ class BandStructure:
                 kp.init_traces(**self.kwargs_kpoint)
             else:
                 self.kwargs_kpoint = None
+            if self.wf_scratch is not None and kp.WF is not None:
+                kp.WF = self.wf_scratch.store(kp.WF)
             self.kpoints.append(kp)
 
+        # keep the parser to read the wave functions again when streaming
+        # over k-points (e.g. for Wilson loops), instead of keeping them
+        if not save_wf:
+            self._load_kpoint = load_kpoint
+
 
     @property
     def lattice(self):
@@ -537,9 +687,12 @@ class BandStructure:
 
             if kpnames is not None:
                 irreps = self.spacegroup.get_irreps_from_table(kpnames[ik], KP.k, verbosity=verbosity)
+                character_matrix = self.spacegroup.get_character_matrix(
+                    kpnames[ik], KP.k, KP.little_group, verbosity=verbosity)
             else:
                 irreps = None
-            KP.identify_irreps(irreptable=irreps)
+                character_matrix = None
+            KP.identify_irreps(irreptable=irreps, character_matrix=character_matrix)
 
     def write_characters(self):
         '''
@@ -632,6 +785,7 @@ class BandStructure:
             json_data['ebr decomposition']['y'] = self.y
             json_data['ebr decomposition']['y_prime'] = self.y_prime
             json_data['ebr decomposition']['solutions'] = self.ebr_decompositions
+            json_data['ebr decomposition']['complete'] = self.ebr_decomposition_complete
 
         return json_data
 
@@ -734,7 +888,7 @@ class BandStructure:
         for KP in self.kpoints:
             f.write(KP.write_trace())
 
-    def Separate(self, isymop, groupKramers=True, verbosity=0):
+    def Separate(self, isymop, groupKramers=True, verbosity=0, offdiagonal_check=8):
         """
         Separate band structure according to the eigenvalues of a symmetry 
         operation.
@@ -747,6 +901,10 @@ class BandStructure:
             If `True`, states will be coupled by Kramers' pairs.
         verbosity : int, default=0
             Verbosity level. Default is set to minimalistic printing
+        offdiagonal_check : int, default=8
+            Number of states for which the elements of the matrix of the 
+            symmetry with states of other energies are checked to vanish. 
+            See :meth:`~kpoint.Kpoint.Separate`.
 
         Returns
         -------
@@ -769,10 +927,17 @@ class BandStructure:
                                "not implemented for now.")
 
         # Separate each k-point
-        kpseparated = [
-            kp.Separate(symop, groupKramers=groupKramers, verbosity=verbosity, kwargs_kpoint=self.kwargs_kpoint)
-            for kp in self.kpoints
-        ]  # each element is a dict with separated bandstructure of a k-point
+        kpseparated = []  # each element is a dict with separated bandstructure of a k-point
+        for kp in self.kpoints:
+            kps = kp.Separate(symop, groupKramers=groupKramers, verbosity=verbosity,
+                              kwargs_kpoint=self.kwargs_kpoint,
+                              offdiagonal_check=offdiagonal_check)
+            # only the subspaces of one k-point are kept in memory at a time
+            if self.wf_scratch is not None:
+                for kp_sub in kps.values():
+                    if kp_sub.WF is not None:
+                        kp_sub.WF = self.wf_scratch.store(kp_sub.WF)
+            kpseparated.append(kps)
 
         allvalues = np.array(sum((list(kps.keys()) for kps in kpseparated), []))
         if groupKramers:
@@ -818,9 +983,66 @@ class BandStructure:
             else:
                 return dict({allvalues.mean(): self})
 
+    def iter_kpoints(self, indices=None):
+        """
+        Iterate over the k-points with their wave functions. If the wave 
+        functions were not kept in memory (`save_wf=False`), they are read 
+        again from the DFT files (or the cache), one k-point at a time, so 
+        that only the k-point being yielded holds its wave functions.
+
+        Parameters
+        ----------
+        indices : list of int, default=None
+            Indices (in `kpoints`) of the k-points to iterate over. If 
+            `None`, all the k-points are considered.
+
+        Yields
+        ------
+        :class:`~kpoint.Kpoint`
+            K-point with the attribute `WF` set.
+        """
+        if indices is None:
+            indices = range(self.num_k)
+        for ik in indices:
+            kp = self.kpoints[ik]
+            if kp.WF is not None:
+                yield kp
+            elif self._load_kpoint is None:
+                raise RuntimeError("Wave functions were not saved and cannot be read again. "
+                                   "Create the BandStructure with save_wf=True")
+            else:
+                kp_wf = copy.copy(kp)
+                kp_wf.WF = self._load_kpoint(kp.ik0 - 1, skip=lambda kpt: False).WF
+                yield kp_wf
+
+    def iter_overlaps(self):
+        r"""
+        Iterate over the overlaps of consecutive k-points along the closed 
+        path formed by `kpoints`. The k-points are read in the order of the 
+        path (see :meth:`iter_kpoints`) and only the first one and the 
+        current pair are kept in memory at a time.
+
+        Yields
+        ------
+        array
+            Matrix of elements :math:`<u_m(k_i)|u_n(k_{i+1})>`. The last 
+            one closes the loop with the first k-point.
+        """
+        first = previous = None
+        for kp in self.iter_kpoints():
+            if first is None:
+                first = kp
+            else:
+                yield previous.overlap(kp)
+            previous = kp
+        if first is not None:
+            yield previous.overlap(first)
+
     def zakphase(self):
         r"""
-        Calculate Zak phases along a path for a set of states.
+        Calculate Zak phases along a path for a set of states. The overlaps 
+        are evaluated while iterating over the path, so the wave functions 
+        do not need to be kept in memory (see :meth:`iter_kpoints`).
 
         Returns
         -------
@@ -838,30 +1060,30 @@ class BandStructure:
             k-point of the path. The :math:`i^{th}` column is the local gap 
             between :math:`i^{th}` and :math:`(i+1)^{th}` bands.
         """
-        overlaps = [
-            x.overlap(y)
-            for x, y in zip(self.kpoints, self.kpoints[1:] + [self.kpoints[0]])
-        ]
-        print("overlaps")
-        for O in overlaps:
-            print(np.abs(O[0, 0]), np.angle(O[0, 0]))
-        print("   sum  ", np.sum(np.angle(O[0, 0]) for O in overlaps) / np.pi)
-        nmax = np.min([o.shape for o in overlaps])
+        nmax = min(k.num_bands for k in self.kpoints)
         # calculate zak phase in incresing dimension of the subspace (1 band,
         # 2 bands, 3 bands,...)
-        z = np.angle(
-            [[np.linalg.det(O[:n, :n]) for n in range(1, nmax + 1)] for O in overlaps]
-        ).sum(axis=0) % (2 * np.pi)
-        emin = np.hstack((np.min([k.Energy[1:nmax] for k in self.kpoints], axis=0),
+        z = np.zeros(nmax)
+        print("overlaps")
+        sum00 = 0
+        for O in self.iter_overlaps():
+            print(np.abs(O[0, 0]), np.angle(O[0, 0]))
+            sum00 += np.angle(O[0, 0])
+            z += np.angle([np.linalg.det(O[:n, :n]) for n in range(1, nmax + 1)])
+        print("   sum  ", sum00 / np.pi)
+        z = z % (2 * np.pi)
+        emin = np.hstack((np.min([k.Energy_raw[1:nmax] for k in self.kpoints], axis=0),
                           [np.inf]))
-        emax = np.max([k.Energy[:nmax] for k in self.kpoints], axis=0)
-        locgap = np.hstack((np.min([k.Energy[1:nmax] - k.Energy[0: nmax - 1] for k in self.kpoints], axis=0,),
+        emax = np.max([k.Energy_raw[:nmax] for k in self.kpoints], axis=0)
+        locgap = np.hstack((np.min([k.Energy_raw[1:nmax] - k.Energy_raw[0: nmax - 1] for k in self.kpoints], axis=0,),
                             [np.inf],))
         return z, emin - emax, (emin + emax) / 2, locgap
 
     def wcc(self):
         r"""
-        Calculate Wilson loops.
+        Calculate Wilson loops. The product of the overlaps is accumulated 
+        while iterating over the path, so the wave functions do not need to 
+        be kept in memory (see :meth:`iter_kpoints`).
 
         Returns
         -------
@@ -869,15 +1091,157 @@ class BandStructure:
             Eigenvalues of the Wilson loop operator, divided by :math:`2\pi`.
 
         """
-        overlaps = [
-            x.overlap(y)
-            for x, y in zip(self.kpoints, self.kpoints[1:] + [self.kpoints[0]])
-        ]
-        wilson = functools.reduce(
-            np.dot,
-            [functools.reduce(np.dot, np.linalg.svd(O)[0:3:2]) for O in overlaps],
-        )
-        return np.sort((np.angle(np.linalg.eig(wilson)) / (2 * np.pi)) % 1)
+        return wcc_from_overlaps(self.iter_overlaps())
+
+    def get_wilson_loops(self, direction):
+        """
+        Arrange the k-points in a family of parallel closed loops, e.g. 
+        for a grid of k-points covering a plane of the BZ.
+
+        Parameters
+        ----------
+        direction : int
+            Reciprocal lattice vector (0, 1 or 2) along which the loops run. 
+            K-points whose other two coordinates coincide (modulo 1) form a 
+            loop, sorted by their coordinate along `direction`. K-points 
+            equivalent modulo a reciprocal lattice vector (e.g. at 0 and 1) 
+            appear once, the loop being closed by the overlap between its 
+            last and first k-points.
+
+        Returns
+        -------
+        loops : array( (num_loops, num_k), dtype=int)
+            Indices (in `kpoints`) of the k-points along each loop.
+        origins : array( (num_loops, 3) )
+            Coordinates of each loop, with the component along `direction` 
+            set to zero.
+        """
+        others = [i for i in range(3) if i != direction]
+        groups = {}
+        for ik, kp in enumerate(self.kpoints):
+            key = tuple(np.round(kp.k[others] % 1, 6) % 1)
+            coordinate = np.round(kp.k[direction] % 1, 6) % 1
+            # an equivalent k-point would count the link between them twice
+            groups.setdefault(key, {}).setdefault(coordinate, ik)
+        lengths = set(len(g) for g in groups.values())
+        if len(lengths) != 1:
+            raise ValueError("The k-points do not form loops of the same length along "
+                             f"direction {direction}: found lengths {sorted(lengths)}")
+        keys = sorted(groups.keys())
+        loops = np.array([[groups[key][coordinate] for coordinate in sorted(groups[key])]
+                          for key in keys], dtype=int)
+        origins = np.zeros((len(keys), 3))
+        origins[:, others] = keys
+        return loops, origins
+
+    def wcc_loops(self, loops, num_workers=None):
+        r"""
+        Calculate the Wannier charge centres (eigenvalues of the Wilson 
+        loop operator) for a family of closed loops, e.g. the hybrid 
+        Wannier centres over a plane of the BZ needed for Z2 and Chern 
+        numbers. The loops are evaluated in parallel threads. The matching 
+        of plane waves between neighbouring k-points is kept for the pairs 
+        of k-points being processed and reused by other loops whose 
+        k-points have the same sets of reciprocal lattice vectors.
+
+        Parameters
+        ----------
+        loops : array( (num_loops, num_k), dtype=int)
+            Indices (in `kpoints`) of the k-points along each loop, e.g. 
+            returned by :meth:`get_wilson_loops`. Each loop is closed by 
+            the overlap between its last and first k-points.
+        num_workers : int, default=None
+            Number of threads. If `None`, the default of 
+            `concurrent.futures.ThreadPoolExecutor` is used.
+
+        Returns
+        -------
+        array( (num_loops, num_bands) )
+            Wannier charge centres of each loop, divided by :math:`2\pi`.
+        """
+        if num_workers is None:
+            num_workers = min(32, (os.cpu_count() or 1) + 4)
+        # the alignments of the loops being evaluated by all threads
+        max_alignments = num_workers * np.shape(loops)[1]
+        # keys are the numbers of plane waves and the shift between both
+        # k-points; the sets of plane waves are compared only within a key
+        alignments = OrderedDict()
+        num_alignments = [0]
+        lock = threading.Lock()
+        lock_alignments = threading.Lock()
+
+        def get_kpoint(ik):
+            # the parsers used to read the wave functions again are not thread-safe
+            with lock:
+                return next(self.iter_kpoints([ik]))
+
+        def get_alignment(kp1, kp2):
+            ig1, ig2 = kp1.ig, kp2.ig
+            g = np.array((kp1.k - kp2.k).round(), dtype=int)
+            key = (len(ig1), len(ig2), tuple(g))
+            with lock_alignments:
+                candidates = list(alignments.get(key, []))
+                if key in alignments:
+                    alignments.move_to_end(key)
+            for ig1_other, ig2_other, alignment in candidates:
+                # the same arrays when the k-points are kept in memory
+                if ((ig1 is ig1_other or np.array_equal(ig1[:, :3], ig1_other[:, :3])) and
+                        (ig2 is ig2_other or np.array_equal(ig2[:, :3], ig2_other[:, :3]))):
+                    return alignment
+            alignment = kp1.gvector_alignment(kp2)
+            with lock_alignments:
+                alignments.setdefault(key, []).append((ig1, ig2, alignment))
+                num_alignments[0] += 1
+                while num_alignments[0] > max_alignments:
+                    num_alignments[0] -= len(alignments.popitem(last=False)[1])
+            return alignment
+
+        def loop_wcc(loop):
+            kpoints = [get_kpoint(ik) for ik in loop]
+            pairs = zip(kpoints, kpoints[1:] + kpoints[:1])
+            return wcc_from_overlaps(kp1.overlap(kp2, alignment=get_alignment(kp1, kp2))
+                                     for kp1, kp2 in pairs)
+
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            return np.array(list(executor.map(loop_wcc, loops)))
+
+    def export(self, filename, compression="gzip"):
+        """
+        Write the crystal structure, energy levels and wave functions to a 
+        compact HDF5 file, which can be read back with `code='irrep'`. 
+        The wave functions are stored in single precision, only for the 
+        plane waves within the cutoff `Ecut`.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file.
+        compression : str, default='gzip'
+            Compression filter applied to the wave functions.
+        """
+        for kp in self.kpoints:
+            if kp.WF is None:
+                raise RuntimeError("Wave functions were not saved. Create the BandStructure with save_wf=True")
+        with h5py.File(filename, "w") as f:
+            f.attrs["format"] = EXPORT_FORMAT
+            f.attrs["version"] = EXPORT_FORMAT_VERSION
+            f.attrs["spinor"] = self.spinor
+            f.attrs["Ecut"] = self.Ecut
+            f.attrs["efermi"] = self.efermi
+            f.attrs["num_bands"] = self.num_bands
+            f.create_dataset("lattice", data=self.Lattice)
+            f.create_dataset("positions", data=self.spacegroup.positions)
+            f.create_dataset("typat", data=np.array(self.spacegroup.typat))
+            group = f.create_group("kpoints")
+            for ik, kp in enumerate(self.kpoints):
+                write_kpoint_group(group.create_group(str(ik)),
+                                   kpt=kp.k,
+                                   WF=kp.WF.astype(np.complex64),
+                                   ig=kp.ig,
+                                   eKG=kp.eKG,
+                                   Energy=kp.Energy_raw + self.efermi,
+                                   upper=kp.upper + self.efermi,
+                                   compression=compression)
 
     def write_plotfile(self, filename='bands-tognuplot.dat'):
         """
@@ -1135,23 +1499,13 @@ class BandStructure:
                 "using IrRep as a package"
             )
 
-        # Load symmetry indicators file
-        si_table = self.load_si_table()
-        if self.spacegroup.number_str not in si_table:
+        formulas = load_si_formulas(self.spacegroup.number_str, self.spinor, self.magnetic)
+        if formulas is None:
             print("There are no non-trivial symmetry indicators for this space "
                   "group")
             indicators_dict = None
-
         else:
-            si_table = si_table[self.spacegroup.number_str]["indicators"]
-
-            indicators_dict = {}
-            for indicator in si_table:
-                si_factors = si_table[indicator]["factors"]
-                total = 0
-                for label, value in si_factors.items():
-                    total += value * irrep_dict.get(label, 0)
-                indicators_dict[indicator] = total % si_table[indicator]['mod']
+            indicators_dict = formulas.evaluate(irrep_dict)
 
         return indicators_dict
 
@@ -1171,8 +1525,8 @@ class BandStructure:
                   "indicators")
 
         else:
-            si_table = self.load_si_table()
-            si_table = si_table[self.spacegroup.number_str]["indicators"]
+            si_table = load_si_group(self.spacegroup.number_str, self.spinor, self.magnetic)
+            si_table = si_table["indicators"]
 
             for indicator in si_table:
 
@@ -1187,10 +1541,27 @@ class BandStructure:
                 print(f"{indicator} =", self.symmetry_indicators[indicator])
                 print(f"\tDefinition: ({definition_str}) mod {si_table[indicator]['mod']}")
 
-    def compute_ebr_decomposition(self):
+    def compute_ebr_decomposition(self, n_smallest=5, norm="L1", time_limit=None, num_workers=8,
+                                  backend="auto"):
         '''
         Compute EBR decomposition. Sets values for attributes `classification`, 
-        `ebr_decompositions`, `y` and `y_prime`
+        `ebr_decompositions`, `ebr_decomposition_complete`, `y` and `y_prime`
+
+        Parameters
+        ----------
+        n_smallest : int, default=5
+            Maximal number of decompositions computed.
+        norm : str, default='L1'
+            Norm of the vector of coefficients minimized by the solver, 'L1' 
+            or 'L2'.
+        time_limit : float, default=None
+            Maximal time (in seconds) spent searching decompositions. If 
+            `None`, there is no limit.
+        num_workers : int, default=8
+            Number of parallel workers of the solver.
+        backend : str, default='auto'
+            Solver: 'cpsat' (OR-Tools), 'scipy' (`scipy.optimize.milp`) or 
+            'auto' to use OR-Tools if it is installed.
 
         Raises
         ------
@@ -1200,8 +1571,8 @@ class BandStructure:
 
         from .ebrs import (
             compute_topological_classification_vector,
-            ORTOOLS_AVAILABLE,
             compute_ebr_decomposition,
+            classify_decomposition,
             load_ebr_data
         )
 
@@ -1223,35 +1594,33 @@ class BandStructure:
 
 
         # Stable topological, don't compute EBR decompositions
+        self.ebr_decomposition_complete = True
         if nontrivial:
             self.classification = 'STABLE TOPOLOGICAL'
             self.ebr_decompositions = None
             return
 
-        # Fragile or trivial, but cannot ortools not installed
-        elif not ORTOOLS_AVAILABLE:
-            self.ebr_decomposition = None
-            print(
-                "There exists integer-valued solutions to the EBR decomposition "
-                "problem, so the set of bands is TRIVIAL or displays FRAGILE TOPOLOGY. "
-                "Install OR-Tools to compute decompositions."
-            )
-
-        else:
-            print('Calculating decomposition in terms of EBRs. '
-                  'This can take some time...')
-            self.ebr_decompositions, is_positive = compute_ebr_decomposition(ebr_data, self.y)
-            if is_positive:
-                self.classification = 'ATOMIC LIMIT'
-            else:
-                self.classification = 'FRAGILE TOPOLOGICAL'
+        print('Calculating decomposition in terms of EBRs. '
+              'This can take some time...')
+        (self.ebr_decompositions,
+         is_positive,
+         self.ebr_decomposition_complete
+        ) = compute_ebr_decomposition(ebr_data, self.y, n_smallest=n_smallest, norm=norm,
+                                      time_limit=time_limit, num_workers=num_workers,
+                                      backend=backend)
+        self.classification = classify_decomposition(False, is_positive,
+                                                     self.ebr_decomposition_complete)
+        if not self.ebr_decomposition_complete:
+            print("WARNING: the time limit was reached before the search of "
+                  "EBR decompositions finished. Decompositions may be missing "
+                  "or not be the smallest ones.")
 
 
     def print_ebr_decomposition(self):
         r"""
-        Computes and prints the EBR decomposition information. If the bands are
-        trivial or fragile-topological, it tries to find EBR decompositions using
-        ORtools if installed.
+        Prints the EBR decomposition information computed by 
+        `compute_ebr_decomposition`. If the bands are trivial or 
+        fragile-topological, the EBR decompositions found are printed.
 
         Notes
         -----
@@ -1283,6 +1652,8 @@ class BandStructure:
         # General block printed always
         print("\n---------- EBR DECOMPOSITION ----------\n")
         print(f'Classification: {self.classification}')
+        if not self.ebr_decomposition_complete:
+            print("The search of EBR decompositions was stopped by the time limit.")
 
         try:
             irrep_counts = self.get_irrep_counts()
@@ -1304,17 +1675,18 @@ class BandStructure:
             f"\n\nNotation: EBR.x=y,  U.EBR.V=R,  y'=U.y"
         )
 
-        # If EBR decomposition wasn't computed because ortools isn't installed
+        # If no EBR decomposition was found within the time limit
         if (self.classification != 'STABLE TOPOLOGICAL' and
                 self.ebr_decompositions is None):
             print(
                 "There exists integer-valued solutions to the EBR decomposition "
                 "problem, so the set of bands is TRIVIAL or displays FRAGILE TOPOLOGY. "
-                "Install OR-Tools and compute decompositions again"
+                "No decomposition was found within the time limit, increase it "
+                "and compute decompositions again"
             )
 
         # If EBR decomposition was computed
-        elif self.classification in ['ATOMIC LIMIT', 'FRAGILE TOPOLOGIVAL']:
+        elif self.classification in ['ATOMIC LIMIT', 'FRAGILE TOPOLOGICAL', 'UNDETERMINED']:
             print('Printing EBR decompositions:')
             ebr_list = get_ebr_names_and_positions(ebr_data)
             for i, sol in enumerate(self.ebr_decompositions):
@@ -1324,7 +1696,9 @@ class BandStructure:
 
     def load_si_table(self):
         '''
-        Load table of symmetry indicators
+        Load table of symmetry indicators. If a table service is active 
+        (see :mod:`~irrep.table_service`), the table is read from shared 
+        memory.
 
         Returns
         -------
@@ -1332,6 +1706,11 @@ class BandStructure:
             Data loaded from the file of symmetry indicators
         '''
 
+        service = get_table_service()
+        if service is not None:
+            si_table = service.si_table(self.spinor, self.magnetic)
+            if si_table is not None:
+                return si_table
         root = os.path.dirname(__file__)
         filename = (
             f"{'double' if self.spinor else 'single'}_indicators"
@@ -19,6 +19,8 @@
 Defines the command line interface to "irrep".
 """
 
+import sys
+
 import numpy as np
 
 import click
@@ -121,6 +123,12 @@ do not hesitate to contact the author:
     help="Filename for wavefunction in ABINIT WFK format. "
     'Only used if code is "abinit".',
 )
+@click.option(
+    "-fIRREP",
+    type=str,
+    help="Filename written by 'irrep export'. "
+    'Only used if code is "irrep".',
+)
 @click.option(
     "-gpaw_calc",
     type=str,
@@ -153,10 +161,10 @@ do not hesitate to contact the author:
 )
 @click.option(
     "-code",
-    type=click.Choice(["vasp", "abinit", "espresso", "wannier90", "gpaw"]),
+    type=click.Choice(["vasp", "abinit", "espresso", "wannier90", "gpaw", "irrep"]),
     default="vasp",
     help="Set which electronic structure code to interface with. If using ABINIT, always use "
-    '"istwfk=1".',
+    '"istwfk=1". Use "irrep" to read a file written by \'irrep export\'.',
 )
 @click.option(
     "-spinor",
@@ -226,6 +234,14 @@ do not hesitate to contact the author:
 @click.option(
     "-WCC", flag_value=True, default=False, help="Calculate Wannier charge centres"
 )
+@click.option(
+    "-WCC_loops",
+    type=click.IntRange(1, 3),
+    default=None,
+    help="Calculate Wannier charge centres on every closed loop along the given "
+    "reciprocal lattice vector (1, 2 or 3) formed by the k-points, e.g. a grid "
+    "covering a plane of the BZ. Written to wcc-loops-<suffix>.dat",
+)
 @click.option(
     "-plotbands",
     flag_value=True,
@@ -332,11 +348,64 @@ do not hesitate to contact the author:
               help="Compute the EBR decomposition and topological classification "
               "according to TQC. Irreps must be identified in the process."
 )
+@click.option("--ebr-time-limit",
+              type=float,
+              default=None,
+              help="Maximal time (in seconds) spent searching EBR decompositions. "
+              "If reached, the decompositions found so far are reported as "
+              "incomplete. Default: no limit."
+)
+@click.option("--ebr-backend",
+              type=click.Choice(["auto", "cpsat", "scipy"]),
+              default="auto",
+              help="Solver of EBR decompositions: CP-SAT of OR-Tools, "
+              "scipy.optimize.milp, or auto to use OR-Tools if installed."
+)
+@click.option("--ebr-workers",
+              type=int,
+              default=8,
+              help="Number of parallel workers of the solver of EBR decompositions."
+)
+@click.option("-wf_cache",
+              type=click.Path(),
+              default=None,
+              help="Directory to cache the wave functions truncated to Ecut. "
+              "Later runs with the same input files, Ecut, IBstart and IBend "
+              "read the wave functions from the cache instead of parsing the "
+              "DFT files."
+)
+@click.option("-wf_cache_size",
+              type=float,
+              default=None,
+              help="Maximal size (in GB) of the cache directory. The least "
+              "recently used files are removed when exceeded. Default: no limit"
+)
+@click.option("-sg_cache",
+              type=click.Path(),
+              default=None,
+              help="Directory to cache the space group. Later runs with the "
+              "same structure, tolerances, refUC and shiftUC read the space "
+              "group and the transformation to the cell of the tables from "
+              "the cache instead of determining them again."
+)
+@click.option("-wf_memmap",
+              flag_value=True,
+              default=False,
+              help="Keep the wave functions needed by -isymsep in scratch "
+              "files mapped to memory, instead of in RAM."
+)
+@click.option("-scratch_dir",
+              type=click.Path(),
+              default=None,
+              help="Directory for the scratch files of -wf_memmap. "
+              "Default: the system directory for temporary files."
+)
 def cli(
     ecut,
     fwav,
     fpos,
     fwfk,
+    firrep,
     gpaw_calc,
     prefix,
     ibstart,
@@ -355,6 +424,7 @@ def cli(
     from_sym_file,
     zak,
     wcc,
+    wcc_loops,
     plotbands,
     ef,
     degenthresh,
@@ -372,7 +442,15 @@ def cli(
     unk_formatted,
     print_hs_kpoints,
     symmetry_indicators,
-    ebr_decomposition
+    ebr_decomposition,
+    ebr_time_limit,
+    ebr_backend,
+    ebr_workers,
+    wf_cache,
+    wf_cache_size,
+    sg_cache,
+    wf_memmap,
+    scratch_dir,
 ):
     """
     Defines the "irrep" command-line tool interface.
@@ -413,8 +491,9 @@ def cli(
     if kpnames:
         kpnames = kpnames.split(",")
 
-    # Decide if wave functions should be kept in memory after calculating trace
-    if isymsep or wcc or zak:
+    # Decide if wave functions should be kept in memory after calculating trace.
+    # Zak phases and Wilson loops read them again k-point by k-point
+    if isymsep:
         save_wf = True
     else:
         save_wf = False
@@ -448,6 +527,7 @@ def cli(
     bandstr = BandStructure(
         fWAV=fwav,
         fWFK=fwfk,
+        fIRREP=firrep,
         calculator_gpaw=gpaw_calc,
         prefix=prefix,
         fPOS=fpos,
@@ -472,6 +552,11 @@ def cli(
         from_sym_file=from_sym_file,
         include_TR=(magnetic_moments is not None),  # if magnetic, include TR
         irreps=True,  # always identify irreps when called from irrep code
+        wf_cache_dir=wf_cache,
+        wf_cache_max_size=wf_cache_size,
+        wf_memmap=wf_memmap,
+        scratch_dir=scratch_dir,
+        spacegroup_cache_dir=sg_cache,
     )
 
     bandstr.spacegroup.show()
@@ -500,7 +585,8 @@ def cli(
     bandstr.write_characters()
 
     if ebr_decomposition:
-        bandstr.compute_ebr_decomposition()
+        bandstr.compute_ebr_decomposition(time_limit=ebr_time_limit, num_workers=ebr_workers,
+                                          backend=ebr_backend)
         bandstr.print_ebr_decomposition()
 
     if symmetry_indicators:
@@ -578,6 +664,21 @@ def cli(
             print(f"symmetry eigenvalue : {k} \n  WCC are : {wcc_val} \n sumWCC={np.sum(wcc_val) % 1}")
         exit()
 
+    if wcc_loops is not None:
+        for k, sub in subbands.items():
+            loops, origins = sub.get_wilson_loops(direction=wcc_loops - 1)
+            wcc_val = sub.wcc_loops(loops)
+            if isymsep is not None:
+                fname = ("wcc-loops-" + suffix + "-" +
+                         "-".join(f"{s}:{short(ev)}" for s, ev in zip(isymsep, k)) +
+                         ".dat")
+            else:
+                fname = f"wcc-loops-{suffix}.dat"
+            print(f"Writing Wannier charge centres of {len(loops)} loops to {fname}")
+            np.savetxt(fname, np.hstack((origins, wcc_val)),
+                       header="origin of the loop (3 columns), Wannier charge centres")
+        exit()
+
     if plotbands:
         print("\nplotbands = True --> writing bands")
         for k, sub in subbands.items():
@@ -591,3 +692,83 @@ def cli(
             else:
                 fname = f"bands-{suffix}.dat"
             sub.write_plotfile(fname)
+
+
+@click.command(
+    cls=LoadContextFromConfig,
+    help="""
+Write the crystal structure and the wave functions truncated to the cutoff
+Ecut to a compact file, which can be analysed later with
+"irrep -code=irrep -fIRREP=<file>" instead of the original DFT files.
+
+\b
+Example:
+irrep export -code=espresso -prefix=Bi -Ecut=50 -IBend=20 -output=Bi-irrep.h5
+"""
+)
+@click.option("-Ecut", type=float,
+              help="Energy cut-off in eV to which the wave functions are truncated. "
+              "If not set, the cut-off of the DFT calculation is used.")
+@click.option("-fWAV", type=str, default="WAVECAR",
+              help='Filename for wavefunction in VASP WAVECAR format. Only used if code is "vasp".')
+@click.option("-fPOS", type=str, default="POSCAR",
+              help='Filename for wavefunction in VASP POSCAR format. Only used if code is "vasp".')
+@click.option("-fWFK", type=str,
+              help='Filename for wavefunction in ABINIT WFK format. Only used if code is "abinit".')
+@click.option("-prefix", type=str,
+              help="Prefix used for Quantum Espresso calculations (data should be in prefix.save) "
+              "or seedname of Wannier90 files.")
+@click.option("-IBstart", type=int, default=0,
+              help="The first band to be exported. If <= 0 starting from the lowest band (count from one).")
+@click.option("-IBend", type=int, default=0,
+              help="The last band to be exported. If <=0 up to  the highest band (count from one).")
+@click.option("-code", type=click.Choice(["vasp", "abinit", "espresso", "wannier90"]), default="vasp",
+              help="Set which electronic structure code to interface with.")
+@click.option("-spinor", flag_value=True, default=False,
+              help='Indicate the wavefunctions are spinor. Only used if code is "vasp".')
+@click.option("-kpoints", type=str,
+              help="Comma-separated list of k-point indices (starting from 1).")
+@click.option("-unk_formatted", flag_value=True, default=False,
+              help="expect UNK files to be formatted (only relevant when -code=wannier90 )")
+@click.option("-output", type=str, default="irrep-export.h5",
+              help="Name of the file to write. Default: irrep-export.h5")
+@click.option("-config", type=click.Path(),
+              help="Define inputs from a configuration file in YAML or JSON format.")
+@click.option("-v", count=True, default=1, help="Verbosity flag.")
+def export(ecut, fwav, fpos, fwfk, prefix, ibstart, ibend, code, spinor, kpoints,
+           unk_formatted, output, config, v):
+    """
+    Defines the "irrep export" command-line tool interface.
+    """
+    if kpoints:
+        kpoints = str2list(kpoints)
+    bandstr = BandStructure(
+        fWAV=fwav,
+        fWFK=fwfk,
+        prefix=prefix,
+        fPOS=fpos,
+        Ecut=ecut,
+        IBstart=ibstart,
+        IBend=ibend,
+        kplist=kpoints,
+        spinor=spinor,
+        code=code,
+        EF="auto",
+        normalize=False,
+        save_wf=True,
+        unk_formatted=unk_formatted,
+        verbosity=v,
+    )
+    bandstr.export(output)
+    log_message(f"{bandstr.num_k} k-points and {bandstr.num_bands} bands written to {output}", v, 1)
+
+
+def main():
+    """
+    Entry point of the "irrep" script. "irrep export ..." runs :func:`export`,
+    anything else runs :func:`cli`.
+    """
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        export(sys.argv[2:], prog_name="irrep export")
+    else:
+        cli()
@@ -1,8 +1,17 @@
 """Module to compute EBR decompositions.
 """
+import glob
 import numpy as np
 import os
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import h5py
+
+from .table_service import get_table_service
+from .utility import log_message
 
 # Actual EBR decomposition requires OR-Tool's SAT problem solver.
 try:
@@ -11,6 +20,20 @@ try:
 except ModuleNotFoundError:
     ORTOOLS_AVAILABLE = False
 
+# scipy.optimize.milp is the fallback if OR-Tools is not installed
+try:
+    from scipy.optimize import Bounds, LinearConstraint, milp
+    MILP_AVAILABLE = True
+except ImportError:
+    MILP_AVAILABLE = False
+
+EBR_DIR = os.path.join(os.path.dirname(__file__), "data", "ebrs")
+EBR_STORE = os.path.join(os.path.dirname(__file__), "data", "ebrs.h5")
+EBR_STORE_FORMAT = "irrep-ebrs"
+EBR_STORE_VERSION = 1
+
+_ebr_index_cache = {}
+
 
 def get_ebr_matrix(ebr_data):
     """
@@ -26,6 +49,9 @@ def get_ebr_matrix(ebr_data):
     array
         EBR matrix with dimensions Nirreps x Nebrs
     """
+    if "matrix" in ebr_data:
+        # the packed store keeps it as int8
+        return np.asarray(ebr_data["matrix"], dtype=int)
     ebr_matrix = np.array([x["vector"] for x in ebr_data["ebrs"]], dtype=int).T
 
     return ebr_matrix
@@ -56,9 +82,9 @@ def get_smith_form(ebr_data, return_all=True):
         EBR = U^{-1} \cdot R \cdot V^{-1}
     """
     # U^{-1}RV^{-1}
-    u = np.array(ebr_data["smith_form"]["u"], dtype=int)
-    v = np.array(ebr_data["smith_form"]["v"], dtype=int)
-    r = np.array(ebr_data["smith_form"]["r"], dtype=int)
+    u = np.asarray(ebr_data["smith_form"]["u"], dtype=int)
+    v = np.asarray(ebr_data["smith_form"]["v"], dtype=int)
+    r = np.asarray(ebr_data["smith_form"]["r"], dtype=int)
 
     if return_all:
         return u, r, v
@@ -161,17 +187,278 @@ def compute_topological_classification_vector(irrep_counts, ebr_data):
 
 
 
-def compute_ebr_decomposition(ebr_data, y):
-    from .or_solutions_obtainer import varArraySolutionObtainer
+def smith_parametrization(ebr_data, y):
+    r"""
+    Parametrize the integer solutions of :math:`EBR \cdot x = y` with the
+    Smith form of the EBR matrix. With :math:`y' = U \cdot y` and the
+    nonzero elementary divisors :math:`d_1, \dots, d_r`, the solutions are
+
+    .. math::
+
+        x = V \cdot (p, t) = x_0 + K \cdot t, \quad p_i = y'_i / d_i,
+
+    where :math:`t` runs over all integer vectors. They exist only if every
+    :math:`d_i` divides :math:`y'_i` and :math:`y'_i = 0` for :math:`i > r`.
+
+    Parameters
+    ----------
+    ebr_data : dict
+        Dictionary with EBR data loaded from the package files.
+    y : array
+        Symmetry vector.
+
+    Returns
+    -------
+    x0 : array(num_ebrs), dtype=int
+        Particular solution. `None` if there is no integer solution.
+    kernel : array(num_ebrs, num_ebrs - r), dtype=int
+        Basis of the integer kernel of the EBR matrix, given by the last
+        columns of :math:`V`. `None` if there is no integer solution.
+    coordinates : array(num_ebrs - r, num_ebrs), dtype=int
+        Last rows of :math:`V^{-1}`, which give the kernel coordinates of a
+        solution as `t = coordinates @ x`. `None` if there is no integer
+        solution.
+    """
+    u, r, v = get_smith_form(ebr_data)
+    d = r.diagonal()
+    rank = np.count_nonzero(d)
+    y_prime = u @ np.asarray(y, dtype=int)
+    if (y_prime[:rank] % d[:rank]).any() or y_prime[rank:].any():
+        return None, None, None
+    x0 = v[:, :rank] @ (y_prime[:rank] // d[:rank])
+    # V is unimodular, so its inverse is an integer matrix
+    v_inv = np.rint(np.linalg.inv(v)).astype(int)
+    return x0, v[:, rank:], v_inv[rank:]
+
+
+def _kernel_bounds(x0, kernel, coordinates, lower, upper):
+    """
+    Bounds of the kernel coordinates `t = coordinates @ x` of the solutions
+    `x = x0 + kernel @ t` with `lower <= x <= upper`.
+
+    Returns
+    -------
+    tuple of arrays
+        Lower and upper bounds of `t`. `None` if there is no solution within
+        the bounds.
+    """
+    if (lower > upper).any():
+        return None
+    if kernel.shape[1] == 0 and ((x0 < lower).any() or (x0 > upper).any()):
+        return None
+    t_lower = np.minimum(coordinates * lower, coordinates * upper).sum(axis=1)
+    t_upper = np.maximum(coordinates * lower, coordinates * upper).sum(axis=1)
+    return t_lower, t_upper
+
+
+def _cpsat_search(x0, kernel, t_bounds, x_bounds, norm, num_workers):
+    """
+    Build the CP-SAT model of the decomposition problem over the kernel
+    coordinates. The model is built once for the widest bounds, and each
+    search narrows the domains of the variables to its own bounds.
+
+    Returns
+    -------
+    function
+        `search(n_smallest, deadline, t_bounds, x_bounds)`, returning the
+        list of solutions found within the bounds and whether the search was
+        complete. Bounds must lie within those of the model.
+    """
+    n_ebr, dim = kernel.shape
+    model = cp_model.CpModel()
+    t = [model.NewIntVar(int(lo), int(hi), f"t{j}") for j, (lo, hi) in enumerate(zip(*t_bounds))]
+    x = []
+    for i, (lo, hi) in enumerate(zip(*x_bounds)):
+        xi = model.NewIntVar(int(lo), int(hi), f"x{i}")
+        model.Add(xi == int(x0[i]) + sum(int(kernel[i, j]) * t[j]
+                                          for j in range(dim) if kernel[i, j] != 0))
+        x.append(xi)
+    terms = []
+    for i, xi in enumerate(x):
+        bound = int(max(abs(x_bounds[0][i]), abs(x_bounds[1][i])))
+        if norm == "L1":
+            ti = model.NewIntVar(0, bound, f"a{i}")
+            model.AddAbsEquality(ti, xi)
+        else:
+            ti = model.NewIntVar(0, bound**2, f"s{i}")
+            model.AddMultiplicationEquality(ti, [xi, xi])
+        terms.append(ti)
+    model.Minimize(sum(terms))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = num_workers
+
+    def set_domains(variables, bounds):
+        for var, lo, hi in zip(variables, *bounds):
+            domain = model.Proto().variables[var.Index()].domain
+            domain[0] = int(lo)
+            domain[1] = int(hi)
+
+    def search(n_smallest, deadline, t_bounds, x_bounds):
+        # the solutions excluded by a previous search stay excluded, which
+        # is fine as long as a later search runs only if the previous one
+        # found nothing
+        set_domains(t, t_bounds)
+        set_domains(x, x_bounds)
+        solutions = []
+        complete = True
+        while len(solutions) < n_smallest:
+            if deadline is not None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return solutions, False
+                solver.parameters.max_time_in_seconds = remaining
+            status = solver.Solve(model)
+            if status == cp_model.INFEASIBLE:
+                break
+            if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                return solutions, False
+            if status == cp_model.FEASIBLE:  # time limit reached before proving optimality
+                complete = False
+            solutions.append([solver.Value(xi) for xi in x])
+            # exclude this solution: at least one kernel coordinate has to differ
+            differ = []
+            for tj in t:
+                value = solver.Value(tj)
+                d = model.NewBoolVar("")
+                model.Add(tj != value).OnlyEnforceIf(d)
+                differ.append(d)
+            model.AddBoolOr(differ)
+        return solutions, complete
+
+    return search
+
+
+def _milp_search(x0, kernel, t_bounds, x_bounds, norm):
+    """
+    Build the decomposition problem over the kernel coordinates as a
+    mixed-integer linear program for :func:`scipy.optimize.milp`. Only the
+    L1 norm can be minimized.
+
+    Returns
+    -------
+    function
+        `search(n_smallest, deadline)`, returning the list of solutions found
+        and whether the search was complete.
+    """
+    if norm != "L1":
+        raise ValueError("The 'scipy' backend can only minimize the L1 norm")
+    n_ebr, dim = kernel.shape
+    t_lower, t_upper = t_bounds
+    x_lower, x_upper = x_bounds
+    nonnegative = (x_lower >= 0).all()
+    M = t_upper - t_lower + 1
+
+    def solutions_x(solutions):
+        return [[int(v) for v in x0 + kernel @ s] for s in solutions]
+
+    def search(n_smallest, deadline):
+        solutions = []
+        complete = True
+        while len(solutions) < n_smallest:
+            # variables: t, then a >= |x| (unless x is nonnegative), then a
+            # pair of binaries (u, w) per excluded solution s, forcing
+            # t_j > s_j or t_j < s_j for at least one j
+            n_abs = 0 if nonnegative else n_ebr
+            n_cut = 2 * dim * len(solutions)
+            n_var = dim + n_abs + n_cut
+            c = np.zeros(n_var)
+            if nonnegative:
+                c[:dim] = kernel.sum(axis=0)
+            else:
+                c[dim:dim + n_ebr] = 1
+            lower = np.zeros(n_var)
+            upper = np.ones(n_var)
+            lower[:dim] = t_lower
+            upper[:dim] = t_upper
+            lower[dim:dim + n_abs] = 0
+            upper[dim:dim + n_abs] = np.inf
+            rows = np.zeros((n_ebr, n_var))
+            rows[:, :dim] = kernel
+            constraints = [LinearConstraint(rows, x_lower - x0, x_upper - x0)]
+            if not nonnegative:
+                # a - x >= 0 and a + x >= 0
+                rows = np.zeros((2 * n_ebr, n_var))
+                rows[:n_ebr, :dim] = -kernel
+                rows[n_ebr:, :dim] = kernel
+                rows[:n_ebr, dim:dim + n_ebr] = np.eye(n_ebr)
+                rows[n_ebr:, dim:dim + n_ebr] = np.eye(n_ebr)
+                constraints.append(LinearConstraint(rows, np.hstack([x0, -x0]), np.inf))
+            eye = np.eye(dim)
+            for k, s in enumerate(solutions):
+                u = dim + n_abs + 2 * dim * k
+                w = u + dim
+                # t_j - s_j >= 1 - M_j (1 - u_j)  and  s_j - t_j >= 1 - M_j (1 - w_j)
+                rows = np.zeros((2 * dim + 1, n_var))
+                rows[:dim, :dim] = eye
+                rows[:dim, u:u + dim] = -M * eye
+                rows[dim:2 * dim, :dim] = -eye
+                rows[dim:2 * dim, w:w + dim] = -M * eye
+                rows[-1, u:w + dim] = 1
+                lb = np.hstack([s + 1 - M, -s + 1 - M, [1]])
+                constraints.append(LinearConstraint(rows, lb, np.inf))
+            options = {}
+            if deadline is not None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return solutions_x(solutions), False
+                options["time_limit"] = remaining
+            res = milp(c, integrality=np.ones(n_var), bounds=Bounds(lower, upper),
+                       constraints=constraints, options=options)
+            if res.status == 2:  # infeasible
+                break
+            if res.x is None:
+                return solutions_x(solutions), False
+            if res.status != 0:  # time limit reached before proving optimality
+                complete = False
+            solutions.append(np.round(res.x[:dim]).astype(int))
+        return solutions_x(solutions), complete
+
+    return search
+
+
+def compute_ebr_decomposition(ebr_data, y, n_smallest=5, bound=50, norm="L1",
+                              time_limit=None, num_workers=8, backend="auto"):
     r"""
     Compute the decomposition of the symmetry vector into EBRs
 
+    The integer solutions of :math:`EBR \cdot x = y` are parametrized with
+    the Smith form of the EBR matrix as :math:`x = x_0 + K \cdot t` (see
+    :func:`smith_parametrization`), so that the search runs over the kernel
+    coordinates :math:`t` only, within bounds derived from the bounds of
+    :math:`x`. If the Smith form shows that there is no integer solution,
+    no search is needed.
+
+    The decompositions are found as solutions of an optimization problem:
+    the norm of the vector of coefficients is minimized, and each solution
+    found is excluded from the following searches, so that they are
+    obtained in order of increasing norm. First, only nonnegative
+    coefficients are allowed, which bounds each of them by the
+    multiplicities in `y`. If there is no such solution, the search is
+    repeated allowing negative coefficients.
+
     Parameters
     ----------
     ebr_data : dict
         Dictionary with EBR data loaded from the package files.
     y : array
         symmetry vector
+    n_smallest : int, default=5
+        Maximal number of solutions returned.
+    bound : int, default=50
+        Maximal absolute value of the coefficients of EBRs when negative
+        coefficients are allowed.
+    norm : str, default='L1'
+        Norm minimized, 'L1' or 'L2'. The 'scipy' backend supports only 'L1'.
+    time_limit : float, default=None
+        Maximal time (in seconds) spent by the solver over all searches. If
+        `None`, there is no limit.
+    num_workers : int, default=8
+        Number of parallel workers of the CP-SAT solver.
+    backend : str, default='auto'
+        'cpsat' for the CP-SAT solver of OR-Tools, 'scipy' for
+        :func:`scipy.optimize.milp`. 'auto' selects 'cpsat' if OR-Tools is
+        installed and 'scipy' otherwise.
 
     Returns
     -------
@@ -181,6 +468,10 @@ def compute_ebr_decomposition(ebr_data, y):
     is_positive : bool
         Whether solutions involve only positive coefficients of EBRs. If no 
         solution was found, it is also returns `False`
+    complete : bool
+        `False` if the time limit was reached before all searches finished.
+        Then, some solutions may be missing or not be the smallest ones, and
+        if none was found, the decomposition may still exist.
 
     Notes
     -----
@@ -195,69 +486,239 @@ def compute_ebr_decomposition(ebr_data, y):
         y' = U \cdot y.
     """
 
-    def get_solutions(bounds=(0, 15), n_smallest=5):
-        """
-        Solve the decomposition problem with some coefficient bounds and return
-        some solutions, starting by the combinations with smallest coefficients
-
-        Parameters
-        ----------
-        bounds : tuple, optional
-            bounds for the coefficients, by default (0,15)
-        n_smallest : int, optional
-            how many solutions to, by default 5
+    if norm not in ("L1", "L2"):
+        raise ValueError(f"Unknown norm '{norm}', use 'L1' or 'L2'")
+    if backend == "auto":
+        backend = "cpsat" if ORTOOLS_AVAILABLE else "scipy"
+    if backend == "cpsat":
+        if not ORTOOLS_AVAILABLE:
+            raise RuntimeError("OR-Tools is not installed, use the 'scipy' backend")
+    elif backend == "scipy":
+        if not MILP_AVAILABLE:
+            raise RuntimeError("The 'scipy' backend requires scipy>=1.9")
+        if norm != "L1":
+            raise ValueError("The 'scipy' backend can only minimize the L1 norm")
+    else:
+        raise ValueError(f"Unknown backend '{backend}', use 'auto', 'cpsat' or 'scipy'")
 
-        Returns
-        -------
-        list    
-            list of solutions in form of lists of integers
-        str
-            status of the search of solutions
-        """
+    EBR = get_ebr_matrix(ebr_data)
+    y = np.asarray(y, dtype=int)
+    x0, kernel, coordinates = smith_parametrization(ebr_data, y)
+    if x0 is None:
+        return None, False, True
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    signed_bounds = (np.full(len(x0), -bound), np.full(len(x0), bound))
+    cpsat_run = None
+
+    def search(x_lower, x_upper):
+        nonlocal cpsat_run
+        t_bounds = _kernel_bounds(x0, kernel, coordinates, x_lower, x_upper)
+        if t_bounds is None:
+            return [], True
+        if kernel.shape[1] == 0:  # the solution is unique
+            return [x0.tolist()], True
+        if backend == "cpsat":
+            # one model for both searches, built for the signed bounds,
+            # which contain the positive ones
+            if cpsat_run is None:
+                cpsat_run = _cpsat_search(
+                    x0, kernel, _kernel_bounds(x0, kernel, coordinates, *signed_bounds),
+                    signed_bounds, norm, num_workers)
+            return cpsat_run(n_smallest, deadline, t_bounds, (x_lower, x_upper))
+        run = _milp_search(x0, kernel, t_bounds, (x_lower, x_upper), norm)
+        return run(n_smallest, deadline)
+
+    # first check positive coefficients only. Since EBR matrices are
+    # nonnegative, each coefficient is bounded by the multiplicities of the
+    # irreps in its EBR
+    x_upper = np.array([(y[col > 0] // col[col > 0]).min(initial=bound) for col in EBR.T])
+    solutions, complete = search(np.zeros(len(x0), dtype=int), x_upper)
+    if len(solutions) > 0:
+        return solutions, True, complete
+
+    # try with negative solutions, if none is found something's wrong
+    solutions, complete_signed = search(*signed_bounds)
+    complete = complete and complete_signed
+    if len(solutions) > 0:
+        return solutions, False, complete
+    return None, False, complete
+
+
+def classify_decomposition(nontrivial, is_positive, complete):
+    """
+    Topological classification of a set of bands from the results of
+    :func:`compute_topological_classification_vector` and
+    :func:`compute_ebr_decomposition`.
 
-        lb, ub = bounds
-        model = cp_model.CpModel()
-        solver = cp_model.CpSolver()
+    Parameters
+    ----------
+    nontrivial : bool
+        Whether :math:`y'` shows a stable topological phase.
+    is_positive : bool
+        Whether a decomposition with nonnegative coefficients was found.
+    complete : bool
+        Whether the search of decompositions finished.
 
-        # Add the coefficients of EBRs as variables
-        x = [model.NewIntVar(lb, ub, f"x{i}") for i in range(n_ebr)]
+    Returns
+    -------
+    str
+        'STABLE TOPOLOGICAL', 'ATOMIC LIMIT', 'FRAGILE TOPOLOGICAL' or
+        'UNDETERMINED' if the time limit was reached before a decomposition
+        with nonnegative coefficients was found.
+    """
+    if nontrivial:
+        return 'STABLE TOPOLOGICAL'
+    if is_positive:
+        return 'ATOMIC LIMIT'
+    if complete:
+        return 'FRAGILE TOPOLOGICAL'
+    return 'UNDETERMINED'
 
-        # Construct a callback that will be called each time a new solution is
-        # found
-        solution_obtainer = varArraySolutionObtainer(x)
 
-        # Add constraint: multiplicities of irreps in the solution must match
-        # the multiplicities in the symmetry-data vector y
-        for i in range(n_ir):
-            model.Add(EBR[i] @ x == y[i])
+# results of classify_batch, with keys (sg_number, spinor, y, n_smallest, norm)
+_classification_cache = {}
 
-        solver.SearchForAllSolutions(model, solution_obtainer)
 
-        return solution_obtainer.n_smallest_solutions(n_smallest), solver.status_name()
+def _decompose_in_worker(sg_number, spinor, y, kwargs):
+    """Solve one decomposition in a process of the pool of :func:`classify_batch`."""
+    return compute_ebr_decomposition(load_ebr_data(sg_number, spinor), y, **kwargs)
 
-    EBR = get_ebr_matrix(ebr_data)
 
-    n_ir, n_ebr = EBR.shape
-
-    # first check positive coefficients only
-    is_positive = True
-    solutions, status = get_solutions(bounds=(0, 50))
+def classify_batch(sg_number, spinor, Y, n_smallest=5, norm="L1", time_limit=None,
+                   backend="auto", num_processes=None):
+    r"""
+    Classify many sets of bands of the same space group. The vectors
+    :math:`y'` and the test of stable topology are computed for all symmetry
+    vectors at once, identical vectors are classified once, and the
+    decompositions into EBRs are solved in a pool of processes. Results of
+    complete searches are kept for the rest of the process and reused in
+    later calls.
 
-    # if positive solutions were not found
-    if status not in ["OPTIMAL", "FEASIBLE"]:
-        is_positive = False
+    Parameters
+    ----------
+    sg_number : str
+        Number of the (magnetic) space group.
+    spinor : bool
+        Whether the wave functions are spinors.
+    Y : array(num_vectors, num_irreps)
+        Symmetry vectors, with multiplicities of irreps sorted as in the
+        tables of EBRs, see :func:`create_symmetry_vector`.
+    n_smallest : int, default=5
+        Maximal number of decompositions computed for each vector.
+    norm : str, default='L1'
+        Norm minimized, see :func:`compute_ebr_decomposition`.
+    time_limit : float, default=None
+        Maximal time (in seconds) spent searching the decompositions of each
+        vector. If `None`, there is no limit.
+    backend : str, default='auto'
+        Solver, see :func:`compute_ebr_decomposition`.
+    num_processes : int, default=None
+        Number of processes solving decompositions. If `None`, the number of
+        CPUs. With 1, or if a single decomposition is needed, they are
+        solved in the calling process.
 
-        # try with negative solutions
-        solutions, status = get_solutions(bounds=(-50, 50))
+    Returns
+    -------
+    list of dict
+        For each row of `Y`, a dict with the keys 'classification', 'y',
+        'y_prime', 'solutions' and 'complete', as set by
+        :meth:`BandStructure.compute_ebr_decomposition`.
+    """
+    ebr_data = load_ebr_data(sg_number, spinor)
+    Y = np.atleast_2d(np.asarray(Y, dtype=int))
+    num_irreps = len(ebr_data["basis"]["irrep_labels"])
+    if Y.ndim != 2 or Y.shape[1] != num_irreps:
+        raise ValueError(f"Symmetry vectors of group {sg_number} should have {num_irreps} "
+                         f"components, got an array of shape {Y.shape}")
+    Y_unique, inverse = np.unique(Y, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
 
-        # if negative solutions are not found, something's wrong
-        if status not in ["OPTIMAL", "FEASIBLE"]:
-            return None, is_positive
-        # else return negative + positive solutions
+    u, r, _ = get_smith_form(ebr_data)
+    d = r.diagonal()
+    d_pos = d[d > 0]
+    Y_prime = Y_unique @ u.T
+    nontrivial = (Y_prime[:, :len(d_pos)] % d_pos != 0).any(axis=1)
+
+    results = [None] * len(Y_unique)
+    keys = [(sg_number, spinor, tuple(y), n_smallest, norm) for y in Y_unique.tolist()]
+    pending = []
+    for i, key in enumerate(keys):
+        if nontrivial[i]:
+            results[i] = (None, False, True)
+        elif key in _classification_cache:
+            results[i] = _classification_cache[key]
         else:
-            return solutions, is_positive
+            pending.append(i)
+
+    kwargs = dict(n_smallest=n_smallest, norm=norm, time_limit=time_limit, backend=backend)
+    if num_processes is None:
+        num_processes = os.cpu_count() or 1
+    if num_processes == 1 or len(pending) <= 1:
+        for i in pending:
+            results[i] = compute_ebr_decomposition(ebr_data, Y_unique[i], **kwargs)
     else:
-        return solutions, is_positive
+        # each process runs a single-threaded solver
+        kwargs["num_workers"] = 1
+        with ProcessPoolExecutor(max_workers=min(num_processes, len(pending))) as executor:
+            futures = {i: executor.submit(_decompose_in_worker, sg_number, spinor, Y_unique[i], kwargs)
+                       for i in pending}
+            for i, future in futures.items():
+                results[i] = future.result()
+    for i in pending:
+        if results[i][2]:  # incomplete searches may succeed with more time
+            _classification_cache[keys[i]] = results[i]
+
+    classified = []
+    for i in inverse:
+        solutions, is_positive, complete = results[i]
+        classified.append(dict(
+            classification=classify_decomposition(nontrivial[i], is_positive, complete),
+            y=Y_unique[i],
+            y_prime=Y_prime[i],
+            solutions=solutions,
+            complete=complete,
+        ))
+    return classified
+
+
+def benchmark_ebr_backends(numbers=("2", "47", "191", "221", "229"), n_smallest=5, seed=0):
+    """
+    Compare the time needed by the backends of
+    :func:`compute_ebr_decomposition` to decompose random symmetry vectors
+    of atomic insulators.
+
+    Parameters
+    ----------
+    numbers : tuple of str
+        Numbers of the space groups.
+    n_smallest : int, default=5
+        Number of solutions computed.
+    seed : int, default=0
+        Seed of the random coefficients of EBRs.
+
+    Returns
+    -------
+    dict
+        Keys are `(number, spinor)`, values are dicts with the time (in
+        seconds) taken by each available backend.
+    """
+    rng = np.random.default_rng(seed)
+    backends = [b for b, available in (("cpsat", ORTOOLS_AVAILABLE), ("scipy", MILP_AVAILABLE))
+                if available]
+    times = {}
+    for number in numbers:
+        for spinor in (False, True):
+            ebr_data = load_ebr_data(number, spinor)
+            EBR = get_ebr_matrix(ebr_data)
+            y = EBR @ rng.integers(0, 3, EBR.shape[1])
+            times[number, spinor] = {}
+            for backend in backends:
+                t0 = time.perf_counter()
+                compute_ebr_decomposition(ebr_data, y, n_smallest=n_smallest, backend=backend)
+                times[number, spinor][backend] = time.perf_counter() - t0
+            print(f"{number:>8} {'double' if spinor else 'single'}  " +
+                  "  ".join(f"{b}: {t:8.3f} s" for b, t in times[number, spinor].items()))
+    return times
 
 
 def compose_irrep_string(irrep_counts):
@@ -308,13 +769,287 @@ def compose_ebr_string(vec, ebrs):
     return s
 
 
+def ebr_group_numbers():
+    """
+    List the (magnetic) space groups with EBR data.
+
+    Returns
+    -------
+    list of str
+        Numbers of the groups.
+    """
+    if os.path.exists(EBR_STORE):
+        return list(dict.fromkeys(key.split("/")[0] for key in _read_ebr_index(EBR_STORE)[0]))
+    return sorted(os.path.basename(filename)[:-len("_ebrs.json")]
+                  for filename in glob.glob(os.path.join(EBR_DIR, "*_ebrs.json")))
+
+
+def _ebr_kind(spinor):
+    return "double" if spinor else "single"
+
+
+def _read_ebr_json(sg_number, spinor):
+    """Read the EBR data of a group from its JSON file."""
+    with open(os.path.join(EBR_DIR, f"{sg_number}_ebrs.json"), "r") as f:
+        ebr_data = json.load(f)[_ebr_kind(spinor)]
+    for ebr in ebr_data["ebrs"]:
+        # a few files label the Wyckoff position as 'wps'
+        if "wps" in ebr:
+            ebr["wyckoff_position"] = ebr.pop("wps")
+    return ebr_data
+
+
+# columns of the index of the packed store: the number of irreps and EBRs
+# of each group, from which the offsets of its data in the flat arrays follow
+_EBR_FLAT_ARRAYS = dict(
+    irrep_labels="labels", degeneracies="labels",
+    ebr_name="ebrs", wyckoff_position="ebrs", irrep_list_count="ebrs",
+    irrep_list="irrep_list",
+    matrix="irreps_x_ebrs", r="irreps_x_ebrs", u="irreps_x_irreps", v="ebrs_x_ebrs",
+)
+
+
+def pack_ebr_arrays(numbers, read=None, verbosity=0):
+    """
+    Concatenate the EBR data of groups into the flat arrays of the packed
+    store (see :func:`pack_ebr_data`).
+
+    Parameters
+    ----------
+    numbers : list of str
+        Numbers of the (magnetic) space groups.
+    read : function, default=None
+        Function `read(sg_number, spinor)` returning the EBR data of a
+        group. If `None`, the data is read as in :func:`load_ebr_data`,
+        but not kept.
+    verbosity : int, default=0
+        Verbosity level.
+
+    Returns
+    -------
+    keys : list of str
+        Keys `'<number>/<single|double>'` of the groups, in the order of
+        the arrays.
+    index : dict
+        Number of irreps, EBRs and irreps in the lists of EBRs of each
+        group, as arrays of dtype int32.
+    data : dict
+        Flat arrays, see :func:`ebr_group_from_arrays`.
+    """
+    if read is None:
+        read = _read_ebr_file
+    keys = []
+    index = dict(num_irreps=[], num_ebrs=[], irrep_list_length=[])
+    data = {name: [] for name in _EBR_FLAT_ARRAYS}
+    for number in numbers:
+        log_message(f"packing EBRs of group {number}", verbosity, 2)
+        for spinor in (False, True):
+            ebr_data = read(number, spinor)
+            labels = ebr_data["basis"]["irrep_labels"]
+            positions = {label: i for i, label in enumerate(labels)}
+            num_irreps, num_ebrs = len(labels), len(ebr_data["ebrs"])
+            irrep_list = [positions[label] for ebr in ebr_data["ebrs"] for label in ebr["irrep_list"]]
+            keys.append(f"{number}/{_ebr_kind(spinor)}")
+            index["num_irreps"].append(num_irreps)
+            index["num_ebrs"].append(num_ebrs)
+            index["irrep_list_length"].append(len(irrep_list))
+            data["irrep_labels"] += labels
+            data["degeneracies"] += list(ebr_data["basis"]["degeneracies"])
+            data["ebr_name"] += [ebr["ebr_name"] for ebr in ebr_data["ebrs"]]
+            data["wyckoff_position"] += [ebr["wyckoff_position"] for ebr in ebr_data["ebrs"]]
+            data["irrep_list_count"] += [len(ebr["irrep_list"]) for ebr in ebr_data["ebrs"]]
+            data["irrep_list"] += irrep_list
+            data["matrix"].append(np.reshape(get_ebr_matrix(ebr_data), (num_irreps, num_ebrs)).flatten())
+            for key, shape in (("u", (num_irreps, num_irreps)), ("r", (num_irreps, num_ebrs)),
+                               ("v", (num_ebrs, num_ebrs))):
+                data[key].append(np.array(ebr_data["smith_form"][key], dtype=int).reshape(shape).flatten())
+    index = {name: np.array(values, dtype=np.int32) for name, values in index.items()}
+    for name, values in data.items():
+        if name in ("irrep_labels", "ebr_name", "wyckoff_position"):
+            data[name] = np.array([x.encode() for x in values], dtype=bytes)
+        elif name in ("matrix", "u", "r", "v"):
+            data[name] = np.concatenate(values + [np.zeros(0, dtype=int)]).astype(
+                np.int8 if name == "matrix" else np.int16)
+        else:
+            data[name] = np.array(values, dtype=np.int16)
+    return keys, index, data
+
+
+def ebr_offsets(num_irreps, num_ebrs, irrep_list_length):
+    """
+    Offsets of the data of each group in the flat arrays of the packed
+    store.
+
+    Parameters
+    ----------
+    num_irreps, num_ebrs, irrep_list_length : array(int)
+        Arrays `index` returned by :func:`pack_ebr_arrays`.
+
+    Returns
+    -------
+    dict
+        For each kind of size in `_EBR_FLAT_ARRAYS`, an array with the
+        offset of each group, followed by the total length.
+    """
+    num_irreps = np.asarray(num_irreps, dtype=int)
+    num_ebrs = np.asarray(num_ebrs, dtype=int)
+    sizes = dict(labels=num_irreps, ebrs=num_ebrs,
+                 irrep_list=np.asarray(irrep_list_length, dtype=int),
+                 irreps_x_ebrs=num_irreps * num_ebrs,
+                 irreps_x_irreps=num_irreps**2,
+                 ebrs_x_ebrs=num_ebrs**2)
+    return {name: np.cumsum(np.hstack(([0], size))).astype(int) for name, size in sizes.items()}
+
+
+def ebr_group_from_arrays(i, num_irreps, num_ebrs, offsets, flat_arrays):
+    """
+    EBR data of a group in the flat arrays of the packed store. The EBR
+    matrix and the matrices of the Smith form are views of the flat arrays
+    (dtypes int8 and int16), the rest is converted to the form of the JSON
+    files.
+
+    Parameters
+    ----------
+    i : int
+        Position of the group in the arrays.
+    num_irreps, num_ebrs : array(int)
+        Number of irreps and EBRs of each group.
+    offsets : dict
+        Returned by :func:`ebr_offsets`.
+    flat_arrays : dict
+        Flat arrays, see :func:`pack_ebr_arrays`.
+
+    Returns
+    -------
+    dict
+        EBR data.
+    """
+    n_ir, n_ebr = int(num_irreps[i]), int(num_ebrs[i])
+    arrays = {name: flat_arrays[name][offsets[size][i]:offsets[size][i + 1]]
+              for name, size in _EBR_FLAT_ARRAYS.items()}
+    labels = [x.decode() for x in arrays["irrep_labels"]]
+    matrix = arrays["matrix"].reshape(n_ir, n_ebr)
+    bounds = np.cumsum(np.hstack(([0], arrays["irrep_list_count"].astype(int))))
+    ebrs = [dict(wyckoff_position=wp.decode(),
+                 ebr_name=name.decode(),
+                 irrep_list=[labels[k] for k in arrays["irrep_list"][bounds[j]:bounds[j + 1]]],
+                 vector=matrix[:, j].astype(float).tolist())
+            for j, (wp, name) in enumerate(zip(arrays["wyckoff_position"], arrays["ebr_name"]))]
+    return dict(basis=dict(irrep_labels=labels,
+                           degeneracies=arrays["degeneracies"].astype(int).tolist()),
+                ebrs=ebrs,
+                smith_form=dict(u=arrays["u"].reshape(n_ir, n_ir),
+                                r=arrays["r"].reshape(n_ir, n_ebr),
+                                v=arrays["v"].reshape(n_ebr, n_ebr)),
+                matrix=matrix)
+
+
+def pack_ebr_data(filename=None, verbosity=0):
+    """
+    Convert the JSON files of EBRs into the packed store. The data of all
+    (magnetic) space groups is concatenated into a few arrays of an HDF5
+    file, stored uncompressed so that they are memory-mapped: the EBR matrices and the matrices of the Smith form as
+    integers, and the labels of EBRs in terms of indices of the basis of
+    irreps. An index gives the number of irreps and EBRs of each group, from
+    which the position of its data is obtained. The store is not tracked
+    in git: it is built by the `build_py` step of `setup.py` (or with
+    `python -m irrep.ebrs` in a source checkout), and the JSON files are
+    read where it is missing.
+
+    Parameters
+    ----------
+    filename : str, default=None
+        Name of the store. If `None`, it is written where
+        :func:`load_ebr_data` looks for it.
+    verbosity : int, default=0
+        Verbosity level.
+
+    Returns
+    -------
+    str
+        Name of the store.
+    """
+    if filename is None:
+        filename = EBR_STORE
+    numbers = sorted(os.path.basename(f)[:-len("_ebrs.json")]
+                     for f in glob.glob(os.path.join(EBR_DIR, "*_ebrs.json")))
+    keys, index, data = pack_ebr_arrays(numbers, read=_read_ebr_json, verbosity=verbosity)
+
+    with h5py.File(filename, "w") as f:
+        f.attrs["format"] = EBR_STORE_FORMAT
+        f.attrs["version"] = EBR_STORE_VERSION
+        f.create_dataset("index_key", data=np.array([key.encode() for key in keys]))
+        for name, values in index.items():
+            f.create_dataset("index_" + name, data=values)
+        for name, values in data.items():
+            # contiguous and uncompressed, so that the data can be memory-mapped
+            f.create_dataset(name, data=values)
+    _ebr_index_cache.pop(os.path.abspath(filename), None)
+    log_message(f"EBRs of {len(numbers)} groups written to {filename}", verbosity, 1)
+    return filename
+
+
+def _read_ebr_index(filename):
+    """
+    Read the index of the packed store, compute the offsets of the data of
+    each group and memory-map the flat arrays. Kept until the file is
+    modified.
+    """
+    path = os.path.abspath(filename)
+    mtime = os.path.getmtime(path)
+    cached = _ebr_index_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with h5py.File(path, "r") as f:
+            if f.attrs.get("format") != EBR_STORE_FORMAT or f.attrs.get("version") != EBR_STORE_VERSION:
+                raise RuntimeError(f"{filename} is not a store of EBRs, version {EBR_STORE_VERSION}")
+            keys = [key.decode() for key in f["index_key"][()]]
+            num_irreps = f["index_num_irreps"][()].astype(int)
+            num_ebrs = f["index_num_ebrs"][()].astype(int)
+            offsets = ebr_offsets(num_irreps, num_ebrs, f["index_irrep_list_length"][()])
+            arrays = {}
+            for name in _EBR_FLAT_ARRAYS:
+                dataset = f[name]
+                if dataset.id.get_offset() is None:  # empty dataset, no storage allocated
+                    arrays[name] = dataset[()]
+                else:
+                    arrays[name] = np.memmap(path, dtype=dataset.dtype, mode="r",
+                                             offset=dataset.id.get_offset(), shape=dataset.shape)
+        positions = {key: i for i, key in enumerate(keys)}
+        cached = (mtime, positions, num_irreps, num_ebrs, offsets, arrays)
+        _ebr_index_cache[path] = cached
+    return cached[1:]
+
+
+def _read_ebr_store(sg_number, spinor, filename=None):
+    """Read the EBR data of a group from the packed store."""
+    if filename is None:
+        filename = EBR_STORE
+    positions, num_irreps, num_ebrs, offsets, flat_arrays = _read_ebr_index(filename)
+    key = f"{sg_number}/{_ebr_kind(spinor)}"
+    if key not in positions:
+        raise FileNotFoundError(f"No EBR data for group {sg_number} in {filename}")
+    return ebr_group_from_arrays(positions[key], num_irreps, num_ebrs, offsets, flat_arrays)
+
+
+def _read_ebr_file(sg_number, spinor):
+    """Read the EBR data of a group from the packed store if it exists, otherwise from the JSON file."""
+    if os.path.exists(EBR_STORE):
+        return _read_ebr_store(sg_number, spinor)
+    return _read_ebr_json(sg_number, spinor)
+
+
+@lru_cache(maxsize=None)
 def load_ebr_data(sg_number, spinor):
     '''
-    Load data from file of EBRs
+    Load data of EBRs of a group. It is read from the packed store if it
+    exists (see :func:`pack_ebr_data`), otherwise from the JSON file of the
+    group. If a table service is active (see :mod:`~irrep.table_service`),
+    the data is read from shared memory. The data is kept for the rest of
+    the process and should not be modified.
 
     Parameters
     ----------
-    sg_number : int
+    sg_number : str
         Number of the space group
     spinor : bool
         Whether wave functions are spinors (SOC) or not
@@ -322,11 +1057,57 @@ def load_ebr_data(sg_number, spinor):
     Returns
     -------
     dict
-        EBR data
+        EBR data. Besides the content of the files, the key `matrix` holds
+        the EBR matrix and the matrices of the Smith form are integer arrays
+        (views of the packed store, of dtypes int8 and int16, when read
+        from it). Use :func:`get_ebr_matrix` and :func:`get_smith_form` to
+        get them as arrays of dtype int.
     '''
 
-    root = os.path.dirname(__file__)
-    filename = f"{sg_number}_ebrs.json"
-    ebr_data = json.load(open(root + "/data/ebrs/" + filename, 'r'))
-    ebr_data = ebr_data["double" if spinor else "single"]
+    ebr_data = None
+    service = get_table_service()
+    if service is not None:
+        ebr_data = service.ebr_data(sg_number, spinor)
+    if ebr_data is None:
+        ebr_data = _read_ebr_file(sg_number, spinor)
+    num_irreps, num_ebrs = len(ebr_data["basis"]["irrep_labels"]), len(ebr_data["ebrs"])
+    if "matrix" not in ebr_data:
+        ebr_data["matrix"] = get_ebr_matrix(ebr_data).reshape(num_irreps, num_ebrs)
+    # groups with a single EBR have squeezed matrices in the JSON files
+    for key, shape in (("u", (num_irreps, num_irreps)), ("r", (num_irreps, num_ebrs)),
+                       ("v", (num_ebrs, num_ebrs))):
+        matrix = ebr_data["smith_form"][key]
+        if not (isinstance(matrix, np.ndarray) and matrix.shape == shape):
+            ebr_data["smith_form"][key] = np.array(matrix, dtype=int).reshape(shape)
+    for array in list(ebr_data["smith_form"].values()) + [ebr_data["matrix"]]:
+        array.flags.writeable = False
     return ebr_data
+
+
+def ebr_data_to_json(ebr_data):
+    """
+    Convert EBR data returned by :func:`load_ebr_data` to the form of the
+    JSON files.
+
+    Parameters
+    ----------
+    ebr_data : dict
+        EBR data.
+
+    Returns
+    -------
+    dict
+        EBR data with lists instead of arrays.
+    """
+    return dict(basis=ebr_data["basis"],
+                ebrs=ebr_data["ebrs"],
+                smith_form={key: np.asarray(value).tolist()
+                            for key, value in ebr_data["smith_form"].items()})
+
+
+if __name__ == "__main__":
+    import sys
+    if "-benchmark" in sys.argv:
+        benchmark_ebr_backends()
+    else:
+        pack_ebr_data(verbosity=1)
@@ -339,6 +339,39 @@ def transformed_g_order(kpt, ig, A, kpt_other=None, ig_other=None, inverse=False
     return rotind
 
 
+def match_gvectors(ig, ig_other):
+    """
+    Find the reciprocal lattice vectors common to two sets.
+
+    Parameters
+    ----------
+    ig : array( (NG, 3+), dtype=int)
+        Reduced coordinates of the first set of vectors (first 3 columns).
+    ig_other : array( (NG_other, 3+), dtype=int)
+        Reduced coordinates of the second set of vectors (first 3 columns).
+
+    Returns
+    -------
+    ind : array(dtype=int)
+        Indices of the common vectors in `ig`.
+    ind_other : array(dtype=int)
+        Indices of the common vectors in `ig_other`, such that
+        `ig[ind[i], :3] == ig_other[ind_other[i], :3]`.
+    """
+    ig = np.asarray(ig)[:, :3]
+    ig_other = np.asarray(ig_other)[:, :3]
+    igmin = np.minimum(ig.min(axis=0), ig_other.min(axis=0))
+    size = np.maximum(ig.max(axis=0), ig_other.max(axis=0)) - igmin + 1
+
+    def key(g):
+        g = (g - igmin).astype(np.int64)
+        return (g[:, 0] * size[1] + g[:, 1]) * size[2] + g[:, 2]
+
+    _, ind, ind_other = np.intersect1d(key(ig), key(ig_other),
+                                       assume_unique=True, return_indices=True)
+    return ind, ind_other
+
+
 def symm_eigenvalues(
     K, WF, igall, A, S, T, spinor, block_ind=None
 ):
@@ -391,6 +424,48 @@ def symm_eigenvalues(
         return (WF[:, igrot, 0].conj() * WF[:, :, 0]).dot(multZ)
 
 
+def symm_matrix_elements(K, WF, igall, A, S, T, spinor, block_ind=None, rows=None):
+    r"""
+    Calculate the matrix elements :math:`\langle\psi_m|\{A|T\}|\psi_n\rangle`
+    of a symmetry operation between the wave-functions of a k-point. The
+    diagonal elements are the traces returned by :func:`symm_eigenvalues`,
+    and the elements are bilinear in the coefficients, hence the traces of
+    any linear combination of the states :math:`\sum_m V_{mi}\psi_m` are the
+    diagonal elements of :math:`V^\dagger M V`.
+
+    Parameters
+    ----------
+    K, WF, igall, A, S, T, spinor
+        Same as in :func:`symm_eigenvalues`.
+    block_ind : list( tuple(int,int) ), default=None
+        If provided, only the diagonal blocks `M[m:n, m:n]` are computed and
+        returned as a list.
+    rows : array(int), default=None
+        If provided, only the rows `M[rows, :]` are computed.
+
+    Returns
+    -------
+    array or list of arrays
+        The matrix :math:`M_{mn}`, its rows `rows` or its diagonal blocks.
+    """
+    multZ = np.exp(
+        -1.0j * (2 * np.pi * (igall[:, :3] + K[None, :]) @ (np.linalg.inv(A) @ T))
+    )
+    igrot = transformed_g_order(kpt=K, ig=igall, A=A)
+    bra = WF[:, igrot].conj().reshape(WF.shape[0], -1)
+    if spinor:
+        ket = cached_einsum('st,ngt->ngs', S, WF)
+    else:
+        ket = WF
+    ket = (ket * multZ[None, :, None]).reshape(WF.shape[0], -1)
+    if block_ind is not None:
+        return [bra[b1:b2] @ ket[b1:b2].T for b1, b2 in block_ind]
+    elif rows is not None:
+        return bra[rows] @ ket.T
+    else:
+        return bra @ ket.T
+
+
 def symm_eigenvalues_blocks(K, WF, igall, A, S, T, spinor, block_ind):
     """	
     same as symm_eigenvalues, but uses symm_matrix to calculate the traces	
@@ -16,11 +16,12 @@
 ##################################################################
 
 
-from functools import lru_cache
+from collections import OrderedDict
 import numpy as np
 import numpy.linalg as la
 import copy
-from .gvectors import symm_eigenvalues, symm_matrix, get_pw_energies
+from .gvectors import symm_eigenvalues, symm_matrix, symm_matrix_elements, get_pw_energies, match_gvectors
+from .symmetry_operation import SymmetryArray
 from .utility import cached_einsum, compstr, get_block_indices, is_round, format_matrix, log_message, orthogonalize, vector_pprint
 
 
@@ -125,8 +126,20 @@ class Kpoint:
         wave functions.
     onlytraces : bool
         `False` if irreps have been identified and have to be written.
+    rep_matrices : list
+        Matrices of the operations of the little group in the basis of 
+        states, restricted to blocks of states. Each element is a tuple 
+        `(b1, b2, D)`, where `D[i]` is the matrix of the i-th operation in 
+        `little_group` for the states `b1:b2`. `None` unless computed by 
+        :meth:`calculate_rep_matrices` (it is used by :meth:`Separate`).
+    rho_spin_cache_size : int
+        Class attribute: maximal number of results of :meth:`get_rho_spin` 
+        (for different `degen_thresh`) kept by each instance. The least 
+        recently used one is discarded when exceeded.
     """
 
+    rho_spin_cache_size = 4
+
     def __init__(
         self,
         ik=None,
@@ -184,6 +197,7 @@ class Kpoint:
             # pass
         self.eKG = eKG
         self.upper = upper
+        self.rep_matrices = None
 
         # self.k_refUC = np.dot(refUC.T, self.k) % 1
 
@@ -193,23 +207,26 @@ class Kpoint:
             ).reshape(self.num_bands, 1, 1)
             # np.linalg.norm(self.WF, axis=(1,2))[:, None, None]
 
-    def set_little_group(self, symmetries):
+    def set_little_group(self, symmetries, mask=None):
         """
         Set the little group of the k-point based on the provided symmetries.
         Parameters
         ----------
-        symmetries : list
+        symmetries : list or SymmetryArray
             List of symmetry operations (instances of `SymmetryOperation`)
+        mask : array(len(symmetries), dtype=bool), default=None
+            `True` for the operations that leave the k-point invariant, e.g. 
+            a row of :meth:`~spacegroup.SpaceGroup.little_group_mask`. 
+            Calculated if not provided.
 
         Sets the `little_group` attribute, which contains the symmetry operations
         that leave the k-point invariant up to a reciprocal lattice vector.
         """
-        self.little_group = []
-        for symop in symmetries:
-            k_rotated = np.dot(np.linalg.inv(symop.rotation).T, self.k)
-            dkpt = np.round(k_rotated - self.k)
-            if np.allclose(dkpt, k_rotated - self.k):
-                self.little_group.append(symop)
+        if mask is None:
+            if not isinstance(symmetries, SymmetryArray):
+                symmetries = SymmetryArray(symmetries)
+            mask = symmetries.little_group_mask(self.k)[0]
+        self.little_group = [symop for symop, m in zip(symmetries, mask) if m]
         return self.little_group
 
     def calc_egk(self):
@@ -258,6 +275,8 @@ class Kpoint:
         # Sort symmetries based on their indices
         argsort = np.argsort([symop.ind for symop in self.little_group])
         self.little_group = [self.little_group[ind] for ind in argsort]
+        if self.rep_matrices is not None:
+            self.rep_matrices = [(b1, b2, D[argsort]) for b1, b2, D in self.rep_matrices]
 
         # Determine degeneracies
         self.block_indices = get_block_indices(self.Energy_raw, thresh=degen_thresh, cyclic=False)
@@ -328,7 +347,7 @@ class Kpoint:
         """
         return is_round(self.k - kpt, prec=prec)
 
-    def copy_sub(self, E, WF, kwargs_kpoint={}):
+    def copy_sub(self, E, WF, kwargs_kpoint={}, v=None):
         """
         Create an instance of class `Kpoint` for a restricted set of states.
 
@@ -341,6 +360,13 @@ class Kpoint:
             corresponds to a wave-function, each column to a plane-wave.
         kwargs_kpoint : dict, optional
             Additional keyword arguments to pass to the `init_traces` method,
+        v : array( (num_bands, len(E)) ), default=None
+            Coefficients of the new states in the basis of the current ones 
+            (each column is a state, and does not mix states of different 
+            blocks of `rep_matrices`). If provided and `rep_matrices` were 
+            computed, the traces of the new states are obtained from them, 
+            without repeating the calculation with the plane waves.
+
         Returns
         -------
         other : class
@@ -353,6 +379,10 @@ class Kpoint:
         other.Energy_raw = E[sortE]
         other.WF = WF[sortE]
         other.num_bands = len(E)
+        if v is not None and self.rep_matrices is not None:
+            other.rep_matrices = self.project_rep_matrices(v[:, sortE])
+        else:
+            other.rep_matrices = None
         if kwargs_kpoint is not None:
             other.init_traces(**kwargs_kpoint)
             other.identify_irreps()
@@ -386,44 +416,107 @@ class Kpoint:
             W - weight of the band(s) projected onto the PBZ kpoint.
             Sx, Sy, Sz - Spin components projected onto the PBZ kpoint.
         """
-        if not self.k_close_mod1(kptPBZ.dot(supercell.T), prec=1e-5):
-            raise RuntimeError(f"unable to unfold {self.k} to {kptPBZ}, with supercell={supercell}")
-        g_shift = kptPBZ - self.k.dot(np.linalg.inv(supercell.T))
-        selectG = np.array(
-            np.where(
-                [
-                    is_round(dg, prec=1e-4)
-                    for dg in (self.ig[:3].T.dot(np.linalg.inv(supercell.T)) - g_shift)
-                ]
-            )[0]
-        )
-        if self.spinor:
-            selectG = np.hstack((selectG, selectG + self.NG))
+        return self.unfold_many(supercell, [kptPBZ], degen_thresh=degen_thresh)[0]
+
+    def unfold_many(self, supercell, kpts_PBZ, degen_thresh=1e-4):
+        """
+        Unfolds a kpoint of a supercell onto several points of the primitive 
+        cell at once. The plane waves are classified by the coset of the 
+        reciprocal lattice of the primitive cell they belong to, using 
+        integer arithmetic, and the projections onto all the requested 
+        cosets are calculated with one contraction per group of degenerate 
+        bands.
+
+        Parameters
+        ----------
+        supercell : array, shape=(3,3)
+            Describes how the lattice vectors of the (super)cell used in the 
+            calculation are expressed in the basis vectors of the primitive 
+            cell. Should contain integers.
+        kpts_PBZ : array, shape=(N,3)
+            Coordinates of the k-points in the primitive Brillouin zone (PBZ), 
+            on which the present kpoint should be unfolded.
+        degen_thresh : float
+            Bands with energy difference smaller that the threshold will be 
+            considered as one band, and only one total weight will be given for 
+            them.
+
+        Returns
+        -------
+        array, shape=(N, num_groups, 2) or (N, num_groups, 5)
+            For each point of `kpts_PBZ`, the array returned by 
+            :meth:`unfold`.
+        """
+        supercell = np.array(supercell)
+        kpts_PBZ = np.array(kpts_PBZ, dtype=float).reshape(-1, 3)
+        if not is_round(supercell, prec=1e-6):
+            raise ValueError(f"The supercell matrix should contain integers, found {supercell}")
+        for kptPBZ in kpts_PBZ:
+            if not self.k_close_mod1(kptPBZ.dot(supercell.T), prec=1e-5):
+                raise RuntimeError(f"unable to unfold {self.k} to {kptPBZ}, with supercell={supercell}")
+        # inv(supercell.T) = adj / det, with integer adj and det > 0
+        det = int(round(abs(np.linalg.det(supercell))))
+        adj = np.array(np.round(np.linalg.inv(supercell.T) * det), dtype=int)
+
+        def coset_key(x):
+            x = np.mod(x, det)
+            return (x[:, 0] * det + x[:, 1]) * det + x[:, 2]
+
+        # a plane wave contributes to kptPBZ if g @ inv(supercell.T) - g_shift is integer
+        g_shift = kpts_PBZ - self.k.dot(np.linalg.inv(supercell.T))
+        keys_target = coset_key(np.array(np.round(g_shift * det), dtype=int))
+        keys_G = coset_key(self.ig[:, :3] @ adj)
+        cosets, target_coset = np.unique(keys_target, return_inverse=True)
+        order = np.argsort(keys_G, kind="stable")
+        start = np.searchsorted(keys_G[order], cosets, side="left")
+        end = np.searchsorted(keys_G[order], cosets, side="right")
+        nonempty = end > start
+        selectG = np.hstack([order[b:e] for b, e in zip(start, end)] + [np.zeros(0, dtype=int)])
+        bounds = np.cumsum(np.hstack(([0], (end - start)[nonempty])))[:-1]
+
         WF = self.WF[:, selectG, :]
         result = []
         for b1, b2, E, matrices in self.get_rho_spin(degen_thresh):
-            # proj = np.array(
-            #     [
-            #         [WF[i].reshape(-1).conj().dot(WF[j].reshape(-1)) for j in range(b1, b2)]
-            #         for i in range(b1, b2)
-            #     ]
-            # )
-            proj = cached_einsum('igs,jgs->ij', WF[b1:b2].conj(), WF[b1:b2])
-            result.append([E,] + [np.trace(proj.dot(M)).real for M in matrices])
-        return np.array(result)
+            proj = np.zeros((len(cosets), b2 - b1, b2 - b1), dtype=complex)
+            if len(selectG) > 0:
+                products = cached_einsum('igs,jgs->gij', WF[b1:b2].conj(), WF[b1:b2])
+                proj[nonempty] = np.add.reduceat(products, bounds, axis=0)
+            values = [cached_einsum('cij,ji->c', proj, M).real for M in matrices]
+            result.append(np.array([np.full(len(cosets), E)] + values).T)
+        # axes: target, group of bands, (E, W, Sx, Sy, Sz)
+        return np.array(result).transpose(1, 0, 2)[target_coset]
 
     @property
     def NG(self):
         """Getter for the number of plane-waves in current k-point"""
         return self.ig.shape[0]
 
-    @lru_cache
+    def __copy__(self):
+        """Shallow copy, with its own cache of :meth:`get_rho_spin`"""
+        other = self.__class__.__new__(self.__class__)
+        other.__dict__.update(self.__dict__)
+        other._rho_spin_cache = OrderedDict()
+        return other
+
+    @property
+    def WF(self):
+        """Getter for the coefficients of the wave functions"""
+        return self._WF
+
+    @WF.setter
+    def WF(self, WF):
+        """Set the wave functions and discard the results depending on them"""
+        self._WF = WF
+        self._rho_spin_cache = OrderedDict()
+
     def get_rho_spin(self, degen_thresh=1e-4):
         r"""
         Evaluates the matrix <i|M|j> in every group of degenerate 
         bands labeled by i and j, where M is :math:`\sigma_0`, 
         :math:`\sigma_x`, :math:`\sigma_y` or :math:`\sigma_z` for 
-        the spinor case, :math:`\sigma_0` for the spinor case.
+        the spinor case, :math:`\sigma_0` for the spinor case. The result 
+        is kept by the instance (see `rho_spin_cache_size`) until `WF` is 
+        set again.
 
         Parameters
         ----------
@@ -441,36 +534,93 @@ class Kpoint:
             M -  <i|j>
             Sx, Sy, Sz - <i|sigma|j> 
         """
+        key = float(degen_thresh)
+        if key in self._rho_spin_cache:
+            self._rho_spin_cache.move_to_end(key)
+            return self._rho_spin_cache[key]
         block_indices = get_block_indices(self.Energy_raw, thresh=degen_thresh)
         result = []
         for b1, b2 in block_indices:
-            E = self.Energy_raw[b1:b2].mean()
-            W = cached_einsum('igs,jgs->ij', self.WF[b1:b2].conj(), self.WF[b1:b2])
-            # np.array( [ [self.WF[i].conj().dot(self.WF[j])
-            #                  for j in range(b1, b2)] for i in range(b1, b2)])
+            WF = self.WF[b1:b2]
+            # axes: spin, spin, band, band
+            S = cached_einsum('igs,jgt->stij', WF.conj(), WF)
             if self.spinor:
-                # ng = self.NG
-                # [
-                #     [ np.array( [
-                #         [self.WF[i, ng * s: ng * (s + 1)].conj().dot(
-                #             self.WF[j, ng * t: ng * (t + 1)]) for j in range(b1, b2)]
-                #                 for i in range(b1, b2)] )# band indices
-                #         for t in (0, 1) ]
-                #         for s in (0, 1) ]  # spin indices
-                Smatrix = cached_einsum('igs,jgt->ijst', self.WF[b1:b2].conj(), self.WF[b1:b2])
-                Sx = Smatrix[0][1] + Smatrix[1][0]
-                Sy = 1j * (-Smatrix[0][1] + Smatrix[1][0])
-                Sz = Smatrix[0][0] - Smatrix[1][1]
-                result.append((b1, b2, E, (W, Sx, Sy, Sz)))
+                matrices = (S[0, 0] + S[1, 1],
+                            S[0, 1] + S[1, 0],
+                            1j * (-S[0, 1] + S[1, 0]),
+                            S[0, 0] - S[1, 1])
             else:
-                result.append((b1, b2, E, (W,)))
+                matrices = (S[0, 0].copy(),)
+            result.append((b1, b2, self.Energy_raw[b1:b2].mean(), matrices))
+        self._rho_spin_cache[key] = result
+        if len(self._rho_spin_cache) > self.rho_spin_cache_size:
+            self._rho_spin_cache.popitem(last=False)
         return result
 
     def normWF(self):
         return np.linalg.norm(self.WF, axis=(1, 2))
 
+    def calculate_rep_matrices(self):
+        """
+        Calculate the matrices of the operations of the little group in the 
+        basis of states, within the blocks of degenerate states (see 
+        :func:`~gvectors.symm_matrix_elements`). Sets and returns the 
+        attribute `rep_matrices`.
+
+        Returns
+        -------
+        list
+            Each element is a tuple `(b1, b2, D)`, where `D[i]` is the matrix 
+            of the i-th operation in `little_group` for the states `b1:b2`.
+        """
+        blocks = [
+            symm_matrix_elements(
+                K=self.k,
+                WF=self.WF,
+                igall=self.ig,
+                A=symop.rotation,
+                S=symop.spinor_rotation,
+                T=symop.translation,
+                spinor=self.spinor,
+                block_ind=self.block_indices
+            )
+            for symop in self.little_group
+        ]
+        self.rep_matrices = [(b1, b2, np.array([bl[ib] for bl in blocks]))
+                             for ib, (b1, b2) in enumerate(self.block_indices)]
+        return self.rep_matrices
+
+    def project_rep_matrices(self, v):
+        """
+        Matrices of the operations of the little group for the states 
+        obtained as linear combinations of the current ones.
+
+        Parameters
+        ----------
+        v : array( (num_bands, n) )
+            Each column contains the coefficients of a new state. A column 
+            must not mix states of different blocks of `rep_matrices` and 
+            the columns of the same block must be contiguous.
+
+        Returns
+        -------
+        list
+            `rep_matrices` for the new states (see :meth:`calculate_rep_matrices`)
+        """
+        block_of_state = np.zeros(self.num_bands, dtype=int)
+        for ib, (b1, b2, _) in enumerate(self.rep_matrices):
+            block_of_state[b1:b2] = ib
+        # block of the current states to which each new state belongs
+        block_new = block_of_state[np.argmax(np.abs(v), axis=0)]
+        rep_matrices = []
+        for c1, c2 in get_block_indices(block_new, thresh=0.5):
+            b1, b2, D = self.rep_matrices[block_new[c1]]
+            vb = v[b1:b2, c1:c2]
+            rep_matrices.append((c1, c2, cached_einsum('mi,gmn,nj->gij', vb.conj(), D, vb)))
+        return rep_matrices
+
     def Separate(self, symop, groupKramers=True, verbosity=0,
-                 kwargs_kpoint={}):
+                 kwargs_kpoint={}, offdiagonal_check=8):
         """
         Separate the band structure in a particular k-point according to the 
         eigenvalues of a symmetry operation.
@@ -483,6 +633,11 @@ class Kpoint:
             If `True`, states will be coupled by pairs of Kramers.
         verbosity : int, default=0
             Verbosity level. Default set to minimalistic printing
+        offdiagonal_check : int, default=8
+            Only the blocks of the matrix of the symmetry between degenerate 
+            states are calculated. To check that the elements between states 
+            of different energy vanish, they are calculated for this number 
+            of randomly chosen states. Set to 0 to skip the check.
 
         Returns
         -------
@@ -501,7 +656,7 @@ class Kpoint:
                         verbosity, 1)
 
 
-        S = symm_matrix(
+        S_blocks = symm_matrix(
             K=self.k,
             WF=self.WF,
             igall=self.ig,
@@ -509,29 +664,50 @@ class Kpoint:
             S=symop.spinor_rotation,
             T=symop.translation,
             spinor=self.spinor,
+            block_ind=self.block_indices,
+            return_blocks=True,
         )
 
-
-        # Check that S is block-diagonal
-        Sblock = np.copy(S)
-        for b1, b2 in self.block_indices:
-            Sblock[b1:b2, b1:b2] = 0
-        check = np.max(abs(Sblock))
-        if check > 0.001:
-            log_message("WARNING: matrix of symmetry has non-zero elements between "
-                        f"states of different energy:  {check} \n", verbosity, 1)
-            log_message(f"Printing matrix of symmetry at k={self.k}", verbosity, 1)
-            log_message(format_matrix(Sblock), verbosity, 1)
-            log_message("The diagonal blocks", verbosity, 1)
-            log_message(", ".join([f"{b1}:{b2} \n: {format_matrix(S[b1:b2, b1:b2])}" for b1, b2 in self.block_indices]), verbosity, 1)
-
+        # Check that S is block-diagonal, on a sample of rows
+        if offdiagonal_check > 0 and len(self.block_indices) > 1:
+            rng = np.random.default_rng(self.num_bands)
+            rows = np.sort(rng.choice(self.num_bands, min(offdiagonal_check, self.num_bands), replace=False))
+            Srows = symm_matrix_elements(
+                K=self.k,
+                WF=self.WF,
+                igall=self.ig,
+                A=symop.rotation,
+                S=symop.spinor_rotation,
+                T=symop.translation,
+                spinor=self.spinor,
+                rows=rows,
+            )
+            for i, m in enumerate(rows):
+                for b1, b2 in self.block_indices:
+                    if b1 <= m < b2:
+                        Srows[i, b1:b2] = 0
+            check = np.max(abs(Srows))
+            if check > 0.001:
+                log_message("WARNING: matrix of symmetry has non-zero elements between "
+                            f"states of different energy:  {check} \n", verbosity, 1)
+                log_message(f"Printing rows {rows} of the matrix of symmetry at k={self.k}", verbosity, 1)
+                log_message(format_matrix(Srows), verbosity, 1)
+                log_message("The diagonal blocks", verbosity, 1)
+                log_message(", ".join([f"{b1}:{b2} \n: {format_matrix(block)}" for (b1, b2), block in zip(self.block_indices, S_blocks)]), verbosity, 1)
+
+
+        # Matrices of the little group, from which the traces in the
+        # subspaces are obtained without repeating the plane-wave work
+        if (kwargs_kpoint is not None and kwargs_kpoint.get("calculate_traces", True)
+                and self.rep_matrices is None):
+            self.calculate_rep_matrices()
 
         # Calculate eigenvalues and eigenvectors in each block
         eigenvalues = []
         eigenvectors = []
         Eloc = []
         for istate, (b1, b2) in enumerate(self.block_indices):
-            S_loc = orthogonalize(S[b1:b2, b1:b2], verbosity=verbosity, error_threshold=1e-2, warning_threshold=1e-3)
+            S_loc = orthogonalize(S_blocks[istate], verbosity=verbosity, error_threshold=1e-2, warning_threshold=1e-3)
             W, V = la.eig(S_loc)
             for w, v in zip(W, V.T):
                 eigenvalues.append(w)
@@ -565,7 +741,8 @@ class Kpoint:
                 v1 = v[:, b1:b2]
                 subspaces[w[b1:b2].mean()] = self.copy_sub(E=Eloc[b1:b2],
                                                            WF=cached_einsum('ij,jks->iks', v1.T, self.WF),
-                                                           kwargs_kpoint=kwargs_kpoint)
+                                                           kwargs_kpoint=kwargs_kpoint,
+                                                           v=v1)
 
         else:  # don't group Kramers pairs
 
@@ -582,7 +759,8 @@ class Kpoint:
                 subspaces[np.roll(w, -b1)[: (b2 - b1) % self.num_bands].mean()] = self.copy_sub(
                     E=np.roll(Eloc, -b1)[: (b2 - b1) % self.num_bands],
                     WF=cached_einsum('ij,jks->iks', v1.T, self.WF),
-                    kwargs_kpoint=kwargs_kpoint
+                    kwargs_kpoint=kwargs_kpoint,
+                    v=v1
                 )
 
         return subspaces
@@ -641,20 +819,25 @@ class Kpoint:
         '''
 
         # Put all traces in an array. Rows (cols) correspond to syms (wavefunc)
-        char = []
-        for symop in self.little_group:
-            char.append(
-                symm_eigenvalues(
-                    K=self.k,
-                    WF=self.WF,
-                    igall=self.ig,
-                    A=symop.rotation,
-                    S=symop.spinor_rotation,
-                    T=symop.translation,
-                    spinor=self.spinor,
-                    block_ind=self.block_indices if use_blocks else None
-                ))
-        char = np.array(char)
+        if self.rep_matrices is not None:
+            char = np.zeros((len(self.little_group), self.num_bands), dtype=complex)
+            for b1, b2, D in self.rep_matrices:
+                char[:, b1:b2] = np.einsum('gii->gi', D)
+        else:
+            char = []
+            for symop in self.little_group:
+                char.append(
+                    symm_eigenvalues(
+                        K=self.k,
+                        WF=self.WF,
+                        igall=self.ig,
+                        A=symop.rotation,
+                        S=symop.spinor_rotation,
+                        T=symop.translation,
+                        spinor=self.spinor,
+                        block_ind=self.block_indices if use_blocks else None
+                    ))
+            char = np.array(char)
 
         log_message(f"char.shape = {char.shape}, Energy_raw.shape = {self.Energy_raw.shape}, block_indices = {self.block_indices}", verbosity, 2)
 
@@ -688,7 +871,7 @@ class Kpoint:
         return char, char_refUC, Energy_mean
 
 
-    def identify_irreps(self, irreptable=None):
+    def identify_irreps(self, irreptable=None, character_matrix=None):
         '''
         Identify irreps based on traces. Sets attributes `onlytraces` and  
         `irreps`.
@@ -700,6 +883,11 @@ class Kpoint:
             of every secondary `dict` are indices of symmetries (starting from 
             1 and following order of operations in tables of BCS) and 
             values are traces of symmetries. Traces are in DFT cell.
+        character_matrix : tuple, default=None
+            Labels of the irreps and matrix of their characters for the 
+            operations in `little_group`, as returned by 
+            :meth:`~spacegroup_irreps.SpaceGroupIrreps.get_character_matrix`. 
+            If `None`, it is built from `irreptable`.
         '''
         if irreptable is None:
             if hasattr(self, 'irreptable'):
@@ -716,24 +904,25 @@ class Kpoint:
             # irreps is a list. Each element is a dict corresponding to a
             # group of degen. states. Every key is an irrep and its value
             # the multiplicity of the irrep in the rep. of degen. states
-            try:
-                irreps = []
-                for ch in self.char:
-                    multiplicities = {}
-                    for ir in irreptable:
-                        ir_characters = np.array([irreptable[ir][sym.ind] for sym in self.little_group])
-                        # some coreps are not normalized
-                        # this is len(ch) for all irreps
-                        normalization = (np.abs(ir_characters) ** 2).sum()
-                        multipl = np.dot(ir_characters, ch.conj()) / normalization
-                        if abs(multipl) > 1e-3:
-                            multiplicities[ir] = multipl
-                    irreps.append(multiplicities)
-            except KeyError as ke:
-                print(ke)
-                print("irreptable:", irreptable)
-                print([sym.ind for sym in self.little_group])
-                raise ke
+            if character_matrix is None:
+                try:
+                    names = list(irreptable)
+                    characters = np.array([[irreptable[ir][sym.ind] for sym in self.little_group]
+                                           for ir in names], dtype=complex)
+                except KeyError as ke:
+                    print(ke)
+                    print("irreptable:", irreptable)
+                    print([sym.ind for sym in self.little_group])
+                    raise ke
+            else:
+                names, characters = character_matrix
+            characters = characters.reshape(len(names), len(self.little_group))
+            # some coreps are not normalized
+            # this is len(ch) for all irreps
+            normalization = (np.abs(characters) ** 2).sum(axis=1)
+            multiplicities = self.char.conj() @ characters.T / normalization[None, :]
+            irreps = [{ir: multipl for ir, multipl in zip(names, row) if abs(multipl) > 1e-3}
+                      for row in multiplicities]
 
         self.irreps = irreps
 
@@ -997,7 +1186,7 @@ class Kpoint:
         )
         return res
 
-    def overlap(self, other):
+    def overlap(self, other, alignment=None):
         """ 
         Calculates the overlap matrix of elements < u_m(k) | u_n(k+g) >.
 
@@ -1005,6 +1194,9 @@ class Kpoint:
         ----------
         other : class
             Instance of `Kpoints` corresponding to `k+g` (next k-point in path).
+        alignment : tuple, default=None
+            Indices of the common plane waves in both k-points, as returned 
+            by :meth:`gvector_alignment`. Calculated if not provided.
 
         Returns
         -------
@@ -1012,25 +1204,32 @@ class Kpoint:
             Matrix of `complex` elements  < u_m(k) | u_n(k+g) >.
         """
         assert self.spinor == other.spinor, "Spinor property of k-points should be the same"
+        if alignment is None:
+            alignment = self.gvector_alignment(other)
+        i1, i2 = alignment
+        WF1 = self.WF[:, i1, :].reshape(self.num_bands, -1).astype(complex, copy=False)
+        WF2 = other.WF[:, i2, :].reshape(other.num_bands, -1).astype(complex, copy=False)
+        return WF1.conj() @ WF2.T
+
+    def gvector_alignment(self, other):
+        """
+        Match the plane waves of this k-point with those of `other`, whose 
+        reciprocal lattice vectors are shifted by the integer part of the 
+        difference of both k-points.
+
+        Parameters
+        ----------
+        other : class
+            Instance of `Kpoints` corresponding to `k+g`.
+
+        Returns
+        -------
+        tuple
+            Indices of the common plane waves in `self` and `other`. See 
+            :func:`~gvectors.match_gvectors`.
+        """
         g = np.array((self.k - other.k).round(), dtype=int)
-        igall = np.vstack((self.ig[:, :3], other.ig[:, :3] - g[None, :]))
-        igmax = igall.max(axis=0)
-        igmin = igall.min(axis=0)
-        igsize = igmax - igmin + 1
-        #        print (self.ig.T)
-        #        print (igsize)
-        res = np.zeros((self.num_bands, other.num_bands), dtype=complex)
-
-        # short again coefficients of expansions
-        # for s in [0, 1] if self.spinor else [0]:
-        WF1 = np.zeros((self.num_bands, igsize[0], igsize[1], igsize[2], self.nspinor), dtype=complex)
-        WF2 = np.zeros((other.num_bands, igsize[0], igsize[1], igsize[2], self.nspinor), dtype=complex)
-        for i, ig in enumerate(self.ig.T):
-            WF1[:, ig[0] - igmin[0], ig[1] - igmin[1], ig[2] - igmin[2], :] = self.WF[:, i, :]
-        for i, ig in enumerate(other.ig[:3].T - g[None, :]):
-            WF2[:, ig[0] - igmin[0], ig[1] - igmin[1], ig[2] - igmin[2]] = other.WF[:, i, :]
-        res += cached_einsum("mabcs,nabcs->mn", WF1.conj(), WF2)
-        return res
+        return match_gvectors(self.ig, other.ig[:, :3] - g[None, :])
 
     # I think these routines are not used anymore, but I leave them here for reference
     # def getloc1(self, loc):
@@ -26,6 +26,7 @@ from sys import stdout
 from .gvectors import calc_gvectors, Hartree_eV
 from .utility import FortranFileR as FFR
 from .utility import str2bool, BOHR, split, log_message
+from .storage import EXPORT_FORMAT, read_kpoint_group
 import xml.etree.ElementTree as ET
 
 
@@ -303,6 +304,17 @@ class ParserAbinit():
         self.kpt = kpt
         return (nband, nkpt, rprimd, ecut, spinor, typat, xred, efermi)
 
+    def parse_kpoint_coordinates(self):
+        '''
+        Coordinates of all k-points, read from the header
+
+        Returns
+        -------
+        array( (NK, 3) )
+            Direct coords of the k-points w.r.t. DFT cell vectors
+        '''
+        return np.reshape(self.kpt, (-1, 3))
+
     def parse_kpoint(self, ik):
         '''
         Parse block of a k-point from WFK file
@@ -481,8 +493,22 @@ class ParserVasp:
         self.fWAV.set_nrec_kpoint(NBin=NBin)
         Ecut0 = tmp[2]
         lattice = np.array(tmp[3:12]).reshape(3, 3)
+        self.NK = NK
         return NK, NBin, Ecut0, lattice
 
+    def parse_kpoint_coordinates(self):
+        '''
+        Coordinates of all k-points, read from the headers of their blocks 
+        in WAVECAR without reading the wave functions
+
+        Returns
+        -------
+        array( (NK, 3) )
+            Direct coords of the k-points with respect to the basis vectors 
+            of the DFT reciprocal space cell
+        '''
+        return np.array([self.fWAV.record_k_header(ik)[1:4] for ik in range(self.NK)])
+
     def parse_kpoint(self, ik, NBin, spinor):
         '''
         Parse block of a particular k-point from WAVECAR
@@ -553,8 +579,8 @@ class ParserEspresso:
         myroot = mytree.getroot()
 
         self.input = myroot.find("input")
-        outp = myroot.find("output")
-        self.bandstr = outp.find("band_structure")
+        self.output = myroot.find("output")
+        self.bandstr = self.output.find("band_structure")
 
         # todo: define spinor as property with getter
         self.spinor = str2bool(self.bandstr.find("noncolin").text)
@@ -660,6 +686,22 @@ class ParserEspresso:
 
         return lattice, positions, typat, alat
 
+    def parse_kpoint_coordinates(self):
+        '''
+        Coordinates of all k-points, read from `data-file-schema.xml` file
+
+        Returns
+        -------
+        array( (NK, 3) )
+            Direct coords of the k-points w.r.t. DFT cell vectors
+        '''
+        reciprocal_lattice = self.output.find("basis_set").find("reciprocal_lattice")
+        B = np.array([reciprocal_lattice.find(f"b{i + 1}").text.split() for i in range(3)],
+                     dtype=float)
+        kpoints = np.array([kptxml.find("k_point").text.split()
+                            for kptxml in self.bandstr.findall("ks_energies")], dtype=float)
+        return kpoints.reshape(-1, 3).dot(np.linalg.inv(B))
+
 
     def parse_kpoint(self, ik, NBin, spin_channel, verbosity=0):
         '''
@@ -1176,3 +1218,113 @@ class ParserGPAW:
             energies = self.calculator.get_eigenvalues(kpt=ik)
 
         return energies, WF, kg, kpt, eKG
+
+
+class ParserIrrep:
+    """
+    Parser of the files written by `irrep export` (see 
+    :meth:`~bandstructure.BandStructure.export`).
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file.
+
+    Attributes
+    ----------
+    filename : str
+        Name of the file.
+    file : h5py.File
+        The file, opened for reading.
+    spinor : bool
+        Whether wave functions are spinors (SOC)
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = h5py.File(filename, "r")
+        if self.file.attrs.get("format") != EXPORT_FORMAT:
+            raise RuntimeError(f"{filename} was not written by 'irrep export'")
+        self.spinor = bool(self.file.attrs["spinor"])
+
+    def parse_header(self):
+        """
+        Parse universal info of the band structure.
+
+        Returns
+        -------
+        NK : int
+            Number of k-points
+        NBin : int
+            Number of bands
+        Ecut0 : float
+            Plane-wave cutoff (in eV) to which the wave functions were 
+            truncated when exporting
+        spinor : bool
+            Whether wave functions are spinors (SOC)
+        EF : float
+            Fermi energy in eV. `None` if it was not known when exporting
+        """
+        NK = len(self.file["kpoints"])
+        NBin = int(self.file.attrs["num_bands"])
+        Ecut0 = float(self.file.attrs["Ecut"])
+        EF = float(self.file.attrs["efermi"])
+        if np.isnan(EF):
+            EF = None
+        return NK, NBin, Ecut0, self.spinor, EF
+
+    def parse_lattice(self):
+        """
+        Parse info about the crystal structure.
+
+        Returns
+        -------
+        lattice : array
+            Each row contains the cartesian coords of a DFT unit cell vector
+        positions : array
+            Each row contains the direct coords of an ion's position
+        typat : list
+            Each element is a number identifying the atomic species of an ion
+        """
+        Lattice = self.file["lattice"][()]
+        positions = self.file["positions"][()]
+        typat = list(self.file["typat"][()])
+        return Lattice, positions, typat
+
+    def parse_kpoint_coordinates(self):
+        """
+        Coordinates of all k-points, read without the wave functions.
+
+        Returns
+        -------
+        array( (NK, 3) )
+            Direct coordinates of the k-points
+        """
+        kpoints = self.file["kpoints"]
+        return np.array([kpoints[str(ik)]["kpt"][()] for ik in range(len(kpoints))])
+
+    def parse_kpoint(self, ik):
+        """
+        Parse wave functions and energy levels at a k-point.
+
+        Parameters
+        ----------
+        ik : int
+            Index of the k-point in the file (starting from 0).
+
+        Returns
+        -------
+        WF : array( (num_bands, NG, nspinor), dtype=complex)
+            Coefficients of the wave functions.
+        Energy : array
+            Energy levels (not shifted by the Fermi level)
+        kg : array( (NG, 3), dtype=int)
+            Reciprocal lattice vectors of the plane waves
+        kpt : array(3)
+            Direct coordinates of the k-point
+        upper : float
+            Energy of the first band above the exported ones. `np.nan` if 
+            all bands were exported
+        """
+        data = read_kpoint_group(self.file["kpoints"][str(ik)])
+        return data["WF"], data["Energy"], data["ig"][:, :3], data["kpt"], data["upper"]
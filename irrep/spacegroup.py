@@ -21,13 +21,30 @@ import warnings
 import numpy as np
 import spglib
 
-from irrep.readfiles import ParserAbinit, ParserEspresso, ParserGPAW, ParserVasp, ParserW90
+from irrep.readfiles import ParserAbinit, ParserEspresso, ParserGPAW, ParserVasp, ParserW90, ParserIrrep
 
-from .symmetry_operation import SymmetryOperation
+from .symmetry_operation import SymmetryArray, SymmetryOperation
 from .utility import BOHR, log_message
 from packaging import version
 import os
 
+import h5py
+
+from .storage import enforce_size_limit, hash_files, read_dict_group, write_dict_group
+
+SPACEGROUP_FORMAT = "irrep-spacegroup"
+SPACEGROUP_FORMAT_VERSION = 1
+
+
+def _hashable(value):
+    """Representation of an input of :meth:`SpaceGroup.from_cell` for the key of the cache."""
+    if value is None or isinstance(value, (bool, str, int, float)):
+        return value
+    array = np.asarray(value)
+    if array.dtype.kind in "biuf":
+        return array.shape, array.astype(float).tobytes()
+    return array.tolist()
+
 
 class SpaceGroup:
 
@@ -189,13 +206,23 @@ class SpaceGroup:
             self.symmetries = [s.copy() for s in symmetry_operations]
         else:
             self.symmetries = symmetry_operations
+        self._symmetry_arrays = {}
 
 
-    def as_dict(self):
+    def as_dict(self, full=False):
         """
-        return dictionary with info essential about the spacegroup
+        return dictionary with info essential about the spacegroup. 
+        It can be turned back into a space group with :meth:`from_dict`.
+
+        Parameters
+        ----------
+        full : bool, default=False
+            If `False`, the keys are arguments of the constructor. If `True`,
+            the dictionary also contains the cell, `refUC`, `shiftUC` and 
+            the indices and signs of the symmetries, so that the space group 
+            is restored exactly.
         """
-        return dict(
+        data = dict(
             Lattice=self.real_lattice,
             spinor=self.spinor,
             rotations=[s.rotation for s in self.symmetries],
@@ -205,6 +232,100 @@ class SpaceGroup:
             number=self.number if self.number is not None else -1,
             name=self.name if self.name is not None else "unknown"
         )
+        if not full:
+            return data
+        data.update(
+            number_str=getattr(self, "number_str", None),
+            magnetic=self.magnetic,
+            refUC=self.refUC,
+            shiftUC=self.shiftUC,
+            positions=self.positions,
+            typat=self.typat,
+            alat=self.alat,
+            translation_mod1=bool(self.symmetries[0].translation_mod1) if self.symmetries else False,
+            inds=[s.ind for s in self.symmetries],
+            signs=[s.sign for s in self.symmetries],
+        )
+        return data
+
+    @classmethod
+    def from_dict(CLS, data):
+        """
+        Create a space group from the dictionary returned by :meth:`as_dict`.
+        The symmetries are restored in the same order, with their indices
+        and signs.
+
+        Parameters
+        ----------
+        data : dict
+            Dictionary returned by :meth:`as_dict`.
+
+        Returns
+        -------
+        SpaceGroup
+        """
+        number_str = data.get("number_str")
+        optional = {}
+        for key in ("refUC", "shiftUC", "positions", "typat"):
+            if data.get(key) is not None:
+                optional[key] = np.array(data[key])
+        sg = CLS(
+            Lattice=np.array(data["Lattice"]),
+            spinor=bool(data["spinor"]),
+            rotations=[np.array(r) for r in data["rotations"]],
+            translations=[np.array(t, dtype=float) for t in data["translations"]],
+            time_reversals=[bool(tr) for tr in data["time_reversals"]],
+            translation_mod1=bool(data.get("translation_mod1", False)),
+            number=None if number_str is not None else int(data["number"]),
+            number_str=None if number_str is None else str(number_str),
+            name=str(data["name"]),
+            spinor_rotations=[np.array(S) for S in data["spinor_rotations"]],
+            magnetic=None if data.get("magnetic") is None else bool(data["magnetic"]),
+            alat=None if data.get("alat") is None else float(data["alat"]),
+            **optional
+        )
+        if data.get("inds") is not None:
+            for sym, ind, sign in zip(sg.symmetries, data["inds"], data["signs"]):
+                sym.ind = int(ind)
+                sym.sign = int(sign)
+        return sg
+
+    def save(self, filename):
+        """
+        Write a snapshot of the space group to an HDF5 file, see
+        :meth:`as_dict`.
+
+        Parameters
+        ----------
+        filename : str
+            Path to the file.
+        """
+        with h5py.File(filename, "w") as f:
+            f.attrs["format"] = SPACEGROUP_FORMAT
+            f.attrs["version"] = SPACEGROUP_FORMAT_VERSION
+            write_dict_group(f, self.as_dict(full=True))
+
+    @classmethod
+    def load(CLS, filename):
+        """
+        Read a space group written by :meth:`save`.
+
+        Parameters
+        ----------
+        filename : str
+            Path to the file.
+
+        Returns
+        -------
+        SpaceGroup
+        """
+        with h5py.File(filename, "r") as f:
+            if f.attrs.get("format") != SPACEGROUP_FORMAT or \
+                    f.attrs.get("version") != SPACEGROUP_FORMAT_VERSION:
+                raise RuntimeError(f"{filename} is not a space group written by this "
+                                   "version of irrep")
+            data = read_dict_group(f)
+        return CLS.from_dict(data)
 
     @property
     def size(self):
@@ -280,6 +401,8 @@ class SpaceGroup:
             mag_symprec=-1,
             angle_tolerance=-1,
             verbosity=0,
+            cache_dir=None,
+            cache_max_size=None,
             ############
             **kwargs_tables
     ):
@@ -335,6 +458,15 @@ class SpaceGroup:
         symprec, angle_tolerance, mag_symprec: float
             see `get_symmetry` and 'get_magnetic_symmetry` in 
             `Spglib documentation <https://spglib.readthedocs.io/en/stable/api/python-api.html#spglib.spglib.get_magnetic_symmetry>'__
+        cache_dir : str, default=None
+            Directory to cache the space group. The file is named after a 
+            hash of the structure, the tolerances and the arguments for the 
+            tables, and later calls with the same inputs read the space group 
+            from it (see :meth:`load`) instead of running spglib and the 
+            search of the cell.
+        cache_max_size : float, default=None
+            Maximal size (in GB) of the cache directory. When exceeded, the 
+            least recently used files are removed.
 
         """
 
@@ -356,6 +488,19 @@ class SpaceGroup:
         magmom = magmom
         include_TR = include_TR
 
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            inputs = [CLS.__name__, spinor, alat, include_TR, symprec, mag_symprec,
+                      angle_tolerance, real_lattice, positions, typat, magmom]
+            inputs += [(key, _hashable(value)) for key, value in sorted(kwargs_tables.items())]
+            key = hash_files([] if from_sym_file is None else [from_sym_file],
+                             extra=[SPACEGROUP_FORMAT_VERSION] + [_hashable(x) for x in inputs])
+            cache_file = os.path.join(cache_dir, f"sg-{key}.h5")
+            if os.path.exists(cache_file):
+                log_message(f"Reading the space group from the cache {cache_file}", verbosity, 1)
+                os.utime(cache_file)  # mark as recently used
+                return CLS.load(cache_file)
+
         if not np.all(isinstance(x, int) for x in typat):
             log_message("typat are not integers -trying to enumerate them", verbosity, 2)
             typeatset = set(typat)
@@ -463,6 +608,10 @@ class SpaceGroup:
         if CLS.__name__ == "SpaceGroupIrreps":
             sg.set_irreptables(verbosity=verbosity,
                                **kwargs_tables,)
+        if cache_dir is not None:
+            log_message(f"Space group cached in {cache_file}", verbosity, 1)
+            sg.save(cache_file)
+            enforce_size_limit(cache_dir, cache_max_size, keep=[cache_file], verbosity=verbosity)
         return sg
 
     @property
@@ -494,6 +643,52 @@ class SpaceGroup:
         else:
             return []
 
+    def symmetry_array(self, symmetries=None):
+        """
+        Symmetry operations stacked in arrays, see `SymmetryArray`. It is 
+        built once for each set of operations.
+
+        Parameters
+        ----------
+        symmetries : list, default=None
+            Instances of `SymmetryOperation`. If `None`, all the symmetries 
+            of the group are used.
+
+        Returns
+        -------
+        SymmetryArray
+        """
+        if symmetries is None:
+            symmetries = self.symmetries
+        # the cached arrays keep the operations alive, so their ids are not reused
+        key = tuple(id(symop) for symop in symmetries)
+        if key not in self._symmetry_arrays:
+            self._symmetry_arrays[key] = SymmetryArray(symmetries)
+        return self._symmetry_arrays[key]
+
+    def little_group_mask(self, kpoints, symmetries=None):
+        """
+        Determine the little group of a set of k-points with one vectorized 
+        operation.
+
+        Parameters
+        ----------
+        kpoints : array( (n_k, 3) )
+            Direct coordinates of the k-points.
+        symmetries : list, default=None
+            Instances of `SymmetryOperation`. If `None`, the unitary 
+            symmetries are used.
+
+        Returns
+        -------
+        array( (n_k, len(symmetries)), dtype=bool)
+            `True` if the symmetry leaves the k-point invariant, modulo a 
+            reciprocal lattice vector.
+        """
+        if symmetries is None:
+            symmetries = self.u_symmetries
+        return self.symmetry_array(symmetries).little_group_mask(kpoints)
+
 
 
     def write_sym_file(self, filename, alat=None):
@@ -528,6 +723,7 @@ class SpaceGroup:
         prefix=None,
         calculator_gpaw=None,
         fPOS=None,
+        fIRREP=None,
         spinor=None,
         code="vasp",
         verbosity=0,
@@ -539,6 +735,8 @@ class SpaceGroup:
         symprec=1e-5,
         angle_tolerance=-1,
         mag_symprec=-1,
+        cache_dir=None,
+        cache_max_size=None,
         ############
         **kwargs_tables
     ):
@@ -557,12 +755,15 @@ class SpaceGroup:
             wavefunctions.
         fPOS : str, default=None
             Name of the file with positions (e.g. POSCAR for VASP).
+        fIRREP : str, default=None
+            Name of the file written by `irrep export` (for code "irrep").
         spinor : bool, default=None
             `True` if wave-functions are spinors (SOC), `False` if they are scalars.
             If not specified, it is determined from the code.
         code : str, default="vasp"
             Code used to generate the files. Supported codes: "vasp", "abinit", 
-            "espresso", "wannier90", "gpaw". If not specified, it is assumed to be "vasp".
+            "espresso", "wannier90", "gpaw" and "irrep" (files written by 
+            `irrep export`). If not specified, it is assumed to be "vasp".
         verbosity : int, default=0
             Verbosity level. Default set to minimalistic printing.
         alat : float, default=None
@@ -580,6 +781,10 @@ class SpaceGroup:
         symprec, angle_tolerance, mag_symprec: float
             see `get_symmetry` and 'get_magnetic_symmetry` in 
             `Spglib documentation <https://spglib.readthedocs.io/en/stable/api/python-api.html#spglib.spglib.get_magnetic_symmetry>'__
+        cache_dir : str, default=None
+            Directory to cache the space group, see :meth:`from_cell`.
+        cache_max_size : float, default=None
+            Maximal size (in GB) of the cache directory.
         **kwargs_tables : dict
             Additional keyword arguments to pass to the `SpaceGroupIrrep.set_irreptables` method.
 
@@ -623,6 +828,11 @@ class SpaceGroup:
                                 spinor=False if spinor is None else spinor)
             NBin, kpred, Lattice, spinor, typat, positions, EF_in = parser.parse_header()
 
+        elif code == "irrep":
+            parser = ParserIrrep(fIRREP)
+            spinor = parser.spinor
+            Lattice, positions, typat = parser.parse_lattice()
+
         else:
             raise RuntimeError(f"Unknown/unsupported code :{code}")
 
@@ -641,6 +851,8 @@ class SpaceGroup:
             symprec=symprec,
             angle_tolerance=angle_tolerance,
             mag_symprec=mag_symprec,
+            cache_dir=cache_dir,
+            cache_max_size=cache_max_size,
             ####################
             **kwargs_tables
         )
@@ -16,15 +16,48 @@
 ##################################################################
 
 
+from functools import lru_cache
+
 import numpy as np
 from irreptables import IrrepTable
 from scipy.optimize import minimize
 
 from .spacegroup import SpaceGroup
+from .table_service import get_table_service
 
 from .utility import log_message
 
 
+@lru_cache(maxsize=None)
+def load_irreptable(number_str, spinor, magnetic=False):
+    """
+    Load the table of irreps of a space group. Each table is parsed once per 
+    process, the first time it is requested, and shared by later calls. The 
+    returned object should not be modified. If a table service is active 
+    (see :mod:`~irrep.table_service`), the table is read from shared memory.
+
+    Parameters
+    ----------
+    number_str : str
+        Number of the space group (e.g. '2' or '2.4' for magnetic groups).
+    spinor : bool
+        `True` for double-valued irreps, `False` for single-valued ones.
+    magnetic : bool, default=False
+        `True` to load the corepresentations of a magnetic group.
+
+    Returns
+    -------
+    IrrepTable
+        Table of irreps.
+    """
+    service = get_table_service()
+    if service is not None:
+        table = service.irreptable(number_str, spinor, magnetic=magnetic)
+        if table is not None:
+            return table
+    return IrrepTable(number_str, spinor, magnetic=magnetic)
+
+
 class SpaceGroupIrreps(SpaceGroup):
     """
     This class is for internal usage of irrep. While the parent class is for wider use (e.g. in wannierberri)
@@ -51,6 +84,11 @@ class SpaceGroupIrreps(SpaceGroup):
 
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._irreps_from_table = {}
+        self._character_matrices = {}
+
     def set_irreptables(self,
             refUC=None,
             shiftUC=None,
@@ -59,7 +97,7 @@ class SpaceGroupIrreps(SpaceGroup):
             no_match_symmetries=False,
             verbosity=0):
         # Load symmetries from the space group's table
-        irreptable = IrrepTable(self.number_str, self.spinor, magnetic=self.magnetic, v=verbosity)
+        irreptable = load_irreptable(self.number_str, self.spinor, magnetic=bool(self.magnetic))
         self.u_symmetries_tables = irreptable.u_symmetries
         self.au_symmetries_tables = irreptable.au_symmetries
 
@@ -115,8 +153,50 @@ class SpaceGroupIrreps(SpaceGroup):
                                 "tables, try not specifying refUC and shiftUC.",
                                 verbosity, 1)
             self.symmetries = sorted_symmetries
+        # the phases of the characters depend on refUC, shiftUC and the order of symmetries
+        self._irreps_from_table = {}
+        self._character_matrices = {}
         self.irreps_are_set = True
 
+    def as_dict(self, full=False):
+        """
+        Dictionary with the info about the space group. If `full`, it 
+        includes the matching to the tables: the order, indices and signs of
+        the symmetries, `refUC`, `shiftUC` and `spin_transf`. See 
+        :meth:`SpaceGroup.as_dict`.
+        """
+        data = super().as_dict(full=full)
+        if not full:
+            return data
+        data["irreps_are_set"] = bool(getattr(self, "irreps_are_set", False))
+        data["spin_transf"] = getattr(self, "spin_transf", None)
+        return data
+
+    @classmethod
+    def from_dict(CLS, data):
+        """
+        Create a space group from the dictionary returned by :meth:`as_dict`.
+        If the symmetries had been matched to the tables, the tables are
+        loaded, but the matching is not repeated.
+
+        Parameters
+        ----------
+        data : dict
+            Dictionary returned by :meth:`as_dict`.
+
+        Returns
+        -------
+        SpaceGroupIrreps
+        """
+        sg = super().from_dict(data)
+        if data.get("irreps_are_set", False):
+            irreptable = load_irreptable(sg.number_str, sg.spinor, magnetic=bool(sg.magnetic))
+            sg.u_symmetries_tables = irreptable.u_symmetries
+            sg.au_symmetries_tables = irreptable.au_symmetries
+            sg.spin_transf = None if data.get("spin_transf") is None else np.array(data["spin_transf"])
+            sg.irreps_are_set = True
+        return sg
+
     def check_irreps_set(self):
         assert self.irreps_are_set, "Cannot proceed before `SpaceGroupIrreps.set_irreptables()` is called. " \
 
@@ -292,9 +372,23 @@ class SpaceGroupIrreps(SpaceGroup):
         RuntimeError
             There is not any k-point in the tables whose label matches that 
             given in parameter `kpname`.
+
+        Notes
+        -----
+        The result is stored for each `kpname`, and returned again (after 
+        checking the coordinates `K`) in later calls.
         """
 
-        table = IrrepTable(self.number_str, self.spinor, magnetic=self.magnetic, v=verbosity)
+        if kpname in self._irreps_from_table:
+            tab, k_table = self._irreps_from_table[kpname]
+            k1 = np.round(np.linalg.inv(self.refUC.T).dot(k_table), 5) % 1
+            k2 = np.round(K, 5) % 1
+            if not np.allclose(k1, k2):
+                raise RuntimeError(f"the kpoint {K} does not correspond to the point {kpname} "
+                                   f"({np.round(k_table, 3)} in refUC / {k1} in primUC) in the table")
+            return tab
+
+        table = load_irreptable(self.number_str, self.spinor, magnetic=bool(self.magnetic))
         tab = {}
         for irr in table.irreps:
             if irr.kpname == kpname:
@@ -320,8 +414,46 @@ class SpaceGroupIrreps(SpaceGroup):
                     krefuc=np.linalg.inv(self.refUC).dot(irr.k) % 1
                 ) for irr in table.irreps)
             )
+        k_table = [irr.k for irr in table.irreps if irr.kpname == kpname][0]
+        self._irreps_from_table[kpname] = (tab, k_table)
         return tab
 
+    def get_character_matrix(self, kpname, K, little_group, verbosity=0):
+        """
+        Characters of the irreps of a maximal k-point in a dense matrix, 
+        with the phases of :meth:`get_irreps_from_table` applied. The matrix 
+        is calculated once for each label and little group.
+
+        Parameters
+        ----------
+        kpname : str
+            Label of the maximal k-point.
+        K : array, shape=(3,)
+            Direct coordinates of the k-point.
+        little_group : list
+            Symmetry operations (instances of `SymmetryOperation`) of the 
+            little group of the k-point, determining the columns of the 
+            matrix.
+        verbosity : int, default=0
+            Verbosity level. Default set to minimalistic printing
+
+        Returns
+        -------
+        names : list of str
+            Labels of the irreps.
+        characters : array( (len(names), len(little_group)), dtype=complex)
+            `characters[i, j]` is the character of the j-th operation in the 
+            i-th irrep.
+        """
+        tab = self.get_irreps_from_table(kpname, K, verbosity=verbosity)
+        key = (kpname, tuple(sym.ind for sym in little_group))
+        if key not in self._character_matrices:
+            names = list(tab)
+            characters = np.array([[tab[ir][sym.ind] for sym in little_group] for ir in names],
+                                  dtype=complex).reshape(len(names), len(little_group))
+            self._character_matrices[key] = (names, characters)
+        return self._character_matrices[key]
+
     def determine_basis_transf(
             self,
             refUC_cli,
@@ -428,47 +560,35 @@ class SpaceGroupIrreps(SpaceGroup):
                     inv = sym
 
             if inv is None:  # Not centrosymmetric
-                for r_center in self.vecs_centering():
-                    shiftUC = shiftUC_lib + refUC.dot(r_center)
-                    try:
-                        ind, dt, signs, _ = self.match_symmetries(
-                            refUC,
-                            shiftUC,
-                            trans_thresh=trans_thresh,
-                            only_u_symmetries=True
-                        )
-                        log_message(f'ShiftUC achieved with the centering: {r_center}',
-                                    verbosity, 1)
-                        return refUC, shiftUC
-                    except RuntimeError:
-                        pass
-                raise RuntimeError(("Could not find any shift that leads to "
-                                    "the expressions for the symmetries found "
-                                    "in the tables."))
+                centerings = self.vecs_centering()
+                shifts = [shiftUC_lib + refUC.dot(r_center) for r_center in centerings]
+                i = self._find_shift(refUC, shifts, trans_thresh=trans_thresh,
+                                     only_u_symmetries=True)
+                if i is None:
+                    raise RuntimeError(("Could not find any shift that leads to "
+                                        "the expressions for the symmetries found "
+                                        "in the tables."))
+                log_message(f'ShiftUC achieved with the centering: {centerings[i]}',
+                            verbosity, 1)
+                return refUC, shifts[i]
 
             else:  # Centrosymmetric. Origin must sit in an inv. center
-                for r_center in self.vecs_inv_centers():
-                    shiftUC = 0.5 * inv.translation + refUC.dot(0.5 * r_center)
-                    try:
-                        ind, dt, signs, _ = self.match_symmetries(refUC,
-                                                                  shiftUC,
-                                                                  trans_thresh=trans_thresh,
-                                                                  only_u_symmetries=True
-                                                                  )
-                        log_message(f"ShiftUC achieved in 2 steps:\n"
-                                    f"  (1) Place origin of primitive cell on inversion center: {0.5 * inv.translation}\n"
-                                    f"  (2) Move origin of convenctional cell to the inversion-center: {r_center}",
-                                    verbosity, 1)
-                        return refUC, shiftUC
-                    except RuntimeError:
-                        pass
-                raise RuntimeError(("Could not find any shift that places the "
-                                    "origin on an inversion center which leads "
-                                    "to the expressions for the symmetries "
-                                    "found in the tables. Enter refUC and "
-                                    "shiftUC in command line"))
-
-
+                inv_centers = self.vecs_inv_centers()
+                shifts = [0.5 * inv.translation + refUC.dot(0.5 * r_center)
+                          for r_center in inv_centers]
+                i = self._find_shift(refUC, shifts, trans_thresh=trans_thresh,
+                                     only_u_symmetries=True)
+                if i is None:
+                    raise RuntimeError(("Could not find any shift that places the "
+                                        "origin on an inversion center which leads "
+                                        "to the expressions for the symmetries "
+                                        "found in the tables. Enter refUC and "
+                                        "shiftUC in command line"))
+                log_message(f"ShiftUC achieved in 2 steps:\n"
+                            f"  (1) Place origin of primitive cell on inversion center: {0.5 * inv.translation}\n"
+                            f"  (2) Move origin of convenctional cell to the inversion-center: {inv_centers[i]}",
+                            verbosity, 1)
+                return refUC, shifts[i]
 
     def match_symmetries(
             self,
@@ -521,8 +641,64 @@ class SpaceGroupIrreps(SpaceGroup):
         if shiftUC is None:
             shiftUC = self.shiftUC
 
-        ind = []
-        dt = []
+        symmetries, symmetries_tables, ind = self._match_rotations(refUC, only_u_symmetries)
+        t_tables = np.array([symmetries_tables[i].t for i in ind])
+        t, t1, match = self._match_translations(refUC, [shiftUC], symmetries, t_tables,
+                                                trans_thresh)
+        if not match[0].all():
+            j = int(np.argmin(match[0]))
+            raise RuntimeError(
+                f"Error matching translational part for symmetry {j + 1}. "
+                f"A symmetry with identical rotational part has been found in tables, "
+                f"but their translational parts do not match:\n"
+                f"R (found, in conv. cell)= \n{symmetries[j].rotation_refUC(refUC)}\n"
+                f"t(found) = {symmetries[j].translation}\n"
+                f"t(table) = {t_tables[j]}\n"
+                f"t(found, in conv. cell) = {t[0, j]}\n"
+                f"t(table)-t(found) (in conv. cell, mod. lattice translation)= {t1[0, j]}"
+            )
+        dt = list(t_tables - t[0])
+
+        if signs:
+            S1 = [sym.spinor_rotation for sym in symmetries]
+            S2 = [symmetries_tables[i].S for i in ind]
+            signs_array, U = match_spinor_rotations(S1, S2)
+        else:
+            signs_array = np.ones(len(ind), dtype=int)
+            U = None
+        return ind.tolist(), dt, signs_array, U
+
+    def _match_rotations(self, refUC, only_u_symmetries=False):
+        """
+        Match the rotational parts of the symmetries to those in the tables.
+        The symmetries of the tables are indexed by the integer matrix of
+        their rotation and their time reversal, so that each symmetry is
+        matched by a lookup.
+
+        Parameters
+        ----------
+        refUC : array
+            3x3 array describing the transformation of vectors defining the 
+            unit cell to the standard setting.
+        only_u_symmetries : bool, default=False
+            Only match unitary symmetries.
+
+        Returns
+        -------
+        list
+            Symmetries matched.
+        list
+            Symmetries of the tables.
+        array
+            The :math:`i^{th}` element is the position in the tables of the
+            :math:`i^{th}` symmetry.
+
+        Raises
+        ------
+        RuntimeError
+            A symmetry has no counterpart in the tables, or two of them have
+            the same one.
+        """
         if only_u_symmetries:
             symmetries = self.u_symmetries
             symmetries_tables = self.u_symmetries_tables
@@ -530,57 +706,99 @@ class SpaceGroupIrreps(SpaceGroup):
             symmetries = self.symmetries
             symmetries_tables = self.u_symmetries_tables + self.au_symmetries_tables
 
-
+        table_index = {}
+        for i, sym2 in enumerate(symmetries_tables):
+            table_index.setdefault((tuple(sym2.R.flatten()), bool(sym2.time_reversal)), i)
+        ind = []
         for j, sym in enumerate(symmetries):
             R = sym.rotation_refUC(refUC)
-            t = sym.translation_refUC(refUC, shiftUC)
-            found = False
-            for i, sym2 in enumerate(symmetries_tables):
-                t1 = refUC.dot(sym2.t - t) % 1
-                # t1 = np.dot(sym2.t - t, refUC) % 1
-                t1[1 - t1 < trans_thresh] = 0
-                if np.allclose(R, sym2.R) and sym.time_reversal == sym2.time_reversal:
-                    if np.allclose(t1, [0, 0, 0], atol=trans_thresh):
-                        ind.append(i)  # au symmetries labeled from 0
-                        dt.append(sym2.t - t)
-                        found = True
-                        break
-                        # Tolerance for rotational part comparison
-                        # is much more restrictive than for transl.
-                        # Make them consistent?
-                    else:
-                        raise RuntimeError(
-                            f"Error matching translational part for symmetry {j + 1}. "
-                            f"A symmetry with identical rotational part has been found in tables, "
-                            f"but their translational parts do not match:\n"
-                            f"R (found, in conv. cell)= \n{R}\n"
-                            f"t(found) = {sym.translation}\n"
-                            f"t(table) = {sym2.t}\n"
-                            f"t(found, in conv. cell) = {t}\n"
-                            f"t(table)-t(found) (in conv. cell, mod. lattice translation)= {t1}"
-                        )
-            if not found:
+            i = table_index.get((tuple(R.flatten()), bool(sym.time_reversal)))
+            if i is None:
                 raise RuntimeError(
                     f"Error matching rotational part for symmetry {j + 1}. "
                     f"In the tables there is not any symmetry with identical rotational part.\n"
-                    f"R(found) = \n{R}\nt(found) = {t}"
+                    f"R(found) = \n{R}\nt(found) = {sym.translation}"
                 )
+            ind.append(i)
 
-        order = len(symmetries)
-        if len(set(ind)) != order:
+        if len(set(ind)) != len(symmetries):
             raise RuntimeError(
                 "Error in matching symmetries detected by spglib with the \
                  symmetries in the tables. Try to modify the refUC and shiftUC \
                  parameters")
+        return symmetries, symmetries_tables, np.array(ind, dtype=int)
 
-        if signs:
-            S1 = [sym.spinor_rotation for sym in symmetries]
-            S2 = [symmetries_tables[i].S for i in ind]
-            signs_array, U = match_spinor_rotations(S1, S2)
-        else:
-            signs_array = np.ones(len(ind), dtype=int)
-            U = None
-        return ind, dt, signs_array, U
+    def _match_translations(self, refUC, shifts, symmetries, t_tables, trans_thresh=1e-5):
+        """
+        Compare the translational parts of symmetries with those in the
+        tables (mod. lattice translations) for several origin shifts at once.
+
+        Parameters
+        ----------
+        refUC : array
+            3x3 array describing the transformation of vectors defining the 
+            unit cell to the standard setting.
+        shifts : array(num_shifts, 3)
+            Candidates for `shiftUC`.
+        symmetries : list
+            Symmetries to compare.
+        t_tables : array(num_symmetries, 3)
+            Translational parts of the matching symmetries in the tables.
+        trans_thresh : float, default=1e-5
+            Threshold used to compare translational parts of symmetries.
+
+        Returns
+        -------
+        array(num_shifts, num_symmetries, 3)
+            Translational parts of the symmetries in the reference cell, as
+            given by `SymmetryOperation.translation_refUC`.
+        array(num_shifts, num_symmetries, 3)
+            Difference with those of the tables, mod. lattice translations.
+        array(num_shifts, num_symmetries), dtype=bool
+            Whether the translational parts match.
+        """
+        shifts = np.array(shifts, dtype=float).reshape(-1, 3)
+        rotations = np.array([sym.rotation for sym in symmetries])
+        translations = np.array([sym.translation for sym in symmetries])
+        t = (translations[None, :, :] - shifts[:, None, :]
+             + np.einsum("nij,sj->sni", rotations, shifts))
+        t = t @ np.linalg.inv(refUC).T
+        t1 = ((t_tables[None, :, :] - t) @ refUC.T) % 1
+        t1[1 - t1 < trans_thresh] = 0
+        match = (abs(t1) <= trans_thresh).all(axis=2)
+        return t, t1, match
+
+    def _find_shift(self, refUC, shifts, trans_thresh=1e-5, only_u_symmetries=False):
+        """
+        Find the first of several candidates for `shiftUC` with which the
+        symmetries match those in the tables.
+
+        Parameters
+        ----------
+        refUC : array
+            3x3 array describing the transformation of vectors defining the 
+            unit cell to the standard setting.
+        shifts : array(num_shifts, 3)
+            Candidates for `shiftUC`.
+        trans_thresh : float, default=1e-5
+            Threshold used to compare translational parts of symmetries.
+        only_u_symmetries : bool, default=False
+            Only match unitary symmetries.
+
+        Returns
+        -------
+        int
+            Position of the shift among the candidates. `None` if none of
+            them works.
+        """
+        try:
+            symmetries, symmetries_tables, ind = self._match_rotations(refUC, only_u_symmetries)
+        except RuntimeError:
+            return None
+        t_tables = np.array([symmetries_tables[i].t for i in ind])
+        _, _, match = self._match_translations(refUC, shifts, symmetries, t_tables, trans_thresh)
+        found = np.flatnonzero(match.all(axis=1))
+        return int(found[0]) if len(found) > 0 else None
 
     def vecs_centering(self):
         """ 
@@ -653,7 +871,7 @@ class SpaceGroupIrreps(SpaceGroup):
 
         """
 
-        table = IrrepTable(self.number_str, self.spinor, magnetic=self.magnetic)
+        table = load_irreptable(self.number_str, self.spinor, magnetic=bool(self.magnetic))
         refUC_kspace = np.linalg.inv(self.refUC.T)
 
         matrix_format = ("\t\t| {: .2f} {: .2f} {: .2f} |\n"
@@ -711,11 +929,62 @@ class SpaceGroupIrreps(SpaceGroup):
 
 
 
-def match_spinor_rotations(S1, S2):
+PAULI = np.array([[[0, 1], [1, 0]],
+                  [[0, -1j], [1j, 0]],
+                  [[1, 0], [0, -1]]])
+
+
+def spinor_to_rotation(S):
+    r"""
+    Rotation of 3D vectors corresponding to a transformation of spinors, such
+    that :math:`S \sigma_k S^\dagger = |\det S| \sum_j O_{jk} \sigma_j`. It is the
+    same for :math:`S` and :math:`-S`.
+
+    Parameters
+    ----------
+    S : array, shape=(2,2)
+        Matrix of the transformation of spinors.
+
+    Returns
+    -------
+    array, shape=(3,3)
+        Real matrix :math:`O`.
+    """
+    S = np.asarray(S)
+    O = np.einsum("jab,bc,kcd,da->jk", PAULI, S, PAULI, S.T.conj()).real / 2
+    return O / abs(np.linalg.det(S))
+
+
+def _spinor_signs(R, S1, S2):
+    r"""
+    Signs :math:`s_j` such that :math:`R S2_j R^\dagger \approx s_j S1_j`,
+    and the normalized residue of the matching.
     """
+    signs = []
+    residue = 0
+    for a, b in zip(S1, S2):
+        rbr = R.dot(b).dot(R.T.conj())
+        r, s = min((abs(rbr - s * a).sum(), s) for s in (1, -1))
+        signs.append(s)
+        residue += r
+    return np.array(signs, dtype=int), residue / len(S1)
+
+
+def match_spinor_rotations(S1, S2):
+    r"""
     Determine the sign difference between matrices describing the 
     transformation of spinors found by `spglib` and those read from tables.
 
+    The basis change :math:`R` is found in closed form. In terms of the
+    rotations of 3D vectors (see :func:`spinor_to_rotation`), the condition
+    :math:`R S2_j R^\dagger = \pm S1_j` becomes
+    :math:`O(R) O(S2_j) = O(S1_j) O(R)`, free of signs and linear in
+    :math:`O(R)`. Its solution is taken from the null space of the stacked
+    equations, and lifted to :math:`R` by solving the linear equations
+    :math:`R \sigma_k = (\sum_j O(R)_{jk} \sigma_j) R`. If this fails, the
+    residue of the matching is minimized numerically from random starting
+    points.
+
     Parameters
     ----------
     S1 : list
@@ -728,8 +997,53 @@ def match_spinor_rotations(S1, S2):
     Returns
     -------
     array
-        The `j`-th element is the matrix to match the `j`-th matrices of 
-        `S1` and `S2`.
+        The `j`-th element is the sign :math:`s_j` such that
+        :math:`R S2_j R^\dagger = s_j S1_j`.
+    array, shape=(2,2)
+        Matrix :math:`R`.
+    """
+    R = _match_spinor_rotations_linear(S1, S2)
+    if R is not None:
+        signs, residue = _spinor_signs(R, S1, S2)
+        if residue < 1e-4:
+            return signs, R
+    return _match_spinor_rotations_minimize(S1, S2)
+
+
+def _match_spinor_rotations_linear(S1, S2):
+    r"""
+    Closed-form solution of :func:`match_spinor_rotations`. Returns the
+    matrix :math:`R`, or `None` if the equations have no solution.
+    """
+    eye = np.eye(3)
+    equations = np.vstack([np.kron(eye, spinor_to_rotation(b).T) - np.kron(spinor_to_rotation(a), eye)
+                           for a, b in zip(S1, S2)])
+    _, sv, vh = np.linalg.svd(equations)
+    null_space = vh[np.count_nonzero(sv > 1e-6):]
+    if len(null_space) == 0:
+        return None
+    # all solutions are orthogonal matrices times elements of the commutant
+    # of the rotations, so a generic solution is invertible and its
+    # orthogonal part solves the equations as well
+    weights = np.cos(np.arange(1, len(null_space) + 1))
+    Q = (weights @ null_space).reshape(3, 3)
+    u, _, vh = np.linalg.svd(Q)
+    O = u @ vh
+    if np.linalg.det(O) < 0:
+        O = -O
+    # lift O to SU(2)
+    eye = np.eye(2)
+    equations = np.vstack([np.kron(eye, PAULI[k].T) - np.kron(np.einsum("j,jab->ab", O[:, k], PAULI), eye)
+                           for k in range(3)])
+    _, sv, vh = np.linalg.svd(equations)
+    R = vh[-1].conj().reshape(2, 2)
+    return R / np.sqrt(np.linalg.det(R))
+
+
+def _match_spinor_rotations_minimize(S1, S2):
+    """
+    Numerical solution of :func:`match_spinor_rotations`, minimizing the
+    residue of the matching from random starting points.
     """
     n = 2
 
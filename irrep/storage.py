@@ -0,0 +1,368 @@
+# ###   ###   #####  ###
+# #  #  #  #  #      #  #
+# ###   ###   ###    ###
+# #  #  #  #  #      #
+# #   # #   # #####  #
+
+
+##################################################################
+## This file is distributed as part of                           #
+## "IrRep" code and under terms of GNU General Public license v3 #
+## see LICENSE file in the                                       #
+##                                                               #
+##  Written by Stepan Tsirkin                                    #
+##  e-mail: stepan.tsirkin@ehu.eus                               #
+##################################################################
+
+"""
+Storage of wave functions on disk: persistent cache of the wave functions
+already truncated to the cutoff used in the analysis, the compact files
+written by `irrep export` and temporary memory-mapped scratch files. Also
+helpers to store dictionaries, used for snapshots of space groups.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import weakref
+
+import h5py
+import numpy as np
+
+from .utility import log_message
+
+
+CACHE_FORMAT_VERSION = 1
+EXPORT_FORMAT = "irrep-export"
+EXPORT_FORMAT_VERSION = 1
+
+
+def hash_files(filenames, extra=(), chunk_size=2**20):
+    """
+    Compute a key identifying a set of files without reading them entirely.
+    The key combines the path, size and modification time of each file with
+    a hash of its first bytes, which contain the header of the formats read
+    by irrep. Rewriting a file changes its modification time, hence the key.
+
+    Parameters
+    ----------
+    filenames : list of str
+        Paths to the files. Directories are traversed recursively.
+    extra : tuple, default=()
+        Additional values (converted to strings) to include in the hash,
+        e.g. the cutoff or the band window.
+    chunk_size : int, default=2**20
+        Number of bytes hashed at the beginning of each file.
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest.
+    """
+    paths = []
+    for name in filenames:
+        if os.path.isdir(name):
+            for root, _, files in os.walk(name):
+                paths += [os.path.join(root, f) for f in files]
+        else:
+            paths.append(name)
+    h = hashlib.sha256()
+    for path in sorted(os.path.realpath(path) for path in paths):
+        stat = os.stat(path)
+        h.update(repr((path, stat.st_size, stat.st_mtime_ns)).encode())
+        with open(path, "rb") as f:
+            h.update(f.read(chunk_size))
+    for x in extra:
+        h.update(repr(x).encode())
+    return h.hexdigest()
+
+
+def enforce_size_limit(directory, max_size, keep=(), suffix=".h5", verbosity=0):
+    """
+    Remove the least recently used files of a directory until its total size
+    does not exceed a limit.
+
+    Parameters
+    ----------
+    directory : str
+        Path to the directory.
+    max_size : float
+        Maximal size of the directory in GB. If `None`, nothing is removed.
+    keep : tuple of str, default=()
+        Paths that should never be removed (e.g. the file in use).
+    suffix : str, default='.h5'
+        Only files with this suffix are considered.
+    verbosity : int, default=0
+        Verbosity level.
+    """
+    if max_size is None:
+        return
+    keep = [os.path.abspath(f) for f in keep]
+    files = []
+    for name in os.listdir(directory):
+        path = os.path.abspath(os.path.join(directory, name))
+        if name.endswith(suffix) and os.path.isfile(path):
+            stat = os.stat(path)
+            files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(f[1] for f in files)
+    limit = max_size * 2**30
+    for _, size, path in sorted(files):
+        if total <= limit:
+            break
+        if path in keep:
+            continue
+        log_message(f"Removing {path} from the cache directory", verbosity, 1)
+        os.remove(path)
+        total -= size
+
+
+def write_dict_group(group, data):
+    """
+    Store a dictionary in a group of an HDF5 file: strings and scalars as
+    attributes, arrays and lists as datasets. Entries equal to `None` are
+    skipped.
+
+    Parameters
+    ----------
+    group : h5py.Group
+        Group where the data is written.
+    data : dict
+        Dictionary to store.
+    """
+    for key, value in data.items():
+        if value is None:
+            continue
+        if isinstance(value, (str, bool, int, float, np.generic)):
+            group.attrs[key] = value
+        else:
+            group.create_dataset(key, data=np.asarray(value))
+
+
+def read_dict_group(group):
+    """
+    Read a dictionary written by :func:`write_dict_group`.
+
+    Parameters
+    ----------
+    group : h5py.Group
+        Group containing the data.
+
+    Returns
+    -------
+    dict
+        Scalars are returned as numpy scalars and lists as arrays. Entries
+        that were `None` are missing.
+    """
+    data = dict(group.attrs)
+    for key in group:
+        data[key] = group[key][()]
+    return data
+
+
+def write_kpoint_group(group, kpt, WF, ig, eKG, Energy, upper, compression=None):
+    """
+    Store the data of a k-point in a group of an HDF5 file.
+
+    Parameters
+    ----------
+    group : h5py.Group
+        Group where the data is written.
+    kpt : array(3)
+        Direct coordinates of the k-point.
+    WF : array( (num_bands, NG, nspinor), dtype=complex)
+        Coefficients of the wave functions.
+    ig : array( (NG, 6), dtype=int)
+        Array returned by :func:`~gvectors.sortIG`.
+    eKG : array(NG)
+        Energies of the plane waves.
+    Energy : array(num_bands)
+        Energy levels (not shifted by the Fermi level).
+    upper : float
+        Energy of the first band above the band window. `np.nan` if there is
+        no such band.
+    compression : str, default=None
+        Compression filter of the wave functions, e.g. 'gzip'.
+    """
+    group.create_dataset("kpt", data=np.array(kpt, dtype=float))
+    group.create_dataset("WF", data=WF, chunks=(1,) + WF.shape[1:],
+                         compression=compression)
+    group.create_dataset("ig", data=np.array(ig, dtype=np.int32))
+    group.create_dataset("eKG", data=eKG)
+    group.create_dataset("Energy", data=Energy)
+    group.attrs["upper"] = np.nan if upper is None else upper
+
+
+def read_kpoint_group(group):
+    """
+    Read the data of a k-point written by :func:`write_kpoint_group`.
+
+    Parameters
+    ----------
+    group : h5py.Group
+        Group containing the data.
+
+    Returns
+    -------
+    dict
+        Keys are `kpt`, `WF`, `ig`, `eKG`, `Energy` and `upper`.
+    """
+    return dict(
+        kpt=group["kpt"][()],
+        WF=group["WF"][()],
+        ig=group["ig"][()].astype(int),
+        eKG=group["eKG"][()],
+        Energy=group["Energy"][()],
+        upper=float(group.attrs["upper"]),
+    )
+
+
+class WavefunctionCache:
+    """
+    Persistent cache of wave functions truncated to the cutoff `Ecut` and
+    restricted to a window of bands. The data of each k-point is stored in a
+    group of an HDF5 file named after a key of the input files (see
+    :func:`hash_files`), the cutoff, the band window and the other options
+    of the parser, so that any change of those leads to a new file.
+    K-points are read one by one on demand.
+
+    Parameters
+    ----------
+    directory : str
+        Directory containing the cache files. Created if it does not exist.
+    input_files : list of str
+        Files (or directories) from which the wave functions are parsed.
+    Ecut : float
+        Plane-wave cutoff (in eV) used to truncate the wave functions.
+    IBstart : int
+        Index of the first band stored (counting from 0).
+    IBend : int
+        Index of the last+1 band stored.
+    extra : tuple, default=()
+        Other parameters that change the stored data (e.g. the spin channel
+        or the spinor flag).
+    max_size : float, default=None
+        Maximal size (in GB) of the cache directory. When exceeded, the least
+        recently used files are removed.
+    verbosity : int, default=0
+        Verbosity level.
+
+    Attributes
+    ----------
+    filename : str
+        Path to the HDF5 file of the cache.
+    """
+
+    def __init__(self, directory, input_files, Ecut, IBstart, IBend,
+                 extra=(), max_size=None, verbosity=0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_size = max_size
+        self.verbosity = verbosity
+        key = hash_files(input_files,
+                         extra=(CACHE_FORMAT_VERSION, float(Ecut), IBstart, IBend) + tuple(extra))
+        self.filename = os.path.join(directory, f"wf-{key}.h5")
+        if os.path.exists(self.filename):
+            log_message(f"Reading wave functions from the cache {self.filename}", verbosity, 1)
+            os.utime(self.filename)  # mark as recently used
+        else:
+            log_message(f"Wave functions will be cached in {self.filename}", verbosity, 1)
+        self._stored = set()
+        if os.path.exists(self.filename):
+            with h5py.File(self.filename, "r") as f:
+                self._stored = set(f.keys())
+        enforce_size_limit(directory, max_size, keep=[self.filename], verbosity=verbosity)
+
+    def __contains__(self, ik):
+        return str(ik) in self._stored
+
+    def load(self, ik):
+        """
+        Read the data of a k-point.
+
+        Parameters
+        ----------
+        ik : int
+            Index of the k-point in the DFT files (counting from 0).
+
+        Returns
+        -------
+        dict
+            See :func:`read_kpoint_group`.
+        """
+        with h5py.File(self.filename, "r") as f:
+            return read_kpoint_group(f[str(ik)])
+
+    def save(self, ik, **kwargs):
+        """
+        Store the data of a k-point. If the size of the cache directory
+        exceeds `max_size`, the least recently used files are removed.
+
+        Parameters
+        ----------
+        ik : int
+            Index of the k-point in the DFT files (counting from 0).
+        **kwargs
+            Arguments of :func:`write_kpoint_group`.
+        """
+        with h5py.File(self.filename, "a") as f:
+            if str(ik) in f:
+                del f[str(ik)]
+            write_kpoint_group(f.create_group(str(ik)), **kwargs)
+        self._stored.add(str(ik))
+        enforce_size_limit(self.directory, self.max_size, keep=[self.filename],
+                           verbosity=self.verbosity)
+
+
+class WavefunctionScratch:
+    """
+    Temporary files holding wave functions, which are accessed as read-only
+    memory maps. This way, the operating system decides which wave functions
+    reside in memory. The directory of the files is removed when the object
+    is garbage-collected, at exit of the interpreter or when calling
+    :meth:`cleanup`.
+
+    Parameters
+    ----------
+    directory : str, default=None
+        Directory where the scratch directory is created. If `None`, the 
+        default directory for temporary files is used.
+
+    Attributes
+    ----------
+    path : str
+        Path to the scratch directory.
+    """
+
+    def __init__(self, directory=None):
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix="irrep-wf-", dir=directory)
+        self._count = 0
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, ignore_errors=True)
+
+    def store(self, WF):
+        """
+        Write an array to a scratch file and map it back into memory.
+
+        Parameters
+        ----------
+        WF : array
+            Array to store (e.g. wave functions of a k-point).
+
+        Returns
+        -------
+        numpy.memmap
+            Read-only array mapped to the scratch file.
+        """
+        filename = os.path.join(self.path, f"WF-{self._count}.npy")
+        self._count += 1
+        mapped = np.lib.format.open_memmap(filename, mode="w+", dtype=WF.dtype, shape=WF.shape)
+        mapped[...] = WF
+        mapped.flush()
+        del mapped
+        return np.load(filename, mmap_mode="r")
+
+    def cleanup(self):
+        """Remove the scratch directory."""
+        self._finalizer()
@@ -0,0 +1,312 @@
+
+# ###   ###   #####  ###
+# #  #  #  #  #      #  #
+# ###   ###   ###    ###
+# #  #  #  #  #      #
+# #   # #   # #####  #
+
+
+##################################################################
+## This file is distributed as part of                           #
+## "IrRep" code and under terms of GNU General Public license v3 #
+## see LICENSE file in the                                       #
+##                                                               #
+##  Written by Stepan Tsirkin                                    #
+##  e-mail: stepan.tsirkin@ehu.eus                               #
+##################################################################
+
+"""
+Tables of symmetry indicators. Each table is a JSON file with the formulas
+of all (magnetic) space groups. Next to it, an index file gives the position
+of the entry of each group in the JSON file, so that only the entry of the
+needed group is read and parsed. The formulas of a group are converted once
+per process into an integer matrix, and the indicators are computed as a
+matrix-vector product with the vector of irrep multiplicities.
+"""
+
+import json
+import os
+from fractions import Fraction
+from functools import lru_cache
+from math import lcm
+
+import numpy as np
+
+from .table_service import get_table_service
+
+
+SI_DIR = os.path.join(os.path.dirname(__file__), "data", "symmetry_indicators")
+
+
+def si_table_name(spinor, magnetic=False):
+    """
+    Name of the table of symmetry indicators.
+
+    Parameters
+    ----------
+    spinor : bool
+        `True` for double-valued irreps, `False` for single-valued ones.
+    magnetic : bool, default=False
+        `True` for magnetic space groups.
+
+    Returns
+    -------
+    str
+        Name of the JSON file without extension, e.g. 'double_indicators'.
+    """
+    return f"{'double' if spinor else 'single'}_indicators{'_magnetic' if magnetic else ''}"
+
+
+def scan_si_table(filename):
+    """
+    Find the position of the entry of each group in a JSON file of symmetry
+    indicators.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the JSON file.
+
+    Returns
+    -------
+    dict
+        Keys are the numbers of the groups, values are lists
+        `[offset, length]` in bytes.
+    """
+    with open(filename, "r", encoding="ascii") as f:
+        text = f.read()
+    decoder = json.JSONDecoder()
+    groups = {}
+    i = text.index("{") + 1
+    while True:
+        while text[i] in " \t\r\n,":
+            i += 1
+        if text[i] == "}":
+            break
+        key, i = decoder.raw_decode(text, i)
+        i = text.index(":", i) + 1
+        while text[i] in " \t\r\n":
+            i += 1
+        _, end = decoder.raw_decode(text, i)
+        groups[key] = [i, end - i]
+        i = end
+    return groups
+
+
+def build_si_index(table_name, directory=SI_DIR):
+    """
+    Write the index file of a table of symmetry indicators. It should be
+    rebuilt whenever the JSON file changes.
+
+    Parameters
+    ----------
+    table_name : str
+        Name of the table, see :func:`si_table_name`.
+    directory : str
+        Directory containing the tables.
+
+    Returns
+    -------
+    str
+        Path to the index file.
+    """
+    filename = os.path.join(directory, table_name + ".json")
+    index = dict(size=os.path.getsize(filename), groups=scan_si_table(filename))
+    index_filename = os.path.join(directory, table_name + ".index")
+    with open(index_filename, "w") as f:
+        json.dump(index, f)
+    return index_filename
+
+
+@lru_cache(maxsize=None)
+def load_si_index(table_name, directory=SI_DIR):
+    """
+    Read the index of a table of symmetry indicators. If the index file is
+    missing or does not match the JSON file, the JSON file is scanned.
+
+    Parameters
+    ----------
+    table_name : str
+        Name of the table, see :func:`si_table_name`.
+    directory : str
+        Directory containing the tables.
+
+    Returns
+    -------
+    dict
+        See :func:`scan_si_table`.
+    """
+    filename = os.path.join(directory, table_name + ".json")
+    index_filename = os.path.join(directory, table_name + ".index")
+    if os.path.exists(index_filename):
+        with open(index_filename, "r") as f:
+            index = json.load(f)
+        if index["size"] == os.path.getsize(filename):
+            return index["groups"]
+    return scan_si_table(filename)
+
+
+@lru_cache(maxsize=None)
+def load_si_group(number_str, spinor, magnetic=False):
+    """
+    Load the symmetry indicators of a group. Only the entry of this group
+    is read, and it is kept for the rest of the process. The returned object
+    should not be modified.
+
+    Parameters
+    ----------
+    number_str : str
+        Number of the (magnetic) space group.
+    spinor : bool
+        `True` for double-valued irreps, `False` for single-valued ones.
+    magnetic : bool, default=False
+        `True` for magnetic space groups.
+
+    Returns
+    -------
+    dict
+        Entry of the group in the table, with the key 'indicators'. `None` if
+        the group has no nontrivial indicators.
+    """
+    service = get_table_service()
+    if service is not None:
+        si_table = service.si_table(spinor, magnetic)
+        if si_table is not None:
+            return si_table.get(number_str)
+    table_name = si_table_name(spinor, magnetic)
+    groups = load_si_index(table_name)
+    if number_str not in groups:
+        return None
+    offset, length = groups[number_str]
+    with open(os.path.join(SI_DIR, table_name + ".json"), "rb") as f:
+        f.seek(offset)
+        return json.loads(f.read(length))
+
+
+class SymmetryIndicatorFormulas:
+    """
+    Formulas of the symmetry indicators of a group, as an integer matrix.
+    The factors of the formulas may be fractions, so they are multiplied by
+    a common denominator, and so are the moduli.
+
+    Parameters
+    ----------
+    indicators : dict
+        Value of the key 'indicators' of the entry of the group in the table.
+
+    Attributes
+    ----------
+    names : list of str
+        Names of the indicators.
+    labels : list of str
+        Labels of the irreps appearing in the formulas.
+    factors : array(num_indicators, num_labels), dtype=int
+        Factors of the formulas multiplied by `denominator`.
+    mods : array(num_indicators), dtype=int
+        Moduli of the indicators multiplied by `denominator`.
+    denominator : int
+        Common denominator of the factors.
+    """
+
+    def __init__(self, indicators):
+        self.names = list(indicators)
+        self.labels = list(dict.fromkeys(label for formula in indicators.values()
+                                         for label in formula["factors"]))
+        positions = {label: i for i, label in enumerate(self.labels)}
+        fractions = np.zeros((len(self.names), len(self.labels)), dtype=object)
+        fractions[:] = Fraction(0)
+        for i, formula in enumerate(indicators.values()):
+            for label, factor in formula["factors"].items():
+                fractions[i, positions[label]] = Fraction(factor).limit_denominator(1000)
+        self.denominator = lcm(1, *(int(x.denominator) for x in fractions.flat))
+        self.factors = (fractions * self.denominator).astype(np.int64)
+        self.mods = np.array([int(round(formula["mod"])) * self.denominator
+                              for formula in indicators.values()], dtype=np.int64)
+
+    @classmethod
+    def from_arrays(cls, names, labels, factors, mods, denominator):
+        """
+        Create the formulas from their arrays, e.g. stored in shared memory 
+        by :class:`~table_service.TableService`. The arrays are not copied.
+
+        Parameters
+        ----------
+        names, labels : list of str
+            See the attributes of the class.
+        factors, mods : array(dtype=int)
+            See the attributes of the class.
+        denominator : int
+            See the attributes of the class.
+
+        Returns
+        -------
+        SymmetryIndicatorFormulas
+        """
+        formulas = cls.__new__(cls)
+        formulas.names = list(names)
+        formulas.labels = list(labels)
+        formulas.factors = factors
+        formulas.mods = mods
+        formulas.denominator = int(denominator)
+        return formulas
+
+    def evaluate(self, irrep_counts):
+        """
+        Compute the symmetry indicators.
+
+        Parameters
+        ----------
+        irrep_counts : dict
+            Keys are labels of irreps, values are their multiplicities.
+            Irreps that do not appear are counted as 0.
+
+        Returns
+        -------
+        dict
+            Keys are the names of the indicators, values are the indicators
+            as integers, reduced modulo their order.
+        """
+        counts = np.array([round(irrep_counts.get(label, 0)) for label in self.labels],
+                          dtype=np.int64)
+        values = (self.factors @ counts) % self.mods // self.denominator
+        orders = self.mods // self.denominator
+        return {name: int(value) % int(order)
+                for name, value, order in zip(self.names, values, orders)}
+
+
+@lru_cache(maxsize=None)
+def load_si_formulas(number_str, spinor, magnetic=False):
+    """
+    Load the formulas of the symmetry indicators of a group as an integer
+    matrix. If a table service is active, the matrix is a view of its
+    shared memory. The result is kept for the rest of the process.
+
+    Parameters
+    ----------
+    number_str : str
+        Number of the (magnetic) space group.
+    spinor : bool
+        `True` for double-valued irreps, `False` for single-valued ones.
+    magnetic : bool, default=False
+        `True` for magnetic space groups.
+
+    Returns
+    -------
+    SymmetryIndicatorFormulas
+        `None` if the group has no nontrivial indicators.
+    """
+    service = get_table_service()
+    if service is not None:
+        formulas = service.si_formulas(number_str, spinor, magnetic)
+        if formulas is not None:
+            return formulas
+    group = load_si_group(number_str, spinor, magnetic)
+    if group is None:
+        return None
+    return SymmetryIndicatorFormulas(group["indicators"])
+
+
+if __name__ == "__main__":
+    for spinor in (False, True):
+        for magnetic in (False, True):
+            print(build_si_index(si_table_name(spinor, magnetic)))
@@ -676,3 +676,98 @@ class SymmetryOperation():
         if self.time_reversal:
             res = -res
         return res
+
+
+class SymmetryArray:
+    """
+    Symmetry operations stored as stacked arrays, to transform many vectors 
+    under all of them at once. Indexing and iteration give the underlying 
+    instances of `SymmetryOperation`, which remain the per-operation API.
+
+    Parameters
+    ----------
+    symmetries : list
+        Instances of `SymmetryOperation`.
+
+    Attributes
+    ----------
+    symmetries : list
+        Instances of `SymmetryOperation`, in the order of the arrays.
+    rotations : array( (n_sym, 3, 3), dtype=int)
+        Rotational parts, in direct coordinates.
+    rotation_inv : array( (n_sym, 3, 3), dtype=float)
+        Inverses of the rotational parts.
+    translations : array( (n_sym, 3), dtype=float)
+        Translational parts, in direct coordinates.
+    time_reversal : array( (n_sym,), dtype=bool)
+        `True` for antiunitary operations.
+    spinor_rotations : array( (n_sym, 2, 2), dtype=complex)
+        Matrices of the transformation of spinors.
+    """
+
+    def __init__(self, symmetries):
+        self.symmetries = list(symmetries)
+        self.rotations = np.array([symop.rotation for symop in self.symmetries],
+                                  dtype=int).reshape(-1, 3, 3)
+        self.rotation_inv = np.linalg.inv(self.rotations.astype(float))
+        self.translations = np.array([symop.translation for symop in self.symmetries],
+                                     dtype=float).reshape(-1, 3)
+        self.time_reversal = np.array([symop.time_reversal for symop in self.symmetries],
+                                      dtype=bool)
+        self.spinor_rotations = np.array([symop.spinor_rotation for symop in self.symmetries],
+                                         dtype=complex).reshape(-1, 2, 2)
+
+    def __len__(self):
+        return len(self.symmetries)
+
+    def __getitem__(self, index):
+        return self.symmetries[index]
+
+    def __iter__(self):
+        return iter(self.symmetries)
+
+    def transform_k(self, kpoints, inverse=False):
+        """
+        Transform k-points under all the symmetry operations, as 
+        `SymmetryOperation.transform_k`.
+
+        Parameters
+        ----------
+        kpoints : array( (n_k, 3) ) or array(3)
+            Direct coordinates of the k-points.
+        inverse : bool, default=False
+            If `True`, apply the inverse operations.
+
+        Returns
+        -------
+        array( (n_sym, n_k, 3) )
+            The element `[isym, ik]` is the k-point `ik` transformed by the 
+            operation `isym`.
+        """
+        kpoints = np.reshape(kpoints, (-1, 3))
+        matrices = self.rotations if inverse else self.rotation_inv
+        res = np.einsum("ki,sij->skj", kpoints, matrices)
+        res[self.time_reversal] *= -1
+        return res
+
+    def little_group_mask(self, kpoints):
+        """
+        Determine which operations leave each k-point invariant, modulo a
+        reciprocal lattice vector, for all k-points and operations at once.
+        Only the rotational parts are used, time reversal is not applied.
+
+        Parameters
+        ----------
+        kpoints : array( (n_k, 3) )
+            Direct coordinates of the k-points.
+
+        Returns
+        -------
+        array( (n_k, n_sym), dtype=bool)
+            `True` if the operation belongs to the little group of the 
+            k-point.
+        """
+        kpoints = np.reshape(kpoints, (-1, 3))
+        # k transforms as inv(R).T @ k
+        dk = np.einsum("ki,sij->ksj", kpoints, self.rotation_inv) - kpoints[:, None, :]
+        return np.isclose(np.round(dk), dk).all(axis=2)
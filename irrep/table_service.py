@@ -0,0 +1,532 @@
+
+# ###   ###   #####  ###
+# #  #  #  #  #      #  #
+# ###   ###   ###    ###
+# #  #  #  #  #      #
+# #   # #   # #####  #
+
+
+##################################################################
+## This file is distributed as part of                           #
+## "IrRep" code and under terms of GNU General Public license v3 #
+## see LICENSE file in the                                       #
+##                                                               #
+##  Written by Stepan Tsirkin                                    #
+##  e-mail: stepan.tsirkin@ehu.eus                               #
+##################################################################
+
+"""
+Tables of irreps, symmetry indicators and EBRs held in shared memory, so
+that many processes running on one node read the same copy instead of
+parsing the files each. One process creates the service with
+:meth:`TableService.create`, which stores the data in a
+`multiprocessing.shared_memory` block and exports its name in the
+environment variable `IRREP_TABLE_SERVICE`. Processes started afterwards
+attach to the block read-only, and :func:`~spacegroup_irreps.load_irreptable`,
+:func:`~ebrs.load_ebr_data` and :meth:`BandStructure.load_si_table` read
+from it.
+"""
+
+import glob
+import json
+import os
+import sys
+import threading
+import weakref
+from collections.abc import Mapping
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from irreptables import IrrepTable, compiled
+
+from .utility import log_message
+
+
+ENV_VARIABLE = "IRREP_TABLE_SERVICE"
+SERVICE_FORMAT = "irrep-table-service"
+SERVICE_FORMAT_VERSION = 2
+ALIGNMENT = 64
+
+_service = None
+_service_failed = None
+_attach_lock = threading.Lock()
+
+
+def _attach_shared_memory(name):
+    """
+    Attach to an existing shared memory block without registering it in the
+    resource tracker, which would otherwise remove the block when the
+    attaching process exits. The creator is responsible for removing it.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedJSONTable(Mapping):
+    """
+    Read-only mapping whose values are JSON documents stored in a shared
+    memory block. A value is parsed when it is accessed.
+
+    Parameters
+    ----------
+    service : TableService
+        Service holding the block.
+    prefix : str
+        Prefix of the names of the documents in the service.
+    keys : list of str
+        Keys of the mapping.
+    """
+
+    def __init__(self, service, prefix, keys):
+        self._service = service
+        self._prefix = prefix
+        self._keys = keys
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        return self._service.get_json(f"{self._prefix}/{key}")
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class TableService:
+    """
+    Tables stored in a shared memory block. Use :meth:`create` to store the
+    tables and :meth:`attach` to read them from another process.
+
+    The block starts with the length of a JSON header and the position of
+    the data (8 bytes each), followed by the header and the data. The header
+    gives the dtype, shape and offset of each array and the offset and
+    length of each JSON document. The arrays are the concatenated arrays of
+    the compiled tables of irreps (see :mod:`irreptables.compiled`), the
+    flat arrays of the packed store of EBRs (see :func:`ebrs.pack_ebr_data`)
+    and the integer matrices of the formulas of symmetry indicators. They
+    are returned as views of the block, without copying or parsing. The
+    documents are the entries of the tables of symmetry indicators, used to
+    print the formulas, and the names and labels of each set of formulas.
+
+    Parameters
+    ----------
+    shm : multiprocessing.shared_memory.SharedMemory
+        Shared memory block.
+    owner : bool, default=False
+        `True` if the block should be removed when the service is closed.
+
+    Attributes
+    ----------
+    name : str
+        Name of the shared memory block.
+    """
+
+    def __init__(self, shm, owner=False):
+        self._shm = shm
+        self.name = shm.name
+        self.owner = owner
+        self._buf = shm.buf.toreadonly()
+        header_size, start = (int(x) for x in np.frombuffer(self._buf, dtype=np.uint64, count=2))
+        header = json.loads(bytes(self._buf[16:16 + header_size]))
+        if header.get("format") != SERVICE_FORMAT or header.get("version") != SERVICE_FORMAT_VERSION:
+            raise RuntimeError(f"Shared memory block {self.name} does not contain irrep tables "
+                               f"(version {SERVICE_FORMAT_VERSION})")
+        self._arrays = {}
+        for name, (dtype, shape, offset) in header["arrays"].items():
+            self._arrays[name] = np.frombuffer(self._buf, dtype=np.dtype(dtype),
+                                               count=int(np.prod(shape)),
+                                               offset=start + offset).reshape(shape)
+        self._documents = {name: (start + offset, length)
+                           for name, (offset, length) in header["documents"].items()}
+        self._si_keys = header["si_keys"]
+        self._ebr_index = None
+        if header["ebr_keys"] is not None:
+            from .ebrs import ebr_offsets
+            index = {name: self._arrays["ebrs/index/" + name]
+                     for name in ("num_irreps", "num_ebrs", "irrep_list_length")}
+            self._ebr_index = dict(positions={key: i for i, key in enumerate(header["ebr_keys"])},
+                                   num_irreps=index["num_irreps"],
+                                   num_ebrs=index["num_ebrs"],
+                                   offsets=ebr_offsets(**index))
+            self._ebr_data = {name[len("ebrs/data/"):]: array
+                              for name, array in self._arrays.items()
+                              if name.startswith("ebrs/data/")}
+        irreptables = header["irreptables"]
+        if irreptables is None:
+            self._irreptable_index = None
+        else:
+            self._irreptable_index = dict(key=irreptables["key"], name=irreptables["name"])
+            for name in ("nsym", "sym_offset", "kp_offset", "irrep_offset"):
+                self._irreptable_index[name] = self._arrays["index/" + name]
+            compiled.table_positions(self._irreptable_index)
+            self._irreptable_data = {name[len("irreptables/"):]: array
+                                     for name, array in self._arrays.items()
+                                     if name.startswith("irreptables/")}
+        self._finalizer = weakref.finalize(self, _release_shared_memory, shm, owner)
+
+    @classmethod
+    def create(cls, irreptables=True, si_tables=True, ebrs=True, name=None,
+               activate=True, verbosity=0):
+        """
+        Load the tables and store them in a new shared memory block.
+
+        Parameters
+        ----------
+        irreptables : bool or list of str, default=True
+            Tables of irreps to store. `True` stores all of them, or a list of
+            keys (see :func:`irreptables.compiled.table_key`) can be given.
+            They are read from the compiled archive if available, otherwise
+            the text files are parsed.
+        si_tables : bool, default=True
+            Whether to store the tables of symmetry indicators.
+        ebrs : bool or list of str, default=True
+            EBR data to store. `True` stores the data of all groups, or a
+            list of numbers of (magnetic) space groups can be given.
+        name : str, default=None
+            Name of the shared memory block. If `None`, a unique name is
+            chosen.
+        activate : bool, default=True
+            If `True`, the loaders of this process read from the service and
+            the name of the block is exported in the environment variable
+            `IRREP_TABLE_SERVICE`, so that processes started afterwards
+            attach to it.
+        verbosity : int, default=0
+            Verbosity level.
+
+        Returns
+        -------
+        TableService
+        """
+        arrays = {}
+        documents = {}
+        si_keys = {}
+        header = dict(format=SERVICE_FORMAT, version=SERVICE_FORMAT_VERSION, irreptables=None,
+                      ebr_keys=None)
+
+        if irreptables is not False:
+            keys = None if irreptables is True else list(irreptables)
+            if keys is None and compiled.has_compiled_table(compiled.table_key("1", False)):
+                log_message("Storing the compiled tables of irreps in shared memory", verbosity, 1)
+                index, data = compiled.read_archive()
+            else:
+                log_message("Parsing the tables of irreps to store them in shared memory", verbosity, 1)
+                index, data = compiled.compile_arrays(keys=keys)
+            header["irreptables"] = dict(key=list(index["key"]), name=list(index["name"]))
+            for column in ("nsym", "sym_offset", "kp_offset", "irrep_offset"):
+                arrays["index/" + column] = np.asarray(index[column])
+            for key, array in data.items():
+                arrays["irreptables/" + key] = np.asarray(array)
+
+        root = os.path.join(os.path.dirname(__file__), "data")
+        if si_tables:
+            from .symmetry_indicators import SymmetryIndicatorFormulas
+            log_message("Storing the tables of symmetry indicators in shared memory", verbosity, 1)
+            for filename in sorted(glob.glob(os.path.join(root, "symmetry_indicators", "*.json"))):
+                table_name = os.path.basename(filename)[:-len(".json")]
+                with open(filename, "r") as f:
+                    table = json.load(f)
+                si_keys[table_name] = list(table)
+                factors, mods = [], []
+                offset_factors, offset_mods = 0, 0
+                for number_str, value in table.items():
+                    documents[f"si/{table_name}/{number_str}"] = json.dumps(value).encode()
+                    formulas = SymmetryIndicatorFormulas(value["indicators"])
+                    factors.append(formulas.factors.flatten())
+                    mods.append(formulas.mods)
+                    documents[f"si_formulas/{table_name}/{number_str}"] = json.dumps(dict(
+                        names=formulas.names, labels=formulas.labels,
+                        denominator=formulas.denominator,
+                        factors=offset_factors, mods=offset_mods)).encode()
+                    offset_factors += formulas.factors.size
+                    offset_mods += formulas.mods.size
+                arrays[f"si/{table_name}/factors"] = np.concatenate(factors + [np.zeros(0, dtype=np.int64)])
+                arrays[f"si/{table_name}/mods"] = np.concatenate(mods + [np.zeros(0, dtype=np.int64)])
+
+        if ebrs is not False:
+            from .ebrs import ebr_group_numbers, pack_ebr_arrays
+            log_message("Storing the EBR data in shared memory", verbosity, 1)
+            numbers = ebr_group_numbers() if ebrs is True else list(ebrs)
+            keys, index, data = pack_ebr_arrays(numbers)
+            header["ebr_keys"] = keys
+            for name, array in index.items():
+                arrays["ebrs/index/" + name] = array
+            for name, array in data.items():
+                arrays["ebrs/data/" + name] = array
+
+        # layout of the block, offsets are counted from the start of the data
+        offset = 0
+        header["arrays"] = {}
+        for key, array in arrays.items():
+            header["arrays"][key] = (array.dtype.str, list(array.shape), offset)
+            offset = _align(offset + array.nbytes)
+        header["documents"] = {}
+        for key, document in documents.items():
+            header["documents"][key] = (offset, len(document))
+            offset += len(document)
+        header["si_keys"] = si_keys
+        header_bytes = json.dumps(header).encode()
+        start = _align(16 + len(header_bytes))
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=start + offset)
+        try:
+            shm.buf[:16] = np.array([len(header_bytes), start], dtype=np.uint64).tobytes()
+            shm.buf[16:16 + len(header_bytes)] = header_bytes
+            for key, array in arrays.items():
+                _, shape, off = header["arrays"][key]
+                target = np.ndarray(shape, dtype=array.dtype, buffer=shm.buf, offset=start + off)
+                target[...] = array
+                del target
+            for key, document in documents.items():
+                off, length = header["documents"][key]
+                shm.buf[start + off:start + off + length] = document
+            service = cls(shm, owner=True)
+        except BaseException:
+            _release_shared_memory(shm, unlink=True)
+            raise
+        log_message(f"Tables stored in shared memory block {shm.name} "
+                    f"({shm.size / 2**20:.1f} MB)", verbosity, 1)
+        if activate:
+            set_table_service(service)
+            os.environ[ENV_VARIABLE] = service.name
+        return service
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Attach read-only to a shared memory block created by :meth:`create`,
+        possibly in another process.
+
+        Parameters
+        ----------
+        name : str
+            Name of the shared memory block.
+
+        Returns
+        -------
+        TableService
+        """
+        return cls(_attach_shared_memory(name))
+
+    def irreptable(self, number_str, spinor, magnetic=False):
+        """
+        Read a table of irreps.
+
+        Parameters
+        ----------
+        number_str : str
+            Number of the space group (e.g. '2' or '2.4' for magnetic groups).
+        spinor : bool
+            `True` for double-valued irreps, `False` for single-valued ones.
+        magnetic : bool, default=False
+            `True` to load the corepresentations of a magnetic group.
+
+        Returns
+        -------
+        IrrepTable
+            Table of irreps, or `None` if it is not stored in the service.
+        """
+        if self._irreptable_index is None:
+            return None
+        key = compiled.table_key(number_str, spinor, magnetic)
+        if key not in self._irreptable_index["position"]:
+            return None
+        table = IrrepTable.__new__(IrrepTable)
+        table.number_str = number_str
+        table.spinor = spinor
+        compiled.build_table(table, key, self._irreptable_index, self._irreptable_data)
+        return table
+
+    def si_table(self, spinor, magnetic=False):
+        """
+        Read a table of symmetry indicators.
+
+        Parameters
+        ----------
+        spinor : bool
+            `True` for double-valued irreps, `False` for single-valued ones.
+        magnetic : bool, default=False
+            `True` for magnetic space groups.
+
+        Returns
+        -------
+        SharedJSONTable
+            Mapping with the same content as the JSON file of the table, or
+            `None` if it is not stored in the service.
+        """
+        table_name = f"{'double' if spinor else 'single'}_indicators{'_magnetic' if magnetic else ''}"
+        if table_name not in self._si_keys:
+            return None
+        return SharedJSONTable(self, "si/" + table_name, self._si_keys[table_name])
+
+    def si_formulas(self, number_str, spinor, magnetic=False):
+        """
+        Read the formulas of the symmetry indicators of a group.
+
+        Parameters
+        ----------
+        number_str : str
+            Number of the (magnetic) space group.
+        spinor : bool
+            `True` for double-valued irreps, `False` for single-valued ones.
+        magnetic : bool, default=False
+            `True` for magnetic space groups.
+
+        Returns
+        -------
+        SymmetryIndicatorFormulas
+            Formulas whose integer matrices are views of the block, or 
+            `None` if they are not stored in the service.
+        """
+        from .symmetry_indicators import SymmetryIndicatorFormulas
+        table_name = f"{'double' if spinor else 'single'}_indicators{'_magnetic' if magnetic else ''}"
+        name = f"si_formulas/{table_name}/{number_str}"
+        if name not in self._documents:
+            return None
+        entry = self.get_json(name)
+        num_indicators, num_labels = len(entry["names"]), len(entry["labels"])
+        factors = self._arrays[f"si/{table_name}/factors"]
+        mods = self._arrays[f"si/{table_name}/mods"]
+        return SymmetryIndicatorFormulas.from_arrays(
+            entry["names"], entry["labels"],
+            factors[entry["factors"]:entry["factors"] + num_indicators * num_labels].reshape(
+                num_indicators, num_labels),
+            mods[entry["mods"]:entry["mods"] + num_indicators],
+            entry["denominator"])
+
+    def ebr_data(self, sg_number, spinor):
+        """
+        Read the EBR data of a space group.
+
+        Parameters
+        ----------
+        sg_number : str
+            Number of the (magnetic) space group.
+        spinor : bool
+            Whether wave functions are spinors (SOC) or not.
+
+        Returns
+        -------
+        dict
+            EBR data, whose EBR matrix and matrices of the Smith form are
+            views of the block (see :func:`ebrs.ebr_group_from_arrays`), or
+            `None` if it is not stored in the service.
+        """
+        from .ebrs import ebr_group_from_arrays
+        if self._ebr_index is None:
+            return None
+        key = f"{sg_number}/{'double' if spinor else 'single'}"
+        if key not in self._ebr_index["positions"]:
+            return None
+        return ebr_group_from_arrays(self._ebr_index["positions"][key],
+                                     self._ebr_index["num_irreps"],
+                                     self._ebr_index["num_ebrs"],
+                                     self._ebr_index["offsets"],
+                                     self._ebr_data)
+
+    def get_json(self, name):
+        """
+        Parse a JSON document stored in the service.
+
+        Parameters
+        ----------
+        name : str
+            Name of the document.
+
+        Returns
+        -------
+        object
+        """
+        offset, length = self._documents[name]
+        return json.loads(bytes(self._buf[offset:offset + length]))
+
+    def close(self):
+        """
+        Detach from the shared memory block. If this process created the
+        block, it is removed, and processes attached to it keep their
+        mapping until they detach.
+        """
+        global _service
+        if _service is self:
+            _service = None
+        if os.environ.get(ENV_VARIABLE) == self.name and self.owner:
+            del os.environ[ENV_VARIABLE]
+        self._arrays = {}
+        self._irreptable_data = {}
+        self._irreptable_index = None
+        self._ebr_data = {}
+        self._ebr_index = None
+        try:
+            self._buf.release()
+        except BufferError:
+            pass
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _release_shared_memory(shm, unlink):
+    try:
+        shm.close()
+    except BufferError:
+        # arrays viewing the block are still alive, the mapping is closed with them
+        pass
+    if unlink:
+        shm.unlink()
+
+
+def set_table_service(service):
+    """
+    Set the service from which the loaders of this process read the tables.
+
+    Parameters
+    ----------
+    service : TableService
+        Service to use, or `None` to read the files.
+    """
+    global _service
+    _service = service
+
+
+def get_table_service():
+    """
+    Return the service from which the loaders read the tables. If none was
+    set and the environment variable `IRREP_TABLE_SERVICE` gives the name of
+    a shared memory block, the process attaches to it. If attaching fails,
+    the tables are read from the files.
+
+    Returns
+    -------
+    TableService
+        The service, or `None` if there is none.
+    """
+    global _service, _service_failed
+    if _service is None:
+        name = os.environ.get(ENV_VARIABLE)
+        if name and name != _service_failed:
+            try:
+                _service = TableService.attach(name)
+            except (FileNotFoundError, RuntimeError) as err:
+                _service_failed = name
+                log_message(f"Could not attach to the table service {name}: {err}. "
+                            "Tables will be read from the files", 1, 1)
+    return _service
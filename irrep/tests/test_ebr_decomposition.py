@@ -48,3 +48,146 @@ def test_ebr_decomposition_stable_topology():
             "irrep-output.json"
     ):
         os.remove(test_output_file)
+
+
+def test_ebr_store(tmp_path):
+    from irrep import ebrs
+
+    # the store built for the package matches the JSON files
+    filename = ebrs.pack_ebr_data(filename=str(tmp_path / "ebrs.h5"))
+    numbers = ebrs.ebr_group_numbers()
+    for number in numbers[::37] + ["76"]:
+        for spinor in (False, True):
+            data = ebrs._read_ebr_store(number, spinor, filename=filename)
+            data_ref = ebrs._read_ebr_json(number, spinor)
+            assert data["basis"] == data_ref["basis"]
+            assert data["ebrs"] == data_ref["ebrs"]
+            assert np.array_equal(data["matrix"], ebrs.get_ebr_matrix(data_ref).reshape(data["matrix"].shape))
+            for key in ("u", "r", "v"):
+                assert np.array_equal(data["smith_form"][key].flatten(),
+                                      np.array(data_ref["smith_form"][key]).flatten())
+
+    # loaded once, with 2D matrices also for groups with a single EBR
+    ebr_data = ebrs.load_ebr_data("76", True)
+    assert ebrs.load_ebr_data("76", True) is ebr_data
+    u, r, v = ebrs.get_smith_form(ebr_data)
+    num_irreps, num_ebrs = ebr_data["matrix"].shape
+    assert num_ebrs == 1
+    assert u.shape == (num_irreps, num_irreps)
+    assert r.shape == (num_irreps, num_ebrs)
+    assert v.shape == (num_ebrs, num_ebrs)
+    assert not ebr_data["matrix"].flags.writeable
+
+
+def test_ebr_decomposition_solver():
+    import pytest
+    pytest.importorskip("ortools")
+    from irrep import ebrs
+
+    ebr_data = ebrs.load_ebr_data("2", True)
+    EBR = ebrs.get_ebr_matrix(ebr_data)
+    x0 = np.random.default_rng(0).integers(0, 3, EBR.shape[1])
+
+    for norm, norm_func in (("L1", lambda x: np.abs(x).sum()), ("L2", lambda x: (x**2).sum())):
+        solutions, is_positive, complete = ebrs.compute_ebr_decomposition(ebr_data, EBR @ x0, norm=norm)
+        assert is_positive and complete
+        assert len(solutions) == 5
+        assert len({tuple(x) for x in solutions}) == 5
+        norms = [norm_func(np.array(x)) for x in solutions]
+        assert norms == sorted(norms)
+        assert norms[0] <= norm_func(x0)
+        for x in solutions:
+            assert np.array_equal(EBR @ x, EBR @ x0)
+            assert min(x) >= 0
+
+    # EBR matrices are nonnegative, so -y has no decomposition with nonnegative coefficients
+    solutions, is_positive, complete = ebrs.compute_ebr_decomposition(ebr_data, -EBR @ x0, n_smallest=2)
+    assert not is_positive and complete
+    assert len(solutions) == 2
+    for x in solutions:
+        assert np.array_equal(EBR @ x, -EBR @ x0)
+
+    # no time to search: nothing is found and the result is flagged as incomplete
+    assert ebrs.compute_ebr_decomposition(ebr_data, EBR @ x0, time_limit=0) == (None, False, False)
+
+
+def test_ebr_decomposition_scipy():
+    import pytest
+    from irrep import ebrs
+
+    ebr_data = ebrs.load_ebr_data("2", True)
+    EBR = ebrs.get_ebr_matrix(ebr_data)
+    x0 = np.random.default_rng(0).integers(0, 3, EBR.shape[1])
+    for y, positive in ((EBR @ x0, True), (-EBR @ x0, False)):
+        solutions, is_positive, complete = ebrs.compute_ebr_decomposition(
+            ebr_data, y, n_smallest=3, backend="scipy")
+        assert is_positive == positive and complete
+        assert len({tuple(x) for x in solutions}) == 3
+        norms = [np.abs(x).sum() for x in solutions]
+        assert norms == sorted(norms)
+        for x in solutions:
+            assert np.array_equal(EBR @ x, y)
+        if ebrs.ORTOOLS_AVAILABLE:
+            solutions_cpsat, _, _ = ebrs.compute_ebr_decomposition(
+                ebr_data, y, n_smallest=3, backend="cpsat")
+            assert norms == [np.abs(x).sum() for x in solutions_cpsat]
+
+    with pytest.raises(ValueError):
+        ebrs.compute_ebr_decomposition(ebr_data, EBR @ x0, norm="L2", backend="scipy")
+
+
+def test_smith_parametrization():
+    from irrep import ebrs
+
+    rng = np.random.default_rng(0)
+    for number in ("2", "47", "191", "229"):
+        for spinor in (False, True):
+            ebr_data = ebrs.load_ebr_data(number, spinor)
+            EBR = ebrs.get_ebr_matrix(ebr_data)
+            x = rng.integers(-2, 3, EBR.shape[1])
+            x0, kernel, coordinates = ebrs.smith_parametrization(ebr_data, EBR @ x)
+            assert not (EBR @ kernel).any()
+            assert np.array_equal(EBR @ x0, EBR @ x)
+            # every solution is reached from its kernel coordinates
+            assert np.array_equal(x0 + kernel @ (coordinates @ x), x)
+            # an extra irrep at a single k-point breaks the compatibility relations
+            y = EBR @ x
+            y[0] += 1
+            assert ebrs.smith_parametrization(ebr_data, y) == (None, None, None)
+
+
+def test_classify_batch():
+    from irrep import ebrs
+
+    ebr_data = ebrs.load_ebr_data("2", True)
+    EBR = ebrs.get_ebr_matrix(ebr_data)
+    rng = np.random.default_rng(1)
+    Y = (EBR @ rng.integers(-1, 3, (EBR.shape[1], 4))).T
+    Y = np.vstack([Y, Y[:2], Y[:1] + 2 * EBR[:, :1].T])
+    Y[-1, 0] += 1  # not a combination of EBRs
+
+    ebrs._classification_cache.clear()
+    results = ebrs.classify_batch("2", True, Y, n_smallest=2, num_processes=2)
+    assert len(results) == len(Y)
+    for y, result in zip(Y, results):
+        y_ref, y_prime, nontrivial = ebrs.compute_topological_classification_vector(
+            dict(zip(ebr_data["basis"]["irrep_labels"], y)), ebr_data)
+        assert np.array_equal(result["y"], y_ref)
+        assert np.array_equal(result["y_prime"], y_prime)
+        if nontrivial:
+            assert result["classification"] == "STABLE TOPOLOGICAL"
+            continue
+        solutions, is_positive, complete = ebrs.compute_ebr_decomposition(ebr_data, y, n_smallest=2)
+        assert result["complete"] == complete
+        assert result["classification"] == ebrs.classify_decomposition(False, is_positive, complete)
+        if solutions is None:
+            assert result["solutions"] is None
+        else:
+            assert [np.abs(x).sum() for x in result["solutions"]] == [np.abs(x).sum() for x in solutions]
+    for i, j in ((4, 0), (5, 1)):
+        assert results[i]["classification"] == results[j]["classification"]
+        assert results[i]["solutions"] is results[j]["solutions"]
+
+    # identical vectors are solved once and cached
+    assert len(ebrs._classification_cache) == len(np.unique(Y[:4], axis=0))
+    assert ebrs.classify_batch("2", True, Y[:1], n_smallest=2)[0]["solutions"] is results[0]["solutions"]
@@ -0,0 +1,36 @@
+import numpy as np
+from irreptables import IrrepTable, compiled
+
+
+def test_compiled_tables(tmp_path):
+    keys = [compiled.table_key("2", True),
+            compiled.table_key("221", False),
+            compiled.table_key("230.148", True, magnetic=True)]
+    filename = str(tmp_path / "irreptables.h5")
+    compiled.compile_tables(filename=filename, keys=keys)
+    assert compiled.has_compiled_table(keys[0], filename=filename)
+    assert not compiled.has_compiled_table(compiled.table_key("3", True), filename=filename)
+
+    for key in keys:
+        _, SGnumber, spinor, magnetic = compiled.text_tables()[key]
+        table_ref = IrrepTable(SGnumber, spinor, magnetic=magnetic, use_compiled=False)
+        table = IrrepTable.__new__(IrrepTable)
+        compiled.load_compiled_table(table, key, filename=filename)
+        assert table.name == table_ref.name
+        assert table.nsym == table_ref.nsym
+        assert len(table.symmetries) == len(table_ref.symmetries)
+        for sym, sym_ref in zip(table.symmetries, table_ref.symmetries):
+            assert np.array_equal(sym.R, sym_ref.R)
+            assert np.allclose(sym.t, sym_ref.t)
+            assert np.allclose(sym.S, sym_ref.S)
+            assert sym.time_reversal == sym_ref.time_reversal
+        assert len(table.irreps) == len(table_ref.irreps)
+        for irr, irr_ref in zip(table.irreps, table_ref.irreps):
+            assert irr.name == irr_ref.name
+            assert irr.kpname == irr_ref.kpname
+            assert np.allclose(irr.k, irr_ref.k)
+            assert irr.dim == irr_ref.dim
+            assert irr.reality == irr_ref.reality
+            assert list(irr.characters) == list(irr_ref.characters)
+            assert np.allclose(list(irr.characters.values()), list(irr_ref.characters.values()))
+            assert irr.str() == irr_ref.str()
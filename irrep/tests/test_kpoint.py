@@ -0,0 +1,196 @@
+import copy
+import weakref
+from pathlib import Path
+import numpy as np
+import pytest
+from irrep.bandstructure import BandStructure
+from irrep.gvectors import match_gvectors
+
+TEST_FILES_PATH = Path(__file__).parents[2] / "examples"
+
+
+def get_bandstructure(**kwargs):
+    path = TEST_FILES_PATH / "Bi-hoti"
+    kwargs = dict(dict(Ecut=50, IBend=10, EF="1.5"), **kwargs)
+    return BandStructure(code="vasp",
+                         fWAV=str(path / "WAVECAR"),
+                         fPOS=str(path / "POSCAR"),
+                         spinor=True,
+                         **kwargs)
+
+
+def overlap_dense(kp1, kp2):
+    """Overlap computed on the bounding box of both sets of g-vectors."""
+    g = np.array((kp1.k - kp2.k).round(), dtype=int)
+    ig1 = kp1.ig[:, :3]
+    ig2 = kp2.ig[:, :3] - g[None, :]
+    igmin = np.minimum(ig1.min(axis=0), ig2.min(axis=0))
+    size = np.maximum(ig1.max(axis=0), ig2.max(axis=0)) - igmin + 1
+    WF1 = np.zeros((kp1.num_bands, *size, kp1.nspinor), dtype=complex)
+    WF2 = np.zeros((kp2.num_bands, *size, kp2.nspinor), dtype=complex)
+    WF1[:, ig1[:, 0] - igmin[0], ig1[:, 1] - igmin[1], ig1[:, 2] - igmin[2]] = kp1.WF
+    WF2[:, ig2[:, 0] - igmin[0], ig2[:, 1] - igmin[1], ig2[:, 2] - igmin[2]] = kp2.WF
+    return np.einsum("mabcs,nabcs->mn", WF1.conj(), WF2)
+
+
+def test_match_gvectors():
+    rng = np.random.default_rng(0)
+    ig = np.unique(rng.integers(-5, 6, size=(200, 3)), axis=0)
+    ig_other = np.unique(rng.integers(-4, 8, size=(150, 3)), axis=0)
+    rng.shuffle(ig_other)
+    ind, ind_other = match_gvectors(ig, ig_other)
+    assert np.array_equal(ig[ind], ig_other[ind_other])
+    common = {tuple(g) for g in ig} & {tuple(g) for g in ig_other}
+    assert len(ind) == len(common)
+
+
+def test_overlap():
+    bandstr = get_bandstructure()
+    kp1, kp2 = bandstr.kpoints[:2]
+    assert np.allclose(np.diag(kp1.overlap(kp1)), 1, atol=1e-5)
+    assert np.allclose(kp1.overlap(kp2), overlap_dense(kp1, kp2))
+    # the same k-point shifted by a reciprocal lattice vector
+    kp3 = copy.copy(kp1)
+    kp3.k = kp1.k + np.array([1, 0, -1])
+    kp3.ig = kp1.ig.copy()
+    kp3.ig[:, :3] -= np.array([1, 0, -1])
+    assert np.allclose(kp1.overlap(kp3), kp1.overlap(kp1))
+
+
+def test_wilson_loop_streaming():
+    bandstr_ref = get_bandstructure(save_wf=True, irreps=True)
+    bandstr = get_bandstructure(save_wf=False, irreps=True)
+    assert all(kp.WF is None for kp in bandstr.kpoints)
+    wcc_ref = bandstr_ref.wcc()
+    assert np.allclose(bandstr.wcc(), wcc_ref)
+    assert all(kp.WF is None for kp in bandstr.kpoints)
+    for z, z_ref in zip(bandstr.zakphase(), bandstr_ref.zakphase()):
+        assert np.allclose(z, z_ref)
+
+
+def test_wcc_loops():
+    bandstr = get_bandstructure(save_wf=False, irreps=True)
+    wcc_ref = bandstr.wcc()
+    loops = [[0, 1, 2, 3], [1, 2, 3, 0], [3, 2, 1, 0]]
+    wcc = bandstr.wcc_loops(loops, num_workers=2)
+    assert wcc.shape == (3, bandstr.kpoints[0].num_bands)
+    assert np.allclose(wcc[0], wcc_ref)
+    assert np.allclose(wcc[1], wcc_ref)
+    # reversing the loop changes the sign of the phases
+    assert np.allclose(np.sort((1 - wcc[2]) % 1), wcc_ref)
+
+
+def test_wcc_loops_alignments(monkeypatch):
+    from irrep.kpoint import Kpoint
+    calls = []
+    gvector_alignment = Kpoint.gvector_alignment
+    monkeypatch.setattr(Kpoint, "gvector_alignment",
+                        lambda self, other: calls.append(1) or gvector_alignment(self, other))
+    for save_wf in (True, False):
+        bandstr = get_bandstructure(save_wf=save_wf, irreps=True)
+        # the second loop has the same pairs of sets of plane waves
+        wcc = bandstr.wcc_loops([[0, 1, 2, 3], [0, 1, 2, 3]], num_workers=1)
+        assert np.allclose(wcc[0], wcc[1])
+        assert len(calls) == 4
+        calls.clear()
+
+
+def test_get_wilson_loops():
+    bandstr = get_bandstructure(save_wf=False)
+    kpts = [[0, 0.5, 0], [0.5, 0, 0], [0, 0, 0], [0.5, 0.5, 0]]
+    for kp, k in zip(bandstr.kpoints, kpts):
+        kp.k = np.array(k)
+    loops, origins = bandstr.get_wilson_loops(direction=1)
+    assert np.array_equal(loops, [[2, 0], [1, 3]])
+    assert np.allclose(origins, [[0, 0, 0], [0.5, 0, 0]])
+    with pytest.raises(ValueError):
+        bandstr.kpoints[3].k = np.array([0.5, 0.5, 0.5])
+        bandstr.get_wilson_loops(direction=1)
+
+    # a grid including both endpoints, k=0 and k=1, keeps only the first one
+    kpts = [[0, 1, 0], [0, 1 / 3, 0], [0, 0, 0], [0, 2 / 3, 0]]
+    for kp, k in zip(bandstr.kpoints, kpts):
+        kp.k = np.array(k)
+    loops, origins = bandstr.get_wilson_loops(direction=1)
+    assert np.array_equal(loops, [[0, 1, 3]])
+    assert np.allclose(origins, [[0, 0, 0]])
+
+
+def test_get_rho_spin():
+    bandstr = get_bandstructure(save_wf=True)
+    kp = bandstr.kpoints[0]
+    rho = kp.get_rho_spin(1e-4)
+    assert kp.get_rho_spin(1e-4) is rho
+    sigma = [np.eye(2), [[0, 1], [1, 0]], [[0, -1j], [1j, 0]], [[1, 0], [0, -1]]]
+    for b1, b2, E, matrices in rho:
+        assert np.isclose(E, kp.Energy_raw[b1:b2].mean())
+        WF = kp.WF[b1:b2]
+        for M, s in zip(matrices, sigma):
+            assert np.allclose(M, np.einsum("igs,st,jgt->ij", WF.conj(), s, WF), atol=1e-6)
+
+    # the cache is bounded and belongs to the instance
+    for thresh in np.linspace(1e-4, 1e-3, kp.rho_spin_cache_size + 1):
+        kp.get_rho_spin(thresh)
+    assert len(kp._rho_spin_cache) == kp.rho_spin_cache_size
+    kp_copy = copy.copy(kp)
+    assert len(kp_copy._rho_spin_cache) == 0
+    kp_copy.get_rho_spin(1e-4)
+    kp_copy.WF = kp.WF[::-1]
+    assert len(kp_copy._rho_spin_cache) == 0
+    assert len(kp._rho_spin_cache) == kp.rho_spin_cache_size
+    ref = weakref.ref(kp_copy)
+    kp_copy.get_rho_spin(1e-4)
+    del kp_copy
+    assert ref() is None
+
+
+def unfold_reference(kp, supercell, kptPBZ, degen_thresh=1e-4):
+    """Unfolding with a floating-point selection of the plane waves."""
+    g_shift = kptPBZ - kp.k.dot(np.linalg.inv(supercell.T))
+    dg = kp.ig[:, :3].dot(np.linalg.inv(supercell.T)) - g_shift
+    WF = kp.WF[:, np.all(abs(dg - np.round(dg)) < 1e-4, axis=1), :]
+    result = []
+    for b1, b2, E, matrices in kp.get_rho_spin(degen_thresh):
+        proj = np.einsum('igs,jgs->ij', WF[b1:b2].conj(), WF[b1:b2])
+        result.append([E] + [np.trace(proj.dot(M)).real for M in matrices])
+    return np.array(result)
+
+
+def test_unfold_many():
+    bandstr = get_bandstructure(save_wf=True)
+    kp = bandstr.kpoints[2]
+    supercell = np.array([[1, 1, 0], [-1, 1, 0], [0, 0, 2]])
+    # all the points of the primitive BZ that fold onto kp
+    shifts = np.array([[i, j, l] for i in range(2) for j in range(2) for l in range(2)])
+    kpts_PBZ = (kp.k + shifts) @ np.linalg.inv(supercell.T)
+    unfolded = kp.unfold_many(supercell, kpts_PBZ)
+    assert unfolded.shape == (len(kpts_PBZ), len(kp.get_rho_spin()), 5)
+    for kptPBZ, res in zip(kpts_PBZ, unfolded):
+        assert np.allclose(res, unfold_reference(kp, supercell, kptPBZ), atol=1e-6)
+        assert np.allclose(kp.unfold(supercell, kptPBZ), res)
+    # the weights of the distinct points sum up to the weight in the supercell
+    distinct = np.unique(np.round(kpts_PBZ % 1, 6) % 1, axis=0, return_index=True)[1]
+    assert len(distinct) == 4
+    total = kp.unfold(np.eye(3, dtype=int), kp.k)
+    assert np.allclose(unfolded[distinct, :, 1:].sum(axis=0), total[:, 1:], atol=1e-5)
+    with pytest.raises(RuntimeError):
+        kp.unfold_many(supercell, kpts_PBZ + 0.1)
+
+
+def test_little_groups_from_header():
+    from irrep.readfiles import ParserVasp
+
+    path = TEST_FILES_PATH / "Bi-hoti"
+    parser = ParserVasp(str(path / "POSCAR"), str(path / "WAVECAR"))
+    parser.parse_poscar()
+    NK, NBin, _, _ = parser.parse_header()
+    kpoints = parser.parse_kpoint_coordinates()
+    assert kpoints.shape == (NK, 3)
+
+    bandstr = get_bandstructure()
+    u_symmetries = bandstr.spacegroup.u_symmetries
+    for k, kp in zip(kpoints, bandstr.kpoints):
+        assert np.allclose(k, kp.k)
+        mask = bandstr.spacegroup.little_group_mask(kp.k, u_symmetries)[0]
+        assert ([symop.ind for symop in kp.little_group]
+                == sorted(symop.ind for symop, m in zip(u_symmetries, mask) if m))
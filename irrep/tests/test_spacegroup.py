@@ -0,0 +1,192 @@
+from pathlib import Path
+import numpy as np
+from irrep.bandstructure import BandStructure
+from irrep.spacegroup_irreps import load_irreptable
+
+TEST_FILES_PATH = Path(__file__).parents[2] / "examples"
+
+
+def get_spacegroup():
+    path = TEST_FILES_PATH / "Bi-hoti"
+    bandstr = BandStructure(code="vasp",
+                            fWAV=str(path / "WAVECAR"),
+                            fPOS=str(path / "POSCAR"),
+                            spinor=True,
+                            Ecut=50,
+                            IBend=10,
+                            EF="1.5",
+                            kplist=np.array([1]))
+    return bandstr.spacegroup
+
+
+def little_group_loop(k, symmetries):
+    result = []
+    for symop in symmetries:
+        k_rotated = np.dot(np.linalg.inv(symop.rotation).T, k)
+        dkpt = np.round(k_rotated - k)
+        result.append(np.allclose(dkpt, k_rotated - k))
+    return np.array(result)
+
+
+def test_little_group_mask():
+    spacegroup = get_spacegroup()
+    rng = np.random.default_rng(0)
+    kpoints = np.vstack((np.array([[i, j, l] for i in (0, 0.5) for j in (0, 0.5) for l in (0, 0.5)]),
+                         [[0.1, 0.1, 0.1], [0.2, 0.2, 0.], [-0.3, 0.3, 0.]],
+                         rng.random((5, 3))))
+    symmetries = spacegroup.u_symmetries
+    mask = spacegroup.little_group_mask(kpoints)
+    assert mask.shape == (len(kpoints), len(symmetries))
+    assert mask[:, 0].all()
+    for k, m in zip(kpoints, mask):
+        assert np.array_equal(m, little_group_loop(k, symmetries))
+
+
+def test_character_matrix():
+    path = TEST_FILES_PATH / "Bi-hoti"
+    bandstr = BandStructure(code="vasp",
+                            fWAV=str(path / "WAVECAR"),
+                            fPOS=str(path / "POSCAR"),
+                            spinor=True,
+                            Ecut=50,
+                            IBend=18,
+                            EF="1.5",
+                            irreps=True,
+                            calculate_traces=True,
+                            search_cell=True,
+                            kplist=np.array([1, 2]))
+    kpnames = ["T", "GM"]
+    spacegroup = bandstr.spacegroup
+    # the table is parsed only once
+    hits = load_irreptable.cache_info().hits
+    bandstr.identify_irreps(kpnames)
+    assert load_irreptable.cache_info().hits == hits + len(kpnames)
+    assert load_irreptable(spacegroup.number_str, True) is load_irreptable(spacegroup.number_str, True)
+    for kpname, kp in zip(kpnames, bandstr.kpoints):
+        names, characters = spacegroup.get_character_matrix(kpname, kp.k, kp.little_group)
+        assert characters.shape == (len(names), len(kp.little_group))
+        assert spacegroup.get_character_matrix(kpname, kp.k, kp.little_group)[1] is characters
+        irreps = kp.irreps
+        kp.identify_irreps(irreptable=spacegroup.get_irreps_from_table(kpname, kp.k))
+        assert len(kp.irreps) == len(irreps)
+        for ir1, ir2 in zip(kp.irreps, irreps):
+            assert ir1.keys() == ir2.keys()
+            assert np.allclose(list(ir1.values()), list(ir2.values()))
+
+
+def test_match_spinor_rotations():
+    from irrep.spacegroup_irreps import match_spinor_rotations
+
+    rng = np.random.default_rng(0)
+    for number in ("1", "2", "75", "186", "221", "229"):
+        S2 = [sym.S for sym in load_irreptable(number, True).symmetries]
+        # random SU(2) basis change and signs
+        q = rng.normal(size=4)
+        q /= np.linalg.norm(q)
+        R = np.array([[q[0] + 1j * q[3], q[2] + 1j * q[1]],
+                      [-q[2] + 1j * q[1], q[0] - 1j * q[3]]])
+        signs = rng.choice([1, -1], len(S2))
+        S1 = [s * R @ b @ R.T.conj() for s, b in zip(signs, S2)]
+        signs_found, R_found = match_spinor_rotations(S1, S2)
+        assert np.allclose(R_found @ R_found.T.conj(), np.eye(2))
+        for s, a, b in zip(signs_found, S1, S2):
+            assert np.allclose(R_found @ b @ R_found.T.conj(), s * a)
+        # the solution is deterministic
+        assert np.array_equal(match_spinor_rotations(S1, S2)[1], R_found)
+
+
+def test_match_symmetries_shifted_origin():
+    from irrep.spacegroup_irreps import SpaceGroupIrreps
+
+    # diamond and zincblende with the origin away from the inversion center
+    lattice = np.array([[0, .5, .5], [.5, 0, .5], [.5, .5, 0]]) * 5.4
+    positions = (np.array([[0, 0, 0], [.25, .25, .25]]) + [0.13, 0.41, 0.07]) % 1
+    for typat in ([1, 1], [1, 2]):
+        sg = SpaceGroupIrreps.from_cell(real_lattice=lattice, positions=positions, typat=typat,
+                                        spinor=True, search_cell=True)
+        ind, dt, signs, _ = sg.match_symmetries(signs=True)
+        assert sorted(ind) == list(range(len(sg.symmetries)))
+        assert [sym.ind for sym in sg.symmetries] == [i + 1 for i in ind]
+
+        # translations for several shifts at once agree with translation_refUC
+        shifts = np.random.default_rng(0).random((4, 3))
+        t_tables = np.zeros((len(sg.symmetries), 3))
+        t, _, _ = sg._match_translations(sg.refUC, shifts, sg.symmetries, t_tables)
+        for s, shift in enumerate(shifts):
+            for j, sym in enumerate(sg.symmetries):
+                assert np.allclose(t[s, j], sym.translation_refUC(sg.refUC, shift))
+
+
+def test_spacegroup_cache(tmp_path):
+    from irrep.spacegroup import SpaceGroup
+    from irrep.spacegroup_irreps import SpaceGroupIrreps
+
+    lattice = np.array([[0, .5, .5], [.5, 0, .5], [.5, .5, 0]]) * 5.4
+    positions = (np.array([[0, 0, 0], [.25, .25, .25]]) + [0.13, 0.41, 0.07]) % 1
+    kwargs = dict(real_lattice=lattice, positions=positions, typat=[1, 1], spinor=True,
+                  search_cell=True, cache_dir=str(tmp_path))
+    sg = SpaceGroupIrreps.from_cell(**kwargs)
+    assert len(list(tmp_path.iterdir())) == 1
+    sg_cached = SpaceGroupIrreps.from_cell(**kwargs)
+    assert len(list(tmp_path.iterdir())) == 1
+    # a different tolerance gives a different entry
+    SpaceGroupIrreps.from_cell(symprec=1e-4, **kwargs)
+    assert len(list(tmp_path.iterdir())) == 2
+
+    assert sg_cached.irreps_are_set
+    assert sg_cached.number_str == sg.number_str and sg_cached.name == sg.name
+    for attr in ("refUC", "shiftUC", "spin_transf"):
+        assert np.array_equal(getattr(sg_cached, attr), getattr(sg, attr))
+    for sym, sym_cached in zip(sg.symmetries, sg_cached.symmetries):
+        assert (sym.ind, sym.sign) == (sym_cached.ind, sym_cached.sign)
+        assert np.array_equal(sym.rotation, sym_cached.rotation)
+        assert np.array_equal(sym.translation, sym_cached.translation)
+        assert np.array_equal(sym.spinor_rotation, sym_cached.spinor_rotation)
+    assert sg_cached.write_trace() == sg.write_trace()
+
+    # the plain space group goes through as_dict and back
+    sg_plain = SpaceGroup.from_dict(sg.as_dict(full=True))
+    assert [s.ind for s in sg_plain.symmetries] == [s.ind for s in sg.symmetries]
+    assert np.array_equal(sg_plain.refUC, sg.refUC)
+    sg_plain = SpaceGroup(**sg.as_dict())
+    assert len(sg_plain.symmetries) == len(sg.symmetries)
+
+
+def test_symmetry_array():
+    from irrep.spacegroup import SpaceGroup
+    from irrep.utility import get_mapping_irr, restore_full_grid, select_irreducible
+
+    lattice = np.array([[0, .5, .5], [.5, 0, .5], [.5, .5, 0]]) * 5.4
+    sg = SpaceGroup.from_cell(real_lattice=lattice, positions=[[0, 0, 0], [.25, .25, .25]],
+                              typat=[1, 1], spinor=True, include_TR=True)
+    symmetry_array = sg.symmetry_array()
+    assert sg.symmetry_array() is symmetry_array
+    assert list(symmetry_array) == sg.symmetries
+
+    grid = (4, 4, 4)
+    kpoints = np.array([[i / grid[0], j / grid[1], k / grid[2]]
+                        for i in range(grid[0]) for j in range(grid[1]) for k in range(grid[2])])
+    transformed = symmetry_array.transform_k(kpoints)
+    assert transformed.shape == (len(sg.symmetries), len(kpoints), 3)
+    for isym, symop in enumerate(sg.symmetries):
+        for ik in (0, 5, 37):
+            assert np.allclose(transformed[isym, ik], symop.transform_k(kpoints[ik]))
+    assert np.array_equal(symmetry_array.little_group_mask(kpoints[:10]),
+                          sg.little_group_mask(kpoints[:10], sg.symmetries))
+
+    irr = select_irreducible(kpoints, sg)
+    kptirr2kpt, kpt2kptirr, kpt_from_kptirr_isym = get_mapping_irr(kpoints, irr, sg)
+    assert np.array_equal(irr[kpt2kptirr[irr]], irr)
+    for ikirr, i in enumerate(irr):
+        for isym, symop in enumerate(sg.symmetries):
+            diff = symop.transform_k(kpoints[i]) - kpoints[kptirr2kpt[ikirr, isym]]
+            assert np.allclose(diff, np.round(diff))
+    for ik, ikirr in enumerate(kpt2kptirr):
+        assert ik in kptirr2kpt[ikirr]
+        assert ik in kpt_from_kptirr_isym[ikirr] or ik == 0
+
+    all_k, kptirr2kpt, kpt2kptirr, _ = restore_full_grid(kpoints[irr], grid, sg)
+    assert len(all_k) == len(kpoints)
+    assert np.allclose(all_k[:len(irr)], kpoints[irr])
+    assert np.array_equal(np.sort(np.round(all_k * grid) % grid, axis=0),
+                          np.sort(np.round(kpoints * grid) % grid, axis=0))
@@ -0,0 +1,114 @@
+import os
+from pathlib import Path
+import numpy as np
+from irrep.bandstructure import BandStructure
+
+TEST_FILES_PATH = Path(__file__).parents[2] / "examples"
+
+
+def get_bandstructure(**kwargs):
+    path = TEST_FILES_PATH / "Bi-hoti"
+    kwargs = dict(dict(Ecut=50, IBend=10, EF="1.5"), **kwargs)
+    return BandStructure(code="vasp",
+                         fWAV=str(path / "WAVECAR"),
+                         fPOS=str(path / "POSCAR"),
+                         spinor=True,
+                         irreps=True,
+                         calculate_traces=True,
+                         **kwargs)
+
+
+def test_wf_cache(tmp_path):
+    bandstr_ref = get_bandstructure()
+    bandstr_write = get_bandstructure(wf_cache_dir=tmp_path)
+    files = os.listdir(tmp_path)
+    assert len(files) == 1
+    bandstr_read = get_bandstructure(wf_cache_dir=tmp_path)
+    assert os.listdir(tmp_path) == files
+
+    for bandstr in bandstr_write, bandstr_read:
+        assert bandstr.num_k == bandstr_ref.num_k
+        for kp, kp_ref in zip(bandstr.kpoints, bandstr_ref.kpoints):
+            assert np.allclose(kp.k, kp_ref.k)
+            assert np.array_equal(kp.ig, kp_ref.ig)
+            assert np.allclose(kp.Energy_raw, kp_ref.Energy_raw)
+            assert np.allclose(kp.upper, kp_ref.upper)
+            assert np.allclose(kp.WF, kp_ref.WF, atol=1e-6)
+            assert np.allclose(kp.char, kp_ref.char, atol=1e-5)
+
+    # a different band window gives a different cache file
+    get_bandstructure(wf_cache_dir=tmp_path, IBstart=3)
+    assert len(os.listdir(tmp_path)) == 2
+
+    # the least recently used file is removed when the size limit is exceeded
+    get_bandstructure(wf_cache_dir=tmp_path, wf_cache_max_size=1e-9)
+    assert os.listdir(tmp_path) == files
+
+
+def test_hash_files(tmp_path):
+    from irrep.storage import hash_files
+
+    path = tmp_path / "WAVECAR"
+    path.write_bytes(bytes(range(256)) * 16)
+    key = hash_files([path], extra=(1,))
+    assert hash_files([str(tmp_path)], extra=(1,)) == key
+    assert hash_files([path], extra=(2,)) != key
+    # rewriting a file changes its modification time, hence the key
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert hash_files([path], extra=(1,)) != key
+
+
+def test_export(tmp_path):
+    bandstr_ref = get_bandstructure()
+    bandstr_ref.export(tmp_path / "Bi.h5")
+    bandstr = BandStructure(code="irrep",
+                            fIRREP=str(tmp_path / "Bi.h5"),
+                            Ecut=40,
+                            EF="1.5",
+                            irreps=True,
+                            calculate_traces=True)
+    bandstr_ref = get_bandstructure(Ecut=40)
+    assert bandstr.spacegroup.number_str == bandstr_ref.spacegroup.number_str
+    assert bandstr.num_k == bandstr_ref.num_k
+    for kp, kp_ref in zip(bandstr.kpoints, bandstr_ref.kpoints):
+        assert np.allclose(kp.k, kp_ref.k)
+        assert np.array_equal(np.unique(kp.ig[:, :3], axis=0), np.unique(kp_ref.ig[:, :3], axis=0))
+        assert np.allclose(kp.Energy_raw, kp_ref.Energy_raw)
+        assert np.allclose(kp.upper, kp_ref.upper)
+        assert np.allclose(kp.char, kp_ref.char, atol=1e-5)
+
+
+def test_wf_memmap(tmp_path, monkeypatch):
+    bandstr_ref = get_bandstructure()
+    bandstr = get_bandstructure(wf_memmap=True, scratch_dir=tmp_path)
+    scratch = bandstr.wf_scratch.path
+    assert os.path.dirname(scratch) == str(tmp_path)
+    for kp, kp_ref in zip(bandstr.kpoints, bandstr_ref.kpoints):
+        assert isinstance(kp.WF, np.memmap)
+        assert not kp.WF.flags.writeable
+        assert np.allclose(kp.WF, kp_ref.WF)
+
+    # the subspaces of a k-point are moved to the scratch before the next one is separated
+    from irrep.kpoint import Kpoint
+    produced = []
+    separate = Kpoint.Separate
+
+    def separate_checked(self, *args, **kwargs):
+        assert all(isinstance(kp.WF, np.memmap) for kps in produced for kp in kps.values())
+        produced.append(separate(self, *args, **kwargs))
+        return produced[-1]
+
+    monkeypatch.setattr(Kpoint, "Separate", separate_checked)
+    separated = bandstr.Separate(2, groupKramers=False)
+    monkeypatch.undo()
+    assert len(produced) == len(bandstr.kpoints)
+    del produced
+    separated_ref = bandstr_ref.Separate(2, groupKramers=False)
+    assert len(separated) == len(separated_ref)
+    for sub in separated.values():
+        for kp in sub.kpoints:
+            assert isinstance(kp.WF, np.memmap)
+
+    del bandstr, separated, sub, kp
+    assert not os.path.exists(scratch)
@@ -43,3 +43,58 @@ def test_symmetry_indicators_stable_topology():
             "irrep-output.json"
     ):
         os.remove(test_output_file)
+
+
+def test_si_tables_sharded():
+    import json
+    import numpy as np
+    from irrep.symmetry_indicators import (
+        SI_DIR, si_table_name, scan_si_table, load_si_index, load_si_group, load_si_formulas
+    )
+
+    rng = np.random.default_rng(0)
+    for spinor in (False, True):
+        for magnetic in (False, True):
+            name = si_table_name(spinor, magnetic)
+            filename = os.path.join(SI_DIR, name + ".json")
+            # the index file shipped with the package is up to date
+            assert load_si_index(name) == scan_si_table(filename)
+            with open(filename) as f:
+                table = json.load(f)
+            for number_str in list(table)[::7]:
+                entry = table[number_str]
+                assert load_si_group(number_str, spinor, magnetic) == entry
+                formulas = load_si_formulas(number_str, spinor, magnetic)
+                # multiples of the denominator give integer indicators
+                counts = {label: formulas.denominator * int(rng.integers(0, 9))
+                          for label in formulas.labels}
+                indicators = formulas.evaluate(counts)
+                for indicator, formula in entry["indicators"].items():
+                    total = sum(factor * counts[label] for label, factor in formula["factors"].items())
+                    assert indicators[indicator] == total % formula["mod"]
+            assert load_si_group("1", spinor, magnetic) is None
+            assert load_si_formulas("1", spinor, magnetic) is None
+
+
+def test_si_formulas_match_loop():
+    # indicators computed formula by formula, as before the matrix form
+    import json
+    import numpy as np
+    from irrep.symmetry_indicators import SI_DIR, si_table_name, load_si_formulas
+
+    rng = np.random.default_rng(1)
+    with open(os.path.join(SI_DIR, si_table_name(True) + ".json")) as f:
+        table = json.load(f)
+    for number_str, entry in table.items():
+        formulas = load_si_formulas(number_str, True)
+        counts = {label: formulas.denominator * int(rng.integers(0, 5))
+                  for label in formulas.labels}
+        expected = {}
+        for indicator, formula in entry["indicators"].items():
+            total = 0
+            for label, value in formula["factors"].items():
+                total += value * counts.get(label, 0)
+            expected[indicator] = total % formula["mod"]
+        indicators = formulas.evaluate(counts)
+        assert indicators == expected
+        assert all(type(value) is int for value in indicators.values())
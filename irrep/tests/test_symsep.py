@@ -35,6 +35,33 @@ def test_bi_hoti():
     ref_file = "ref_output_isymsep.json"
     check_isymsep(example_dir, command, ref_file)
 
+def test_separate_traces_from_rep_matrices():
+    path = TEST_FILES_PATH / "Bi-hoti"
+    bandstr = BandStructure(code="vasp",
+                            fWAV=str(path / "WAVECAR"),
+                            fPOS=str(path / "POSCAR"),
+                            spinor=True,
+                            Ecut=50,
+                            IBend=18,
+                            kplist=np.array([1, 2]),
+                            degen_thresh=1e-4,
+                            search_cell=True,
+                            irreps=True,
+                            calculate_traces=True)
+    separated = bandstr.Separate(7, groupKramers=False)
+    separated = {(v1, v2): sub2 for v1, sub in separated.items()
+                 for v2, sub2 in sub.Separate(2, groupKramers=False).items()}
+    assert len(separated) > 2
+    for sub in separated.values():
+        for kp in sub.kpoints:
+            assert kp.rep_matrices is not None
+            char = kp.char
+            # recalculate the traces from the plane waves
+            kp.rep_matrices = None
+            kp.init_traces(**bandstr.kwargs_kpoint)
+            assert np.allclose(char, kp.char, atol=1e-6)
+
+
 # C2y : 5, 13 (without matching syms)
 # -C4z+ : 11, 4 (without matching syms)
 
@@ -0,0 +1,80 @@
+import json
+import multiprocessing
+import os
+import numpy as np
+import pytest
+from irreptables import IrrepTable, compiled
+from irrep import table_service
+from irrep.table_service import TableService, get_table_service
+from irrep.spacegroup_irreps import load_irreptable
+from irrep.ebrs import ebr_data_to_json, load_ebr_data
+from irrep.symmetry_indicators import SymmetryIndicatorFormulas
+
+DATA_PATH = os.path.join(os.path.dirname(table_service.__file__), "data")
+
+
+def compare_tables(table, table_ref):
+    assert table.name == table_ref.name
+    assert len(table.symmetries) == len(table_ref.symmetries)
+    for sym, sym_ref in zip(table.symmetries, table_ref.symmetries):
+        assert np.array_equal(sym.R, sym_ref.R)
+        assert np.allclose(sym.S, sym_ref.S)
+    assert [irr.str() for irr in table.irreps] == [irr.str() for irr in table_ref.irreps]
+
+
+def read_in_worker(args):
+    # runs in a new process, which attaches through the environment variable
+    service = get_table_service()
+    table = load_irreptable.__wrapped__(*args)
+    return service.name, table.name, [irr.str() for irr in table.irreps], load_ebr_data("2", True)
+
+
+def test_table_service():
+    keys = [compiled.table_key("2", True), compiled.table_key("191.240", True, magnetic=True)]
+    ebr_ref = ebr_data_to_json(load_ebr_data.__wrapped__("2", True))
+    with TableService.create(irreptables=keys, ebrs=["2"]) as service:
+        assert get_table_service() is service
+        assert os.environ[table_service.ENV_VARIABLE] == service.name
+
+        compare_tables(service.irreptable("2", True), IrrepTable("2", True, use_compiled=False))
+        compare_tables(service.irreptable("191.240", True, magnetic=True),
+                       IrrepTable("191.240", True, magnetic=True, use_compiled=False))
+        assert service.irreptable("3", True) is None
+        compare_tables(load_irreptable.__wrapped__("2", True), IrrepTable("2", True, use_compiled=False))
+
+        ebr_data = service.ebr_data("2", True)
+        assert ebr_data_to_json(ebr_data) == ebr_ref
+        assert np.array_equal(ebr_data["matrix"], load_ebr_data.__wrapped__("2", True)["matrix"])
+        # views of the shared memory, not copies
+        for array in [ebr_data["matrix"]] + list(ebr_data["smith_form"].values()):
+            assert not array.flags.owndata and not array.flags.writeable
+        assert service.ebr_data("3", True) is None
+
+        with open(os.path.join(DATA_PATH, "symmetry_indicators", "double_indicators.json")) as f:
+            si_ref = json.load(f)
+        si_table = service.si_table(True)
+        assert list(si_table) == list(si_ref)
+        assert "2" in si_table and "1" not in si_table
+        assert si_table["2"] == si_ref["2"]
+        formulas = service.si_formulas("2", True)
+        formulas_ref = SymmetryIndicatorFormulas(si_ref["2"]["indicators"])
+        assert formulas.names == formulas_ref.names and formulas.labels == formulas_ref.labels
+        assert np.array_equal(formulas.factors, formulas_ref.factors)
+        assert np.array_equal(formulas.mods, formulas_ref.mods)
+        assert not formulas.factors.flags.owndata
+        assert service.si_formulas("1", True) is None
+        # the block can be unmapped only once no array views it
+        del ebr_data, formulas, array
+
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            name, table_name, irreps, ebr_data = pool.apply(read_in_worker, (("2", True),))
+        assert name == service.name
+        assert table_name == IrrepTable("2", True, use_compiled=False).name
+        assert irreps == [irr.str() for irr in IrrepTable("2", True, use_compiled=False).irreps]
+        assert ebr_data_to_json(ebr_data) == ebr_ref
+        name = service.name
+
+    assert get_table_service() is None
+    assert table_service.ENV_VARIABLE not in os.environ
+    with pytest.raises(FileNotFoundError):
+        TableService.attach(name)
@@ -545,6 +545,20 @@ def all_close_mod1(a, b, tol=1e-5):
     return np.allclose(np.round(diff), diff, atol=tol)
 
 
+def close_mod1(a, b, tol=1e-5):
+    """
+    Vectorized version of :func:`all_close_mod1`: compare vectors along the
+    last axis, broadcasting the other axes.
+
+    Returns
+    -------
+    array(dtype=bool)
+        `True` where the vectors are equal modulo 1.
+    """
+    diff = np.asarray(a) - np.asarray(b)
+    return np.isclose(np.round(diff), diff, atol=tol).all(axis=-1)
+
+
 def vector_pprint(vector, fmt=None):
     """
     Format an homogeneous list or array as a vector for printing
@@ -584,14 +598,12 @@ def select_irreducible(kpoints, spacegroup):
     np.array(int)
         indices of the irreducible k-points in the original list.
     """
-    irreducible_list = UniqueListMod1()
+    kpoints = np.reshape(kpoints, (-1, 3))
+    transformed = spacegroup.symmetry_array().transform_k(kpoints)
     irreducible_list_ik = []
-    for ik, kp in enumerate(kpoints):
-        for symop in spacegroup.symmetries:
-            if symop.transform_k(kp) in irreducible_list:
-                break
-        else:
-            irreducible_list.append(kp)
+    for ik in range(len(kpoints)):
+        if not close_mod1(transformed[:, ik, None, :],
+                          kpoints[None, irreducible_list_ik, :]).any():
             irreducible_list_ik.append(ik)
     return np.array(irreducible_list_ik, dtype=int)
 
@@ -622,40 +634,41 @@ def get_mapping_irr(kpoints, kptirr, spacegroup):
         Mapping from the full list of k-points to the irreducible k-points.
         kpt2kptirr[i] is the index of the irreducible k-point corresponding to the i-th full k-point.
     """
-    symmetries = spacegroup.symmetries
-    Nsym = len(symmetries)
-    kpoints_mod1 = UniqueListMod1(kpoints)
-    assert len(kpoints_mod1) == len(kpoints)
-    NK = len(kpoints_mod1)
-    kptirr2kpt = []
+    symmetry_array = spacegroup.symmetry_array()
+    Nsym = len(symmetry_array)
+    kpoints = np.reshape(kpoints, (-1, 3))
+    NK = len(kpoints)
+    for ik in range(NK):
+        assert not close_mod1(kpoints[ik], kpoints[ik + 1:]).any()
+    kptirr2kpt = np.zeros((len(kptirr), Nsym), dtype=int)
     kpt2kptirr = -np.ones(NK, dtype=int)
+    transformed = symmetry_array.transform_k(kpoints[kptirr])
     for ikirr, i in enumerate(kptirr):
         k1 = kpoints[i]
-        kptirr2kpt.append(np.zeros(Nsym, dtype=int))
-        for isym, symop in enumerate(symmetries):
-            k1p = symop.transform_k(k1)
-            if k1p not in kpoints_mod1:
-                raise RuntimeError(f"Symmetry operation {isym} maps k-point {k1} to {k1p} which is outside the grid."
-                                   "Maybe the grid is incompatible with the symmetry operations")
-            j = kpoints_mod1.index(k1p)
-            kptirr2kpt[ikirr][isym] = j
+        # match[isym, j]: symmetry isym maps k1 to the j-th k-point
+        match = close_mod1(transformed[:, ikirr, None, :], kpoints[None, :, :])
+        found = match.any(axis=1)
+        if not found.all():
+            isym = int(np.argmin(found))
+            raise RuntimeError(f"Symmetry operation {isym} maps k-point {k1} to {transformed[isym, ikirr]} which is outside the grid."
+                               "Maybe the grid is incompatible with the symmetry operations")
+        kptirr2kpt[ikirr] = np.argmax(match, axis=1)
+        for j in kptirr2kpt[ikirr]:
             if kpt2kptirr[j] == -1:
                 kpt2kptirr[j] = ikirr
             else:
                 assert kpt2kptirr[j] == ikirr, (f"two different irreducible kpoints {ikirr} and {kpt2kptirr[j]} are mapped to t"
                                                 f"he same kpoint {j}\n"
                                                 f"kptirr= {kptirr}, \nkpt2kptirr= {kpt2kptirr}\n kptirr2kpt= {kptirr2kpt}")
-    kptirr2kpt = np.array(kptirr2kpt)
-    del kpoints_mod1
     kpt_from_kptirr_isym = np.zeros((len(kptirr), Nsym), dtype=int)
-    for ik, ikirr in enumerate(kpt2kptirr):
-        for isym in range(Nsym):
-            if kptirr2kpt[ikirr, isym] == ik:
-                kpt_from_kptirr_isym[ikirr, isym] = ik
-                break
-        else:
-            raise RuntimeError("No Symmetry operation maps irreducible "
-                               "k-point {ikirr} to point {ik}, but kpt2kptirr[{ik}] = {ikirr}.")
+    # first symmetry mapping the irreducible k-point to each k-point
+    maps = kptirr2kpt[kpt2kptirr] == np.arange(NK)[:, None]
+    if not maps.any(axis=1).all():
+        ik = int(np.argmin(maps.any(axis=1)))
+        ikirr = kpt2kptirr[ik]
+        raise RuntimeError(f"No Symmetry operation maps irreducible "
+                           f"k-point {ikirr} to point {ik}, but kpt2kptirr[{ik}] = {ikirr}.")
+    kpt_from_kptirr_isym[kpt2kptirr, np.argmax(maps, axis=1)] = np.arange(NK)
     assert np.all(kptirr2kpt >= 0)
     assert np.all(kpt2kptirr >= 0
                   )
@@ -693,46 +706,54 @@ def restore_full_grid(kpoints_irr, grid, spacegroup):
     ValueError
         If some points on the grid cannot be generated from the irreducible k-points.
     """
-    n1, n2, n3 = grid
-    all_k_grid = [np.array([i1 / n1, i2 / n2, i3 / n3])
-                  for i1 in range(n1)
-                  for i2 in range(n2)
-                  for i3 in range(n3)]
-    all_k_grid_mod1 = UniqueListMod1(all_k_grid, tol=1e-5)
+    grid = np.array(grid)
+    nk_grid = np.prod(grid)
+    kpoints_irr = np.reshape(kpoints_irr, (-1, 3))
     all_k_mod1 = UniqueListMod1(kpoints_irr, tol=1e-5)
     all_k = [k for k in kpoints_irr]  # first come the irreducible k-points
     assert len(all_k_mod1) == len(kpoints_irr), "kpoints should be unique"
-    kpoints_irr_mod1 = UniqueListMod1(kpoints_irr, tol=1e-5)
+    del all_k_mod1
+    symmetries = spacegroup.symmetries
+    transformed = spacegroup.symmetry_array().transform_k(kpoints_irr)
+    # index of the point on the grid, -1 if the point is not on the grid
+    grid_int = np.round(transformed * grid)
+    grid_index = np.ravel_multi_index(np.moveaxis(grid_int.astype(int) % grid, -1, 0), grid)
+    grid_index[~close_mod1(transformed * grid, grid_int)] = -1
+    # index in all_k of the points already visited, by their index on the grid
+    visited = {}
 
-    kpt2kptirr = -np.ones(len(all_k_grid_mod1), dtype=int)
-    kptirr2kpt = -np.ones((len(kpoints_irr_mod1), len(spacegroup.symmetries)), dtype=int)
+    kpt2kptirr = -np.ones(nk_grid, dtype=int)
+    kptirr2kpt = -np.ones((len(kpoints_irr), len(symmetries)), dtype=int)
 
     for ikirr, kpirr in enumerate(kpoints_irr):
-        for isym, symop in enumerate(spacegroup.symmetries):
-            transformed_k = symop.transform_k(kpirr)
-            if all_close_mod1(transformed_k, kpirr):
+        is_self = close_mod1(transformed[:, ikirr], kpirr)
+        is_irr = close_mod1(transformed[:, ikirr, None, :], kpoints_irr[None, :, :]).any(axis=1)
+        for isym, symop in enumerate(symmetries):
+            transformed_k = transformed[isym, ikirr]
+            ig = grid_index[isym, ikirr]
+            if is_self[isym]:
                 kptirr2kpt[ikirr, isym] = ikirr
                 kpt2kptirr[ikirr] = ikirr
-            elif transformed_k in kpoints_irr_mod1:
+            elif is_irr[isym]:
                 raise ValueError(f"Symmetry operation {symop} transforms k-point {kpirr} to {transformed_k}, which is already in the list of irreducible k-points.")
-            elif transformed_k not in all_k_grid_mod1:
+            elif ig < 0:
                 raise ValueError(f"Symmetry operation {symop} transforms k-point {kpirr} to {transformed_k}, which is not in the grid of k-points.")
-            elif transformed_k in all_k_mod1:
-                ik = all_k_mod1.index(transformed_k)
+            elif ig in visited:
+                ik = visited[ig]
                 assert kpt2kptirr[ik] == ikirr
                 kptirr2kpt[ikirr, isym] = ik
             else:
-                ik = len(all_k_mod1)
+                ik = len(all_k)
                 assert kpt2kptirr[ik] == -1, f"Two different irreducible k-points {ikirr} and {kpt2kptirr[ik]} are mapped to the same k-point {ik}"
                 kpt2kptirr[ik] = ikirr
                 kptirr2kpt[ikirr, isym] = ik
-                all_k_mod1.append(transformed_k)
+                visited[ig] = ik
                 all_k.append(transformed_k)
 
 
-    kpt_from_kptirr_isym = -np.ones(len(all_k_grid_mod1), dtype=int)
+    kpt_from_kptirr_isym = -np.ones(nk_grid, dtype=int)
     for ik, ikirr in enumerate(kpt2kptirr):
-        for isym in range(len(spacegroup.symmetries)):
+        for isym in range(len(symmetries)):
             if kptirr2kpt[ikirr, isym] == ik:
                 kpt_from_kptirr_isym[ik] = isym
                 break
@@ -19,7 +19,7 @@ import os
 ##  e-mail: stepan.tsirkin@epfl.ch                               #
 ##################################################################
 
-__version__ = "2.0.0"
+__version__ = "2.1.0"
 
 
 # using a logger to print useful information during debugging,
@@ -72,6 +72,33 @@ class SymopTable:
         else:
             self.time_reversal = False
 
+    @classmethod
+    def from_arrays(cls, R, t, S, time_reversal=False):
+        """
+        Create a symmetry operation from its arrays instead of parsing a line.
+
+        Parameters
+        ----------
+        R : array, shape=(3,3)
+            Rotational part.
+        t : array, shape=(3,)
+            Direct coordinates of the translation vector.
+        S : array, shape=(2,2)
+            SU(2) matrix describing the transformation of spinor components.
+        time_reversal : bool, default=False
+            Indicates if the operation is combined with time-reversal.
+
+        Returns
+        -------
+        SymopTable
+        """
+        sym = cls.__new__(cls)
+        sym.R = np.array(R, dtype=int)
+        sym.t = np.array(t, dtype=float)
+        sym.S = np.array(S)
+        sym.time_reversal = time_reversal
+        return sym
+
     def str(self, spinor=True):
         """
         Create a `str` describing the symmetry operation as implemented in the 
@@ -251,6 +278,40 @@ class Irrep:
         log_message(f"## Irrep {self.name}\nCharacter:\n{self.characters}", v, 2)
         assert len(self.characters) == self.nsym
 
+    @classmethod
+    def from_characters(cls, name, dim, k_point, characters, reality):
+        """
+        Create an irrep from its character instead of parsing a line.
+
+        Parameters
+        ----------
+        name : str
+            Label of the irrep.
+        dim : int
+            Dimension of the irrep.
+        k_point : class instance
+            Instance of class `KPoint`.
+        characters : array
+            Traces of the symmetries of the little co-group, in the order of
+            `k_point.isym`.
+        reality : bool
+            `True` if traces of all symmetry operations are real.
+
+        Returns
+        -------
+        Irrep
+        """
+        irr = cls.__new__(cls)
+        irr.k = k_point.k
+        irr.kpname = k_point.name
+        irr.name = name
+        irr.dim = dim
+        irr.nsym = len(k_point.isym)
+        irr.reality = reality
+        irr.characters = {isym: ch for isym, ch in zip(k_point.isym, characters)}
+        assert len(irr.characters) == irr.nsym
+        return irr
+
     def show(self):
         """
         Print label of the k-point and info about the irrep.
@@ -297,6 +358,12 @@ class IrrepTable:
         included in it.
     v : int, default=0
         Verbosity level. Default set to minimalistic printing
+    magnetic : bool, default=False
+        `True` to read the table of coreps of a magnetic space-group.
+    use_compiled : bool, default=True
+        If `True` and `name` is `None`, the table is read from the compiled 
+        archive (see :mod:`irreptables.compiled`) when it is available. 
+        Otherwise, the text file is parsed.
 
     Attributes
     ----------
@@ -321,9 +388,16 @@ class IrrepTable:
         irrep of the little group of a maximal k-point.
     """
 
-    def __init__(self, SGnumber, spinor, name=None, v=0, magnetic=False):
+    def __init__(self, SGnumber, spinor, name=None, v=0, magnetic=False, use_compiled=True):
         self.number_str = SGnumber
         self.spinor = spinor
+        if name is None and use_compiled:
+            from . import compiled
+            key = compiled.table_key(self.number_str, self.spinor, magnetic)
+            if compiled.has_compiled_table(key):
+                log_message(f"Reading standard irrep table <{key}> from the compiled archive", v, 2)
+                compiled.load_compiled_table(self, key)
+                return
         if name is None:
             if magnetic is False:
                 name = "{root}/tables/irreps-SG={SG}-{spinor}.dat".format(
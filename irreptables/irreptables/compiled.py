@@ -0,0 +1,449 @@
+
+# ###   ###   #####  ###
+# #  #  #  #  #      #  #
+# ###   ###   ###    ###
+# #  #  #  #  #      #
+# #   # #   # #####  #
+
+
+##################################################################
+## This file is distributed as part of                           #
+## "IrRep" code and under terms of GNU General Public license v3 #
+## see LICENSE file in the                                       #
+##                                                               #
+##  Written by Stepan Tsirkin                                    #
+##  e-mail: stepan.tsirkin@epfl.ch                               #
+##################################################################
+
+"""
+Compiled archive of the tables of irreps and coreps. All tables are stored
+in one HDF5 file as a few concatenated arrays (symmetries, k-points,
+characters), together with the offsets of each table in them. The arrays
+are stored uncompressed, so that they can be memory-mapped, and a table is
+read by slicing them, without parsing any text.
+
+The archive is created with ``python -m irreptables.compiled`` when
+building the package. If it is not present, `IrrepTable` parses the text
+files.
+"""
+
+import glob
+import os
+import time
+
+import numpy as np
+
+try:
+    import h5py
+    H5PY_AVAILABLE = True
+except ImportError:
+    H5PY_AVAILABLE = False
+
+
+ARCHIVE_FORMAT = "irreptables-compiled"
+ARCHIVE_VERSION = 1
+ARCHIVE_NAME = os.path.join(os.path.dirname(__file__), "irreptables.h5")
+
+_archive_cache = {}
+
+
+def table_key(SGnumber, spinor, magnetic=False):
+    """
+    Key of a table in the archive, e.g. 'tables/2-spin' or
+    'correptables/2.4-scal'.
+
+    Parameters
+    ----------
+    SGnumber : str
+        Number of the (magnetic) space-group.
+    spinor : bool
+        `True` for double-valued irreps.
+    magnetic : bool, default=False
+        `True` for the tables of coreps of magnetic groups.
+
+    Returns
+    -------
+    str
+    """
+    folder = "correptables" if magnetic else "tables"
+    return f"{folder}/{SGnumber}-{'spin' if spinor else 'scal'}"
+
+
+def text_tables():
+    """
+    List the text files of the tables included in the package.
+
+    Returns
+    -------
+    dict
+        Keys are the keys returned by :func:`table_key`, values are tuples
+        `(filename, SGnumber, spinor, magnetic)`.
+    """
+    root = os.path.dirname(__file__)
+    tables = {}
+    for folder, magnetic in (("tables", False), ("correptables", True)):
+        for filename in sorted(glob.glob(os.path.join(root, folder, "irreps-SG=*-*.dat"))):
+            SGnumber, spin = os.path.basename(filename)[len("irreps-SG="):-len(".dat")].rsplit("-", 1)
+            spinor = spin == "spin"
+            tables[table_key(SGnumber, spinor, magnetic)] = (filename, SGnumber, spinor, magnetic)
+    return tables
+
+
+def _encode(strings):
+    return np.array([s.encode() for s in strings], dtype=bytes)
+
+
+def _decode(array):
+    return [s.decode() for s in array]
+
+
+def compile_arrays(keys=None, verbosity=0):
+    """
+    Parse the text tables and concatenate their data into flat arrays.
+
+    Parameters
+    ----------
+    keys : list of str, default=None
+        Keys of the tables to include (see :func:`table_key`). If `None`,
+        all the tables of the package are included.
+    verbosity : int, default=0
+        Verbosity level.
+
+    Returns
+    -------
+    index : dict
+        Columns of the index of tables: `key` and `name` (lists of str) and
+        `nsym`, `sym_offset`, `kp_offset`, `irrep_offset` (arrays).
+    data : dict
+        Concatenated arrays of symmetries, k-points and irreps.
+    """
+    from . import IrrepTable
+    from irrep.utility import log_message
+
+    tables = text_tables()
+    if keys is None:
+        keys = list(tables)
+
+    data = {name: [] for name in (
+        "sym_R", "sym_t", "sym_S", "sym_time_reversal",
+        "kp_name", "kp_k", "kp_isym", "kp_isym_offset",
+        "irrep_name", "irrep_dim", "irrep_kp", "irrep_reality", "irrep_char", "irrep_char_offset")}
+    index = {name: [] for name in ("key", "name", "nsym", "sym_offset", "kp_offset", "irrep_offset")}
+    for key in keys:
+        fname, SGnumber, spinor, magnetic = tables[key]
+        log_message(f"compiling {fname}", verbosity, 1)
+        table = IrrepTable(SGnumber, spinor, name=fname, magnetic=magnetic)
+        index["key"].append(key)
+        index["name"].append(table.name)
+        index["nsym"].append(table.nsym)
+        index["sym_offset"].append(len(data["sym_R"]))
+        index["kp_offset"].append(len(data["kp_name"]))
+        index["irrep_offset"].append(len(data["irrep_name"]))
+        for sym in table.symmetries:
+            data["sym_R"].append(sym.R)
+            data["sym_t"].append(sym.t)
+            data["sym_S"].append(sym.S)
+            data["sym_time_reversal"].append(sym.time_reversal)
+        kpoints = {}
+        for irr in table.irreps:
+            if irr.kpname not in kpoints:
+                kpoints[irr.kpname] = len(data["kp_name"]) - index["kp_offset"][-1]
+                data["kp_name"].append(irr.kpname)
+                data["kp_k"].append(irr.k)
+                data["kp_isym_offset"].append(len(data["kp_isym"]))
+                data["kp_isym"] += list(irr.characters)
+            data["irrep_name"].append(irr.name)
+            data["irrep_dim"].append(irr.dim)
+            data["irrep_kp"].append(kpoints[irr.kpname])
+            data["irrep_reality"].append(irr.reality)
+            data["irrep_char_offset"].append(len(data["irrep_char"]))
+            data["irrep_char"] += list(irr.characters.values())
+    # the last offsets mark the ends of the arrays
+    index["sym_offset"].append(len(data["sym_R"]))
+    index["kp_offset"].append(len(data["kp_name"]))
+    index["irrep_offset"].append(len(data["irrep_name"]))
+    data["kp_isym_offset"].append(len(data["kp_isym"]))
+    data["irrep_char_offset"].append(len(data["irrep_char"]))
+
+    for name in ("nsym", "sym_offset", "kp_offset", "irrep_offset"):
+        index[name] = np.array(index[name], dtype=np.int64)
+    dtypes = dict(sym_R=np.int8, sym_t=float, sym_S=complex, sym_time_reversal=bool,
+                  kp_k=float, kp_isym=np.int16, kp_isym_offset=np.int64,
+                  irrep_dim=np.int16, irrep_kp=np.int32, irrep_reality=bool,
+                  irrep_char=complex, irrep_char_offset=np.int64)
+    shapes = dict(sym_R=(3, 3), sym_t=(3,), sym_S=(2, 2), kp_k=(3,))
+    for name, values in data.items():
+        if name in ("kp_name", "irrep_name"):
+            data[name] = _encode(values)
+        else:
+            data[name] = np.array(values, dtype=dtypes[name]).reshape((-1,) + shapes.get(name, ()))
+    return index, data
+
+
+def compile_tables(filename=None, keys=None, verbosity=0):
+    """
+    Parse the text tables and write them to the compiled archive.
+
+    Parameters
+    ----------
+    filename : str, default=None
+        Name of the archive. If `None`, it is written next to the text
+        tables, where `IrrepTable` looks for it.
+    keys : list of str, default=None
+        Keys of the tables to include (see :func:`table_key`). If `None`,
+        all the tables of the package are included.
+    verbosity : int, default=0
+        Verbosity level.
+
+    Returns
+    -------
+    str
+        Name of the archive.
+    """
+    from irrep.utility import log_message
+
+    if not H5PY_AVAILABLE:
+        raise RuntimeError("h5py is needed to compile the tables")
+    if filename is None:
+        filename = ARCHIVE_NAME
+    index, data = compile_arrays(keys=keys, verbosity=verbosity)
+    with h5py.File(filename, "w") as f:
+        f.attrs["format"] = ARCHIVE_FORMAT
+        f.attrs["version"] = ARCHIVE_VERSION
+        for name, values in index.items():
+            if name in ("key", "name"):
+                values = _encode(values)
+            f.create_dataset("index_" + name, data=values)
+        for name, values in data.items():
+            # contiguous and uncompressed, so that the data can be memory-mapped
+            f.create_dataset(name, data=values)
+    _archive_cache.pop(os.path.abspath(filename), None)
+    log_message(f"{len(index['key'])} tables written to {filename}", verbosity, 1)
+    return filename
+
+
+def read_archive(filename=None):
+    """
+    Read the index of the archive and memory-map its datasets. The result is
+    kept until the file is modified.
+
+    Parameters
+    ----------
+    filename : str, default=None
+        Name of the archive. If `None`, the one of the package is used.
+
+    Returns
+    -------
+    index : dict
+        Columns of the index of tables, see :func:`compile_arrays`.
+    data : dict
+        Memory-mapped arrays of symmetries, k-points and irreps.
+    """
+    if filename is None:
+        filename = ARCHIVE_NAME
+    path = os.path.abspath(filename)
+    mtime = os.path.getmtime(path)
+    cached = _archive_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with h5py.File(path, "r") as f:
+            if f.attrs.get("format") != ARCHIVE_FORMAT or f.attrs.get("version") != ARCHIVE_VERSION:
+                raise RuntimeError(f"{filename} is not a compiled archive of tables, version {ARCHIVE_VERSION}")
+            index = {}
+            data = {}
+            for name, dataset in f.items():
+                if name in ("index_key", "index_name"):
+                    index[name[len("index_"):]] = _decode(dataset[()])
+                elif name.startswith("index_"):
+                    index[name[len("index_"):]] = dataset[()]
+                elif dataset.id.get_offset() is None:  # empty dataset, no storage allocated
+                    data[name] = dataset[()]
+                else:
+                    data[name] = np.memmap(path, dtype=dataset.dtype, mode="r",
+                                           offset=dataset.id.get_offset(), shape=dataset.shape)
+        cached = (mtime, index, data)
+        _archive_cache[path] = cached
+    return cached[1:]
+
+
+def has_compiled_table(key, filename=None):
+    """
+    Check if a table is present in the compiled archive.
+
+    Parameters
+    ----------
+    key : str
+        Key of the table (see :func:`table_key`).
+    filename : str, default=None
+        Name of the archive. If `None`, the one of the package is used.
+
+    Returns
+    -------
+    bool
+    """
+    if filename is None:
+        filename = ARCHIVE_NAME
+    if not H5PY_AVAILABLE or not os.path.exists(filename):
+        return False
+    return key in table_positions(read_archive(filename)[0])
+
+
+def table_positions(index):
+    """
+    Map the keys of the tables to their positions in the index. The mapping
+    is stored in the index, so that it is computed once.
+
+    Parameters
+    ----------
+    index : dict
+        Columns of the index of tables, see :func:`compile_arrays`.
+
+    Returns
+    -------
+    dict
+    """
+    if "position" not in index:
+        index["position"] = {key: i for i, key in enumerate(index["key"])}
+    return index["position"]
+
+
+def build_table(table, key, index, data):
+    """
+    Set the attributes `name`, `nsym`, `symmetries` and `irreps` of an
+    `IrrepTable` from the concatenated arrays of a set of tables. The arrays
+    may reside in a memory map or a shared memory block, only the slices of
+    the requested table are copied.
+
+    Parameters
+    ----------
+    table : IrrepTable
+        Table to fill.
+    key : str
+        Key of the table (see :func:`table_key`).
+    index : dict
+        Columns of the index of tables, see :func:`compile_arrays`.
+    data : dict
+        Concatenated arrays of symmetries, k-points and irreps.
+    """
+    from . import SymopTable, KPoint, Irrep
+
+    i = table_positions(index)[key]
+    s1, s2 = index["sym_offset"][i:i + 2]
+    k1, k2 = index["kp_offset"][i:i + 2]
+    r1, r2 = index["irrep_offset"][i:i + 2]
+    R = np.array(data["sym_R"][s1:s2])
+    t = np.array(data["sym_t"][s1:s2])
+    S = np.array(data["sym_S"][s1:s2])
+    time_reversal = np.array(data["sym_time_reversal"][s1:s2])
+    kp_name = _decode(data["kp_name"][k1:k2])
+    kp_k = np.array(data["kp_k"][k1:k2])
+    isym_bounds = data["kp_isym_offset"][k1:k2 + 1]
+    kp_isym = data["kp_isym"][isym_bounds[0]:isym_bounds[-1]].astype(int)
+    isym_bounds = isym_bounds - isym_bounds[0]
+    irrep_name = _decode(data["irrep_name"][r1:r2])
+    irrep_dim = data["irrep_dim"][r1:r2]
+    irrep_kp = data["irrep_kp"][r1:r2]
+    irrep_reality = data["irrep_reality"][r1:r2]
+    char_bounds = data["irrep_char_offset"][r1:r2 + 1]
+    irrep_char = np.array(data["irrep_char"][char_bounds[0]:char_bounds[-1]])
+    char_bounds = char_bounds - char_bounds[0]
+
+    table.name = index["name"][i]
+    table.nsym = int(index["nsym"][i])
+    table.symmetries = [SymopTable.from_arrays(R[j], t[j], S[j], bool(time_reversal[j]))
+                        for j in range(s2 - s1)]
+    kpoints = [KPoint(name=kp_name[j], k=kp_k[j],
+                      isym=[int(x) for x in kp_isym[isym_bounds[j]:isym_bounds[j + 1]]])
+               for j in range(k2 - k1)]
+    table.irreps = []
+    for j in range(r2 - r1):
+        characters = irrep_char[char_bounds[j]:char_bounds[j + 1]]
+        if irrep_reality[j]:
+            characters = characters.real
+        table.irreps.append(Irrep.from_characters(name=irrep_name[j],
+                                                  dim=int(irrep_dim[j]),
+                                                  k_point=kpoints[irrep_kp[j]],
+                                                  characters=characters,
+                                                  reality=bool(irrep_reality[j])))
+
+
+def load_compiled_table(table, key, filename=None):
+    """
+    Read a table from the compiled archive and set the attributes
+    `name`, `nsym`, `symmetries` and `irreps` of an `IrrepTable`.
+
+    Parameters
+    ----------
+    table : IrrepTable
+        Table to fill.
+    key : str
+        Key of the table (see :func:`table_key`).
+    filename : str, default=None
+        Name of the archive. If `None`, the one of the package is used.
+    """
+    build_table(table, key, *read_archive(filename))
+
+
+def benchmark(keys=None, repeat=3, filename=None):
+    """
+    Compare the time needed to load tables from the text files and from the
+    compiled archive.
+
+    Parameters
+    ----------
+    keys : list of str, default=None
+        Keys of the tables to load (see :func:`table_key`). If `None`, a
+        sample of ordinary and magnetic groups is used.
+    repeat : int, default=3
+        Number of times each table is loaded. The best time is reported.
+    filename : str, default=None
+        Name of the archive. If `None`, the one of the package is used.
+
+    Returns
+    -------
+    dict
+        Keys are the keys of the tables, values are tuples with the times
+        (in seconds) for the text files and the archive.
+    """
+    from . import IrrepTable
+
+    tables = text_tables()
+    if keys is None:
+        keys = [key for key in (table_key("2", True), table_key("191", True), table_key("221", False),
+                                table_key("229", True), table_key("191.240", True, magnetic=True),
+                                table_key("230.148", True, magnetic=True))
+                if key in tables]
+    times = {}
+    for key in keys:
+        fname, SGnumber, spinor, magnetic = tables[key]
+        t_text = np.inf
+        t_compiled = np.inf
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            IrrepTable(SGnumber, spinor, magnetic=magnetic, use_compiled=False)
+            t1 = time.perf_counter()
+            table = IrrepTable.__new__(IrrepTable)
+            load_compiled_table(table, key, filename=filename)
+            t2 = time.perf_counter()
+            t_text = min(t_text, t1 - t0)
+            t_compiled = min(t_compiled, t2 - t1)
+        times[key] = (t_text, t_compiled)
+        print(f"{key:<32} text: {t_text * 1000:9.2f} ms   compiled: {t_compiled * 1000:9.2f} ms")
+    return times
+
+
+if __name__ == "__main__":
+    import click
+
+    @click.command()
+    @click.option("-output", type=click.Path(), default=None,
+                  help="Name of the archive. Default: next to the text tables")
+    @click.option("-benchmark", "run_benchmark", flag_value=True, default=False,
+                  help="Compare the loading times instead of compiling")
+    def main(output, run_benchmark):
+        """Compile the tables of irreps into one archive."""
+        if run_benchmark:
+            benchmark(filename=output)
+        else:
+            compile_tables(filename=output, verbosity=1)
+
+    main()
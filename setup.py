@@ -1,4 +1,30 @@
+import os
+import shutil
+
 import setuptools
+from setuptools.command.build_py import build_py
+
+
+class BuildPyWithEBRs(build_py):
+    """
+    Pack the JSON files of EBRs into the store read by `irrep.ebrs` and ship
+    it instead of them. If the dependencies needed to build the store are
+    missing, the JSON files are shipped and read at run time.
+    """
+
+    def run(self):
+        super().run()
+        if self.dry_run:
+            return
+        try:
+            from irrep.ebrs import pack_ebr_data
+        except ImportError as err:
+            print(f"The store of EBRs is not built ({err}), the JSON files will be used")
+            return
+        data_dir = os.path.join(self.build_lib, "irrep", "data")
+        pack_ebr_data(filename=os.path.join(data_dir, "ebrs.h5"))
+        shutil.rmtree(os.path.join(data_dir, "ebrs"), ignore_errors=True)
+
 
 with open("README.md", "r") as fh:
     long_description = fh.read()
@@ -17,7 +43,7 @@ setuptools.setup(
         "Click",
         "monty",
         "ruamel.yaml",
-        "irreptables>=2.0",
+        "irreptables>=2.1",
         "fortio",
         "packaging",
         "h5py",
@@ -30,8 +56,9 @@ setuptools.setup(
         "License :: OSI Approved :: GNU General Public License v3 (GPLv3)",
         "Operating System :: OS Independent",
     ],
+    cmdclass={"build_py": BuildPyWithEBRs},
     entry_points="""
         [console_scripts]
-        irrep=irrep.cli:cli
+        irrep=irrep.cli:main
     """,
 )